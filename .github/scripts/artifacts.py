@@ -0,0 +1,118 @@
+import json
+from typing import Any, Collection, IO, Iterator, Optional, Tuple
+
+# Characters JSON allows between tokens
+WHITESPACE = ' \t\r\n'
+
+# Default number of characters read from disk at a time
+CHUNK_SIZE = 1 << 16
+
+
+class JsonStream:
+    """Incremental reader over a JSON document that never holds more than one value in memory.
+
+    The buffer only grows when a single value does not fit in it, and the read size doubles
+    on each retry so very large values are still decoded in a handful of passes.
+    """
+
+    def __init__(self, f: IO[str], chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+
+    def _fill(self, size: int) -> bool:
+        """Drop consumed characters and append the next chunk. Returns False at end of file."""
+        chunk = self.f.read(size)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self.chunk_size):
+                raise ValueError("Unexpected end of JSON document")
+
+    def expect(self, char: str) -> None:
+        """Consume the next non-whitespace character, which must be `char`."""
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, found '{self.buf[self.pos]}'")
+        self.pos += 1
+
+    def skip_comma(self) -> None:
+        """Consume a separating comma if one is next."""
+        if self.peek() == ',':
+            self.pos += 1
+
+    def _terminated(self, end: int) -> bool:
+        """Return True if the character at `end` closes the preceding value."""
+        return end < len(self.buf) and self.buf[end] in WHITESPACE + ',]}'
+
+    def value(self) -> Any:
+        """Decode and consume the next complete JSON value."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill(size):
+                    raise
+                size *= 2
+                continue
+            # A number cut by the buffer edge decodes as a shorter number, so only accept
+            # it once the character after it is a delimiter or the file is exhausted
+            if isinstance(obj, (int, float)) and not self._terminated(end) and self._fill(size):
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_json_members(f: IO[str], stream_keys: Optional[Collection[str]] = None,
+                      chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Any]]:
+    """Walk the top-level object of a JSON document one member at a time.
+
+    Args:
+        f: Open text file positioned at the start of the document
+        stream_keys: Top-level keys whose array or object value is yielded element by element
+            instead of being decoded whole. None streams every container value.
+        chunk_size: Characters read from disk at a time
+
+    Yields:
+        (key, value) for regular members, (key, item) for each item of a streamed array
+        and (key, (member_key, member_value)) for each member of a streamed object
+    """
+    stream = JsonStream(f, chunk_size)
+    stream.expect('{')
+    while stream.peek() != '}':
+        key = stream.value()
+        stream.expect(':')
+        opening = stream.peek()
+        if opening in '[{' and (stream_keys is None or key in stream_keys):
+            stream.pos += 1
+            closing = ']' if opening == '[' else '}'
+            while stream.peek() != closing:
+                if opening == '[':
+                    yield key, stream.value()
+                else:
+                    member_key = stream.value()
+                    stream.expect(':')
+                    yield key, (member_key, stream.value())
+                stream.skip_comma()
+            stream.expect(closing)
+        else:
+            yield key, stream.value()
+        stream.skip_comma()
+
+
+def short_unique_id(unique_id: str) -> str:
+    """Shorten a dbt unique ID to its resource type, package and name."""
+    return '.'.join(unique_id.split('.')[:3]).replace('dbt_clickup.', '')
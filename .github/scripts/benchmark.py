@@ -0,0 +1,357 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from unittest import mock
+
+from helpers import humanize_bytes
+from warehouses import DEFAULT_SETTINGS
+
+# Node counts benchmarked by default
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Share of results per status in the generated run results
+DEFAULT_STATUS_MIX = {'success': 0.6, 'pass': 0.3, 'warn': 0.04, 'fail': 0.03, 'error': 0.01, 'skipped': 0.02}
+
+# Allowed relative slowdown or memory growth over the baseline before a benchmark fails
+DEFAULT_THRESHOLD = 0.5
+
+# Differences below these are noise and never fail a benchmark
+MIN_SECONDS_DELTA = 0.25
+MIN_BYTES_DELTA = 1024 * 1024
+
+# Recorded runs per node in the generated timing history, enough for every node to be checked
+# for regressions (run_history.MIN_BASELINE_RUNS) without recording the full retention
+HISTORY_RUNS = 10
+
+# Share of generated nodes that are tests, the rest are models and a few seeds
+TEST_SHARE = 0.6
+SEED_SHARE = 0.02
+
+
+def generate_nodes(n_nodes: int, seed: int = 0) -> List[Tuple[str, List[str]]]:
+    """Generate a layered DAG of seeds, models and tests.
+
+    Each model depends on one to three earlier nodes, each test on one or two models.
+
+    Returns:
+        List of unique ID and parent unique IDs, parents always come first
+    """
+    rng = random.Random(seed)
+    n_tests = int(n_nodes * TEST_SHARE)
+    n_seeds = max(1, int(n_nodes * SEED_SHARE))
+    n_models = n_nodes - n_tests - n_seeds
+
+    nodes = [(f"seed.dbt_clickup.seed_{i}", []) for i in range(n_seeds)]
+    for i in range(n_models):
+        # Prefer recent nodes as parents so the DAG is deep rather than flat
+        window = nodes[max(0, len(nodes) - 200):]
+        parents = sorted({uid for uid, _ in rng.sample(window, min(len(window), rng.randint(1, 3)))})
+        nodes.append((f"model.dbt_clickup.model_{i}", parents))
+    models = [uid for uid, _ in nodes if uid.startswith('model.')]
+    for i in range(n_tests):
+        parents = sorted(set(rng.sample(models, min(len(models), rng.choice([1, 1, 1, 2])))))
+        nodes.append((f"test.dbt_clickup.test_{i}.{i:08x}", parents))
+    return nodes
+
+
+def generate_manifest(path: str, nodes: List[Tuple[str, List[str]]], modified: Optional[Set[str]] = None) -> None:
+    """Write a manifest.json for the generated nodes, one node at a time.
+
+    Args:
+        path: Output path
+        nodes: Nodes from generate_nodes()
+        modified: Unique IDs whose checksum differs, to produce the manifest of a change
+    """
+    metadata = {
+        'dbt_schema_version': 'https://schemas.getdbt.com/dbt/manifest/v11.json',
+        'dbt_version': '1.7.0',
+        'generated_at': '2024-01-01T00:00:00.000000Z',
+        'invocation_id': '00000000-0000-0000-0000-000000000000',
+        'env': {},
+        'project_name': 'dbt_template',
+        'adapter_type': 'snowflake',
+    }
+    sources = {'source.dbt_template.raw.games': {'name': 'games', 'resource_type': 'source',
+                                                 'relation_name': 'RAW.games.games'}}
+    with open(path, 'w') as f:
+        f.write(f'{{"metadata": {json.dumps(metadata)}, "nodes": {{')
+        for index, (unique_id, parents) in enumerate(nodes):
+            resource_type, package, name = unique_id.split('.')[:3]
+            node = {
+                'unique_id': unique_id,
+                'name': name,
+                'fqn': [package, 'mart', name],
+                'resource_type': resource_type,
+                'database': 'PROD',
+                'schema': 'mart',
+                'alias': name,
+                'relation_name': None if resource_type == 'test' else f"PROD.mart.{name}",
+                'checksum': {'name': 'sha256', 'checksum': f"{zlib.crc32(unique_id.encode()):08x}"
+                             f"{'-modified' if modified and unique_id in modified else ''}"},
+                'config': {'materialized': 'test' if resource_type == 'test' else 'table', 'tags': []},
+                'depends_on': {'nodes': parents, 'macros': ['macro.dbt.run_query']},
+                'raw_code': f"select * from {{{{ ref('{name}') }}}}",
+            }
+            f.write(f"{', ' if index else ''}{json.dumps(unique_id)}: {json.dumps(node)}")
+        f.write(f'}}, "sources": {json.dumps(sources)}, '
+                '"macros": {"macro.dbt.run_query": {"macro_sql": "{% macro run_query(sql) %}{% endmacro %}", '
+                '"depends_on": {"macros": []}}}, "parent_map": {')
+        f.write(', '.join(f"{json.dumps(unique_id)}: {json.dumps(parents)}" for unique_id, parents in nodes))
+        f.write('}, "child_map": {}}')
+
+
+def generate_run_results(path: str, nodes: List[Tuple[str, List[str]]], status_mix: Optional[Dict[str, float]] = None,
+                         threads: int = 8, seed: int = 0) -> None:
+    """Write a run_results.json with one result per generated node, one result at a time.
+
+    Args:
+        path: Output path
+        nodes: Generated nodes
+        status_mix: Share of results per status, defaults to DEFAULT_STATUS_MIX
+        threads: Number of threads the results are spread over
+        seed: Random seed
+    """
+    rng = random.Random(seed)
+    status_mix = status_mix or DEFAULT_STATUS_MIX
+    statuses, weights = list(status_mix), list(status_mix.values())
+    clock = [datetime(2024, 1, 1, tzinfo=timezone.utc)] * threads
+    with open(path, 'w') as f:
+        f.write('{"metadata": {"invocation_id": "benchmark"}, "results": [')
+        for index, (unique_id, _) in enumerate(nodes):
+            status = rng.choices(statuses, weights)[0]
+            # Tests can only pass, warn or fail, models only succeed or error
+            if unique_id.startswith('test.'):
+                status = {'success': 'pass', 'error': 'fail'}.get(status, status)
+            else:
+                status = {'pass': 'success', 'warn': 'success', 'fail': 'error'}.get(status, status)
+            seconds = rng.lognormvariate(0, 1)
+            thread = index % threads
+            started, clock[thread] = clock[thread], clock[thread] + timedelta(seconds=seconds)
+            result = {
+                'status': status,
+                'unique_id': unique_id,
+                'execution_time': seconds,
+                'thread_id': f"Thread-{thread + 1}",
+                'timing': [{'name': 'execute', 'started_at': started.isoformat(),
+                            'completed_at': clock[thread].isoformat()}],
+                'message': f"Got {rng.randint(1, 100)} results, configured to fail if != 0" if status in ('warn', 'fail')
+                else None,
+                'failures': None,
+                'adapter_response': {},
+            }
+            f.write(f"{', ' if index else ''}{json.dumps(result)}")
+        f.write(f'], "elapsed_time": {(max(clock) - clock[0]).total_seconds()}, "args": {{"threads": {threads}}}}}')
+
+
+def generate_run_history(path: str, nodes: List[Tuple[str, List[str]]], runs: int = HISTORY_RUNS,
+                         seed: int = 1) -> None:
+    """Write a timing history database with `runs` successful runs of every generated node.
+
+    Times follow the same distribution as generate_run_results(), so the run under test
+    has a realistic share of outliers against the history.
+
+    Args:
+        path: Output path
+        nodes: Generated nodes
+        runs: Recorded runs per node
+        seed: Random seed
+    """
+    from run_history import open_history
+
+    rng = random.Random(seed)
+    started = datetime(2023, 12, 1, tzinfo=timezone.utc)
+    conn = open_history(path)
+    with conn:
+        for run in range(runs):
+            recorded_at = (started + timedelta(days=run)).isoformat()
+            conn.executemany(
+                "INSERT INTO node_timings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((unique_id, f"{run:040x}", str(run), 'dbt Merge Job', recorded_at,
+                  'pass' if unique_id.startswith('test.') else 'success', rng.lognormvariate(0, 1))
+                 for unique_id, _ in nodes)
+            )
+    conn.close()
+
+
+def generate_rbac_config(n_databases: int) -> Dict[str, object]:
+    """Generate an account with many raw and environment databases and a warehouse per workload each.
+
+    Returns:
+        Keyword arguments for get_static_queries()
+    """
+    n_raw = max(1, n_databases // 4)
+    roles = ['LOADER_ROLE', 'TRANSFORMER_ROLE', 'ANALYZER_ROLE']
+    return {
+        'raw_databases': [f"RAW_{i}" for i in range(n_raw)],
+        'environment_databases': [f"{env}_{i}" for i in range(max(1, (n_databases - n_raw) // 3))
+                                  for env in ('DEV', 'PR', 'PROD')],
+        'warehouses': {f"WH_{i}": {**DEFAULT_SETTINGS, 'size': 'XSMALL', 'max_cluster_count': 1 + i % 3,
+                                   'roles': [roles[i % len(roles)]]} for i in range(max(3, n_databases // 10))},
+    }
+
+
+def measure(func: Callable[[], object], repeat: int = 3) -> Dict[str, float]:
+    """Measure a callable's best wall time and its peak traced memory.
+
+    Timing and memory are measured in separate calls, tracemalloc slows execution down.
+
+    Returns:
+        Dictionary with seconds and peak_bytes
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': round(min(seconds), 4), 'peak_bytes': peak}
+
+
+def run_benchmarks(sizes: List[int], directory: str, status_mix: Optional[Dict[str, float]] = None,
+                   repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    """Generate artifacts for each size and benchmark the CI scripts against them.
+
+    Args:
+        sizes: Node counts to benchmark
+        directory: Directory the generated artifacts are written to
+        status_mix: Share of results per status
+        repeat: Timed calls per benchmark, the best is kept
+
+    Returns:
+        Dictionary of benchmark name to its measurements
+    """
+    import dbt_job_summary
+    import slim_ci_planner
+    import snowflake_rbac_setup
+
+    results = {}
+    for size in sizes:
+        nodes = generate_nodes(size)
+        run_results = os.path.join(directory, f"run_results_{size}.json")
+        manifest = os.path.join(directory, f"manifest_{size}.json")
+        generate_run_results(run_results, nodes, status_mix)
+        generate_manifest(manifest, nodes)
+        # The deferred manifest differs in 1% of the nodes
+        prod_manifest = os.path.join(directory, f"manifest_{size}_prod.json")
+        generate_manifest(prod_manifest, nodes, {unique_id for unique_id, _ in nodes[::100]})
+        # The job summary compares the run against this history for its regression callout
+        run_history = os.path.join(directory, f"run_history_{size}.db")
+        generate_run_history(run_history, nodes)
+        del nodes
+
+        env = {
+            'DBT_RUN_RESULTS': run_results,
+            'DBT_MANIFEST': manifest,
+            'DBT_RUN_HISTORY': run_history,
+            'DBT_RUN_STATUS': 'failure',
+            'GITHUB_PR_COMMENT_NAME': 'PR Job',
+        }
+        with mock.patch.dict(os.environ, env):
+            for name, func in [('fetch_run_results', dbt_job_summary.fetch_run_results),
+                               ('job_summary_main', dbt_job_summary.main)]:
+                results[f"{name}[{size}]"] = measure(func, repeat)
+                print(f"{name}[{size}]: {results[f'{name}[{size}]']}", file=sys.stderr)
+
+        results[f"slim_ci_plan[{size}]"] = measure(lambda: slim_ci_planner.plan(prod_manifest, manifest, depth=1), repeat)
+        print(f"slim_ci_plan[{size}]: {results[f'slim_ci_plan[{size}]']}", file=sys.stderr)
+
+    # RBAC statements scale with databases rather than nodes
+    for n_databases in sorted({max(4, size // 100) for size in sizes}):
+        config = generate_rbac_config(n_databases)
+        results[f"get_static_queries[{n_databases}]"] = measure(
+            lambda: snowflake_rbac_setup.get_static_queries(**config), repeat)
+        print(f"get_static_queries[{n_databases}]: {results[f'get_static_queries[{n_databases}]']}", file=sys.stderr)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Return a message for every benchmark that regressed past the threshold.
+
+    Args:
+        results: Current measurements
+        baseline: Stored measurements
+        threshold: Allowed relative increase of time or peak memory
+
+    Returns:
+        List of regression messages, empty if nothing regressed
+    """
+    regressions = []
+    for name, current in sorted(results.items()):
+        if not (previous := baseline.get(name)):
+            continue
+        for metric, min_delta in [('seconds', MIN_SECONDS_DELTA), ('peak_bytes', MIN_BYTES_DELTA)]:
+            delta = current[metric] - previous[metric]
+            if delta > min_delta and current[metric] > previous[metric] * (1 + threshold):
+                regressions.append(f"{name} {metric}: {previous[metric]} -> {current[metric]} "
+                                   f"(+{delta / previous[metric]:.0%})")
+    return regressions
+
+
+def main() -> None:
+    """Benchmark the CI scripts on synthetic artifacts and compare against the stored baseline.
+
+    BENCHMARK_SIZES sets the node counts (comma-separated), BENCHMARK_BASELINE the baseline
+    file and BENCHMARK_THRESHOLD the allowed relative regression. BENCHMARK_MODE=update
+    rewrites the baseline instead of comparing against it.
+    """
+    sizes = [int(size) for size in os.getenv('BENCHMARK_SIZES', ','.join(map(str, DEFAULT_SIZES))).split(',')]
+    baseline_path = os.getenv('BENCHMARK_BASELINE') or os.path.join(os.path.dirname(__file__), 'benchmark_baseline.json')
+    threshold = float(os.getenv('BENCHMARK_THRESHOLD', DEFAULT_THRESHOLD))
+    mode = os.getenv('BENCHMARK_MODE', 'compare').lower()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The summary prints progress of its own, keep stdout for the report
+        with mock.patch('sys.stdout', new=sys.stderr):
+            results = run_benchmarks(sizes, directory)
+
+    if mode == 'update':
+        baseline = {}
+        if os.path.exists(baseline_path):
+            with open(baseline_path, 'r') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(baseline_path, 'w') as f:
+            json.dump(dict(sorted(baseline.items())), f, indent=2)
+            f.write('\n')
+        print(f"Updated {len(results)} baselines in {baseline_path}")
+        return
+
+    try:
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Failed to read baseline: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    print("| Benchmark | Seconds | Baseline | Peak memory | Baseline |")
+    print("| --- | --- | --- | --- | --- |")
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        previous_seconds = f"{previous['seconds']:.3f}" if previous else '-'
+        previous_bytes = humanize_bytes(previous['peak_bytes']) if previous else '-'
+        print(f"| {name} | {current['seconds']:.3f} | {previous_seconds} | "
+              f"{humanize_bytes(current['peak_bytes'])} | {previous_bytes} |")
+
+    if regressions := compare(results, baseline, threshold):
+        print(f"\n{len(regressions)} benchmarks regressed more than {threshold:.0%}:", file=sys.stderr)
+        for regression in regressions:
+            print(f"- {regression}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
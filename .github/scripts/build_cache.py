@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, Set
+
+from artifacts import iter_json_members
+from helpers import connect_to_snowflake, fetch_rows
+from slim_ci_planner import load_manifest
+
+# Table in the PR schema holding the cache key of every node built successfully
+CACHE_TABLE = 'dbt_build_cache'
+
+# Statuses whose relation (or test outcome) can be reused by a later build
+CACHEABLE_STATUSES = {'success', 'pass'}
+
+# Rows written per MERGE statement
+BATCH_SIZE = 1000
+
+
+def deep_macro_hashes(macros: Dict[str, Dict]) -> Dict[str, str]:
+    """Hash each macro together with every macro it calls, directly or not."""
+    hashes = {}
+
+    def visit(uid: str, stack: Set[str]) -> str:
+        if uid in hashes:
+            return hashes[uid]
+        if uid not in macros or uid in stack:
+            # Unknown or recursive macros contribute their name only
+            return uid
+        callees = sorted(visit(callee, stack | {uid}) for callee in macros[uid]['macros'])
+        hashes[uid] = hashlib.sha256('\n'.join([macros[uid]['hash'], *callees]).encode()).hexdigest()
+        return hashes[uid]
+
+    for uid in macros:
+        visit(uid, set())
+    return hashes
+
+
+def compute_cache_keys(nodes: Dict[str, Dict], macros: Dict[str, Dict]) -> Dict[str, str]:
+    """Compute a content address for every node.
+
+    A key covers the node's code (the raw code checksum plus everything its macros expand to,
+    which fixes the compiled SQL for a given target), its config and the keys of its parents,
+    so any upstream change invalidates everything below it.
+
+    Args:
+        nodes: Compact nodes from slim_ci_planner.load_manifest()
+        macros: Compact macros from slim_ci_planner.load_manifest()
+
+    Returns:
+        Dictionary of unique ID to cache key
+    """
+    macro_hashes = deep_macro_hashes(macros)
+    keys = {}
+    for uid in nodes:
+        # Walk up iteratively so long chains of parents do not hit the recursion limit
+        pending = [uid]
+        while pending:
+            current = pending[-1]
+            if current in keys:
+                pending.pop()
+                continue
+            if missing := [p for p in nodes[current]['parents'] if p in nodes and p not in keys]:
+                pending.extend(missing)
+                continue
+            pending.pop()
+            node = nodes[current]
+            # Sources and other non-node parents are identified by name
+            parts = [node['checksum'] or '', node['config'],
+                     *sorted(macro_hashes.get(m, m) for m in node['macros']),
+                     *sorted(keys.get(p, p) for p in node['parents'])]
+            keys[current] = hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+    return keys
+
+
+def read_cache(conn, database: str, schema: str) -> Dict[str, str]:
+    """Return the cache key recorded for each node in the PR schema, empty if there is no cache yet."""
+    try:
+        rows = fetch_rows(conn, f"SELECT unique_id, cache_key FROM {database}.{schema}.{CACHE_TABLE};")
+    except Exception:
+        # First build of the PR, the schema or table does not exist yet
+        return {}
+    return {row['unique_id']: row['cache_key'] for row in rows}
+
+
+def find_hits(selected: Iterable[str], keys: Dict[str, str], cached: Dict[str, str]) -> Set[str]:
+    """Return the selected nodes whose current key matches the one they were last built with."""
+    return {uid for uid in selected if uid in keys and cached.get(uid) == keys[uid]}
+
+
+def get_record_queries(database: str, schema: str, built: Dict[str, str], failed: Iterable[str]) -> List[str]:
+    """Return SQL queries that store the keys of successfully built nodes and forget failed ones.
+
+    Args:
+        database: PR database
+        schema: PR schema
+        built: Cache key per successfully built unique ID
+        failed: Unique IDs that errored, failed or were skipped
+
+    Returns:
+        List of SQL queries
+    """
+    table = f"{database}.{schema}.{CACHE_TABLE}"
+    queries = [f"CREATE TABLE IF NOT EXISTS {table} (unique_id VARCHAR, cache_key VARCHAR, built_at TIMESTAMP_LTZ);"]
+    rows = sorted(built.items())
+    for start in range(0, len(rows), BATCH_SIZE):
+        values = ', '.join(f"('{uid}', '{key}')" for uid, key in rows[start:start + BATCH_SIZE])
+        queries.append(f"""MERGE INTO {table} t
+            USING (SELECT column1 AS unique_id, column2 AS cache_key FROM VALUES {values}) s
+            ON t.unique_id = s.unique_id
+            WHEN MATCHED THEN UPDATE SET cache_key = s.cache_key, built_at = CURRENT_TIMESTAMP()
+            WHEN NOT MATCHED THEN INSERT (unique_id, cache_key, built_at)
+                VALUES (s.unique_id, s.cache_key, CURRENT_TIMESTAMP());""")
+    failed = sorted(failed)
+    for start in range(0, len(failed), BATCH_SIZE):
+        unique_ids = ', '.join(f"'{uid}'" for uid in failed[start:start + BATCH_SIZE])
+        queries.append(f"DELETE FROM {table} WHERE unique_id IN ({unique_ids});")
+    return queries
+
+
+def render_cache_stats(plan_path: str) -> List[str]:
+    """Build the build cache line of the job summary from the plan written in plan mode."""
+    try:
+        with open(plan_path, 'r') as f:
+            stats = json.load(f).get('cache')
+    except (OSError, ValueError):
+        return []
+    if not stats or not stats['lookups']:
+        return []
+    return [f"- Build Cache: `{stats['hits']} of {stats['lookups']} selected nodes reused "
+            f"({stats['hits'] / stats['lookups']:.0%} hit rate)`"]
+
+
+def main() -> None:
+    """Skip or record cached nodes of a PR build.
+
+    BUILD_CACHE_MODE=plan (default) removes the selected nodes that were already built with the
+    same key from the planner's plan and prints their fqn: selectors for --exclude. BUILD_CACHE_MODE=record
+    stores the keys of the nodes in DBT_RUN_RESULTS that built successfully.
+    """
+    mode = os.getenv('BUILD_CACHE_MODE', 'plan').lower()
+    target_path = os.getenv('DBT_TARGET_PATH') or 'target'
+    plan_path = os.getenv('PLANNER_OUTPUT') or os.path.join(target_path, 'slim_ci_plan.json')
+    database = os.getenv('SNOWFLAKE_PR_DATABASE')
+    schema = f"github_pr_{os.getenv('GITHUB_PR_NUMBER')}"
+
+    try:
+        nodes, macros = load_manifest(os.path.join(target_path, 'manifest.json'))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Failed to read manifest: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    keys = compute_cache_keys(nodes, macros)
+
+    conn = connect_to_snowflake(os.getenv('SNOWFLAKE_DBT_USER'), os.getenv('SNOWFLAKE_DBT_PASSWORD'))
+    try:
+        if mode == 'record':
+            statuses = {}
+            with open(os.getenv('DBT_RUN_RESULTS') or os.path.join(target_path, 'run_results.json'), 'r') as f:
+                for key, result in iter_json_members(f, stream_keys={'results'}):
+                    if key == 'results':
+                        statuses[result['unique_id']] = result['status'].lower()
+            built = {uid: keys[uid] for uid, status in statuses.items() if status in CACHEABLE_STATUSES and uid in keys}
+            cur = conn.cursor()
+            for query in get_record_queries(database, schema, built, set(statuses) - set(built)):
+                cur.execute(query)
+            cur.close()
+            print(f"Recorded {len(built)} cache keys in {database}.{schema}.{CACHE_TABLE}", file=sys.stderr)
+            return
+
+        with open(plan_path, 'r') as f:
+            plan = json.load(f)
+        hits = find_hits(plan['selected'], keys, read_cache(conn, database, schema))
+        plan['cache'] = {'hits': len(hits), 'lookups': len(plan['selected'])}
+        plan['cached'] = sorted(hits)
+        plan['selected'] = sorted(set(plan['selected']) - hits)
+        with open(plan_path, 'w') as f:
+            json.dump(plan, f, indent=2)
+    finally:
+        conn.close()
+
+    print(f"{len(hits)} of {plan['cache']['lookups']} selected nodes are cached", file=sys.stderr)
+    print(' '.join(sorted(f"fqn:{nodes[uid]['fqn']}" for uid in hits)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import contextlib
+import importlib
+import io
+import os
+import sys
+import time
+from typing import List, Optional, Tuple
+
+# Subcommand to the script implementing it, imported only when the command runs so that
+# e.g. `summary` never loads the Snowflake connector or requests
+COMMANDS = {
+    'summary': 'dbt_job_summary',
+    'pr-lookup': 'github_pr_from_sha',
+    'build-cache': 'build_cache',
+    'pr-bootstrap': 'pr_env_bootstrap',
+    'schema-removal': 'dbt_pr_schema_removal',
+    'rbac': 'snowflake_rbac_setup',
+}
+
+# Environment variable a command's single-line output is exported to for the commands after it,
+# an empty export (e.g. no PR found) skips the remaining commands
+EXPORTS = {
+    'pr-lookup': 'GITHUB_PR_NUMBER',
+}
+
+USAGE = f"""Usage: python ci.py COMMAND[=OUTPUT_FILE] [COMMAND[=OUTPUT_FILE] ...]
+
+Runs each command in order in one process, sharing Snowflake sessions between them.
+A command's output goes to OUTPUT_FILE when given, otherwise to stdout. The remaining
+commands are skipped once one fails or pr-lookup finds no PR.
+
+Commands: {', '.join(COMMANDS)}"""
+
+
+def parse_commands(args: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """Split arguments like "summary=job_summary.md" into (command, output path) pairs.
+
+    Raises:
+        ValueError: If no command or an unknown command is given
+    """
+    if not args:
+        raise ValueError("No command given")
+    commands = []
+    for arg in args:
+        name, _, output_path = arg.partition('=')
+        if name not in COMMANDS:
+            raise ValueError(f"Unknown command: {name}")
+        commands.append((name, output_path or None))
+    return commands
+
+
+def run_command(name: str, output_path: Optional[str] = None) -> int:
+    """Import and run one command, timing both phases on stderr.
+
+    Args:
+        name: Command from COMMANDS
+        output_path: File the command's output is written to instead of stdout
+
+    Returns:
+        Exit status of the command
+    """
+    start = time.perf_counter()
+    module = importlib.import_module(COMMANDS[name])
+    imported = time.perf_counter()
+
+    # Output is buffered when it is redirected or exported, otherwise it streams
+    buffer = io.StringIO() if output_path or name in EXPORTS else None
+    status = 0
+    try:
+        with contextlib.redirect_stdout(buffer or sys.stdout):
+            # summary returns its comment instead of printing it
+            if (result := module.main()) is not None:
+                print(result)
+    except SystemExit as e:
+        # Like the interpreter, a message passed to sys.exit() is printed and exits with 1
+        if e.code is None or isinstance(e.code, int):
+            status = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            status = 1
+    finished = time.perf_counter()
+
+    if buffer is not None:
+        output = buffer.getvalue()
+        if output_path:
+            with open(output_path, 'w') as f:
+                f.write(output)
+        else:
+            sys.stdout.write(output)
+        if name in EXPORTS and status == 0 and len(output.strip().splitlines()) <= 1:
+            os.environ[EXPORTS[name]] = output.strip()
+
+    print(f"[ci] {name}: import {imported - start:.2f}s, run {finished - imported:.2f}s"
+          f"{f', exit {status}' if status else ''}", file=sys.stderr)
+    return status
+
+
+def process_age() -> Optional[float]:
+    """Return the seconds since the OS started this process, None where /proc is unavailable.
+
+    Unlike a timestamp taken in this module, this includes starting the interpreter itself.
+    """
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            # starttime is the 22nd field, the 20th after the parenthesized command name
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', 'r') as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(uptime - start_ticks / os.sysconf('SC_CLK_TCK'), 0.0)
+
+
+def main() -> None:
+    """Run the CI commands given on the command line in one process.
+
+    Stops at the first failing command and exits with its status, or after an empty export.
+    Startup since process start (including the interpreter), per-command import and run
+    times, and Snowflake session reuse are reported on stderr.
+    """
+    try:
+        commands = parse_commands(sys.argv[1:])
+    except ValueError as e:
+        print(f"Error: {str(e)}\n\n{USAGE}", file=sys.stderr)
+        sys.exit(1)
+
+    # The scripts import each other as top-level modules
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from helpers import close_shared_connections, connection_stats, share_connections
+
+    if (startup := process_age()) is not None:
+        print(f"[ci] startup: {startup:.2f}s", file=sys.stderr)
+    start = time.perf_counter()
+    share_connections()
+    status = 0
+    try:
+        for index, (name, output_path) in enumerate(commands):
+            if status := run_command(name, output_path):
+                break
+            if name in EXPORTS and not os.getenv(EXPORTS[name]) and index < len(commands) - 1:
+                print(f"[ci] {name}: nothing to export, skipping "
+                      f"{', '.join(command for command, _ in commands[index + 1:])}", file=sys.stderr)
+                break
+    finally:
+        close_shared_connections()
+
+    if connection_stats['opened']:
+        print(f"[ci] snowflake sessions: {connection_stats['opened']} opened in "
+              f"{connection_stats['seconds']:.2f}s, {connection_stats['reused']} reused", file=sys.stderr)
+    print(f"[ci] total: {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,23 @@
 import os
-import json
+from datetime import datetime, timedelta
 from math import floor
 from typing import Dict, List, Tuple, Any
 
+from artifacts import iter_json_members, short_unique_id
+from build_cache import render_cache_stats
+from performance import PerformanceCollector, render_performance
+from query_costs import fetch_query_history, render_query_costs, summarize_query_history
+from run_history import render_regressions
+
+# Alert levels used in the PR comment and the result statuses that raise them
+ALERT_TYPES = [("CAUTION", ['error', 'fail']), ("WARNING", ['warn'])]
+
+# Maximum number of alerts listed per alert level, the remainder is only counted
+DEFAULT_MAX_ALERTS = 50
+
+# Number of slowest models and tests listed in the performance section
+DEFAULT_TOP_NODES = 5
+
 def humanize_duration(seconds: float) -> str:
     """Convert seconds to human readable duration.
     
@@ -29,16 +44,36 @@ def humanize_duration(seconds: float) -> str:
     
     return ", ".join(parts) if parts else "0 sec"
 
-def fetch_run_results() -> Tuple[Dict[str, str], Dict[str, int], List[Dict[str, str]], str, str]:
+def format_alert(result: Dict[str, Any]) -> Dict[str, str]:
+    """Format a single error or warning result for the PR comment.
+
+    Args:
+        result: One entry of the run_results.json results array
+
+    Returns:
+        Dictionary with the unique ID, status and message of the result
+    """
+    return {
+        'Unique ID': f"`{short_unique_id(result['unique_id'])}`",
+        'Status': f"`{result['status'].lower()}`",
+        'Message': f"```{result.get('message', '')}```"
+    }
+
+def fetch_run_results() -> Tuple[Dict[str, str], Dict[str, int], Dict[str, List[Dict[str, str]]], str, str,
+                                 PerformanceCollector]:
     """Fetch and process dbt run results from environment variables and results file.
+
+    The results file is streamed in a single pass so only the status counters and a
+    bounded number of alerts per alert type are ever held in memory.
     
     Returns:
         Tuple containing:
-        - run_json: Summary of the run (commit, status, duration, link)
+        - run_json: Summary of the run (commit, status, duration, link, invocation ID and start)
         - status_counts: Count of successes, warnings, errors, and skips
-        - filtered_results: List of errors and warnings with details
+        - filtered_results: Errors and warnings with details, keyed by alert type
         - submitter: GitHub PR submitter username
         - comment_name: Name for the PR comment
+        - performance: Per-node timings for the performance section
     """
     # Map environment variable names to their keys
     env_vars = {k: os.getenv(v) for k, v in {
@@ -48,44 +83,67 @@ def fetch_run_results() -> Tuple[Dict[str, str], Dict[str, int], List[Dict[str,
         'submitter': 'GITHUB_PR_SUBMITTER',
         'sha': 'GITHUB_COMMIT_SHA',
         'run_id': 'GITHUB_RUN_ID',
-        'comment_name': 'GITHUB_PR_COMMENT_NAME'
+        'comment_name': 'GITHUB_PR_COMMENT_NAME',
+        'max_alerts': 'DBT_SUMMARY_MAX_ALERTS',
+        'top_nodes': 'DBT_SUMMARY_TOP_NODES'
     }.items()}
-    
-    try:
-        with open(env_vars['run_results'], 'r') as f:
-            run = json.load(f)
-            run_results = run['results']
-    except Exception as e:
-        print(f"Failed to read run results: {str(e)}")
-        return {}, {}, [], '', ''
+    max_alerts = int(env_vars['max_alerts'] or DEFAULT_MAX_ALERTS)
+    performance = PerformanceCollector(int(env_vars['top_nodes'] or DEFAULT_TOP_NODES))
 
     # Initialize counters for different status types
     status_counts = {'successes': 0, 'warnings': 0, 'errors': 0, 'skips': 0}
     # Map various status strings to our standardized categories
     status_map = {'success': 'successes', 'pass': 'successes', 'warn': 'warnings',
                  'error': 'errors', 'fail': 'errors', 'skipped': 'skips'}
-    
-    # Count occurrences of each status type
-    for result in run_results:
-        if status := status_map.get(result['status'].lower()):
-            status_counts[status] += 1
+    # Map result statuses that need attention to their alert level
+    alert_map = {status: alert_type for alert_type, statuses in ALERT_TYPES for status in statuses}
+    filtered_results = {alert_type: [] for alert_type, _ in ALERT_TYPES}
+    elapsed_time = 0.0
+    invocation_id = ''
+    generated_at = None
+
+    try:
+        with open(env_vars['run_results'], 'r') as f:
+            for key, value in iter_json_members(f, stream_keys={'results'}):
+                if key == 'elapsed_time':
+                    elapsed_time = float(value)
+                elif key == 'metadata':
+                    invocation_id = value.get('invocation_id', '')
+                    generated_at = value.get('generated_at')
+                elif key == 'args':
+                    performance.set_args(value)
+                elif key == 'results':
+                    status = value['status'].lower()
+
+                    # Count occurrences of each status type
+                    if status_key := status_map.get(status):
+                        status_counts[status_key] += 1
+
+                    # Keep the first results that need attention (errors and warnings)
+                    if (alert_type := alert_map.get(status)) and len(filtered_results[alert_type]) < max_alerts:
+                        filtered_results[alert_type].append(format_alert(value))
+
+                    performance.add(value)
+    except Exception as e:
+        print(f"Failed to read run results: {str(e)}")
+        return {}, {}, {}, '', '', performance
+
+    # The results are written when the invocation ends, a minute more allows for clock skew with Snowflake
+    started_at = None
+    if generated_at:
+        started_at = (datetime.fromisoformat(generated_at) - timedelta(seconds=elapsed_time + 60)).isoformat()
 
     # Prepare summary of the run
     run_json = {
         'Commit SHA': env_vars['sha'],
         'Status': env_vars['run_status'],
-        'Duration': humanize_duration(float(run['elapsed_time'])),
-        'Link': f"https://github.com/{env_vars['repo']}/actions/runs/{env_vars['run_id']}"
+        'Duration': humanize_duration(elapsed_time),
+        'Link': f"https://github.com/{env_vars['repo']}/actions/runs/{env_vars['run_id']}",
+        'Invocation ID': invocation_id,
+        'Started At': started_at
     }
 
-    # Filter and format results that need attention (errors and warnings)
-    filtered_results = [{
-        'Unique ID': f"`{'.'.join(r['unique_id'].split('.')[:3]).replace('dbt_clickup.', '')}`",
-        'Status': f"`{r['status'].lower()}`",
-        'Message': f"```{r.get('message', '')}```"
-    } for r in run_results if r['status'].lower() in ['error', 'warn', 'fail']]
-
-    return run_json, status_counts, filtered_results, env_vars['submitter'], env_vars['comment_name']
+    return run_json, status_counts, filtered_results, env_vars['submitter'], env_vars['comment_name'], performance
 
 def main() -> str:
     """Format the PR comment with run results and any alerts.
@@ -94,17 +152,26 @@ def main() -> str:
         Formatted markdown string for the PR comment
     """
     # Fetch all necessary data
-    job_results, run_results, alerts, pr_submitter, comment_name = fetch_run_results()
+    job_results, run_results, alerts, pr_submitter, comment_name, performance = fetch_run_results()
+    comment_name = comment_name or os.getenv('GITHUB_PR_COMMENT_NAME', '')
+    # The manifest is written next to run_results.json by the same dbt invocation
+    manifest_path = os.getenv('DBT_MANIFEST') or os.path.join(
+        os.path.dirname(os.getenv('DBT_RUN_RESULTS', '')), 'manifest.json')
     
     # Map job status to appropriate emoji indicators
     status_emoji = {
         'success': ':green_circle:', 
         'failure': ':red_circle:'
-    }.get(job_results['Status'].lower(), ':yellow_circle:')
+    }.get((job_results.get('Status') or '').lower(), ':yellow_circle:')
     
     # Choose emoji based on job type
     job_emoji = ':twisted_rightwards_arrows:' if comment_name.lower() == 'merge job' else ':test_tube:'
     
+    # No run results when the build was skipped, e.g. the slim CI plan selected nothing
+    if not job_results:
+        return "\n".join([f"## {job_emoji} dbt {comment_name} Summary",
+                          "No run results found, nothing was built. :zzz:"])
+
     # Build the basic summary section
     comment = [
         f"## {job_emoji} dbt {comment_name} Summary",
@@ -113,29 +180,45 @@ def main() -> str:
         f"- Job Duration: **`{job_results['Duration']}`**",
         f"- Job Status: {status_emoji} **`{job_results['Status']}`**",
         f"- Job Results: `{', '.join(f'{v} {k}' for k, v in run_results.items())}`",
+        *render_cache_stats(os.getenv('PLANNER_OUTPUT') or os.path.join(
+            os.path.dirname(os.getenv('DBT_RUN_RESULTS', '')), 'slim_ci_plan.json')),
         "---"
     ]
 
+    # Runtime regressions and per-node timings are appended after the results and alerts
+    performance_section = (render_regressions(performance.durations, performance.statuses)
+                           + render_performance(performance, manifest_path))
+
+    # Warehouse cost per node from the query history, opt-in as it needs a Snowflake connection
+    if os.getenv('DBT_QUERY_COSTS', 'false').lower() == 'true' or os.getenv('DBT_QUERY_HISTORY'):
+        query_history = fetch_query_history(job_results['Invocation ID'], job_results['Started At'])
+        performance_section += render_query_costs(summarize_query_history(query_history), performance.top_n)
+
     # If no issues found, return early with success message
-    if not alerts:
-        return "\n".join(comment + [f"No alerts found! :star_struck:"])
+    if not any(alerts.values()):
+        return "\n".join(comment + [f"No alerts found! :star_struck:"] + performance_section)
 
     # Process errors and warnings separately with different alert levels
-    for alert_type, status_filter in [("CAUTION", ['`error`', '`fail`']), ("WARNING", ['`warn`'])]:
-        if filtered_alerts := [a for a in alerts if a['Status'] in status_filter]:
+    alert_totals = {"CAUTION": run_results['errors'], "WARNING": run_results['warnings']}
+    for alert_type, _ in ALERT_TYPES:
+        if filtered_alerts := alerts[alert_type]:
             comment.append(f"\n> [!{alert_type}]")
             for alert in filtered_alerts:
                 comment.append(f"> 1. **{alert['Unique ID']}**")
                 comment.extend(f"    - {k}: {v}" for k, v in alert.items() if k != 'Unique ID')
+            if (remaining := alert_totals[alert_type] - len(filtered_alerts)) > 0:
+                comment.append(f"> 1. ...and {remaining} more, see the job run for details")
 
     # Add final note mentioning the PR submitter
     comment.extend([
         "\n> [!IMPORTANT]",
-        f"> @{pr_submitter} - Please resolve these dbt warnings/errors (if necessary). :smiley:"
+        f"> @{pr_submitter} - Please resolve these dbt warnings/errors (if necessary). :smiley:",
+        *performance_section
     ])
 
     comment_text = "\n".join(comment)
 
     return comment_text
 
-print(main())
\ No newline at end of file
+if __name__ == '__main__':
+    print(main())
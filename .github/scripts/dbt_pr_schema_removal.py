@@ -1,42 +1,179 @@
 import os
-from helpers import connect_to_snowflake, execute_queries
+import re
+import sys
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set
+
+import requests
+from helpers import connect_to_snowflake, execute_queries, fetch_rows, humanize_bytes, report_failures
 
 def get_removal_queries(database: str, schema: str) -> list[str]:
     """Return SQL queries needed to tear down the specified schema.
-    
+
     Args:
         database: Name of the Snowflake database
         schema: Name of the schema to be dropped
-        
+
     Returns:
         List of SQL queries to execute the teardown
     """
     return [
-        f"USE DATABASE {database};",
-        f"DROP SCHEMA IF EXISTS {schema} CASCADE;"
+        f"DROP SCHEMA IF EXISTS {database}.{schema} CASCADE;"
+    ]
+
+def list_pr_schemas(conn, database: str, repo_prefix: Optional[str] = None) -> List[Dict]:
+    """List every PR schema in the database with its size in a single metadata query.
+
+    Args:
+        conn: Snowflake connection
+        database: Name of the Snowflake PR database
+        repo_prefix: Repository name prefix of the PR schemas, if they are prefixed (see profiles.yml)
+
+    Returns:
+        List of dictionaries with schema name, PR number, last altered time and bytes
+    """
+    # Only match this repository's schemas, other repos may share the PR database
+    pattern = re.compile(rf'^{re.escape(repo_prefix) + "__" if repo_prefix else ""}github_pr_(\d+)$', re.I)
+    rows = fetch_rows(conn, f"""
+        SELECT s.schema_name, s.last_altered, COALESCE(SUM(t.bytes), 0) AS bytes
+        FROM {database}.INFORMATION_SCHEMA.SCHEMATA s
+        LEFT JOIN {database}.INFORMATION_SCHEMA.TABLES t ON t.table_schema = s.schema_name
+        WHERE REGEXP_LIKE(s.schema_name, '.*GITHUB_PR_[0-9]+', 'i')
+        GROUP BY s.schema_name, s.last_altered;""")
+    return [{
+        'schema': row['schema_name'],
+        'pr_number': int(match.group(1)),
+        'last_altered': row['last_altered'],
+        'bytes': int(row['bytes'] or 0)
+    } for row in rows if (match := pattern.match(row['schema_name']))]
+
+def fetch_open_pr_numbers(repo: str, token: str, session: Optional[requests.Session] = None) -> Set[int]:
+    """Fetch the numbers of all open PRs, 100 per page.
+
+    Args:
+        repo: Repository in owner/name form
+        token: GitHub token
+        session: Optional session to reuse connections
+
+    Returns:
+        Set of open PR numbers
+    """
+    session = session or requests.Session()
+    url = f"{os.getenv('GITHUB_API_URL', 'https://api.github.com')}/repos/{repo}/pulls"
+    headers = {
+        "Accept": "application/vnd.github.v3+json",
+        "Authorization": f"Bearer {token}"
+    }
+    params = {'state': 'open', 'per_page': 100}
+
+    numbers = set()
+    while url:
+        response = session.get(url, headers=headers, params=params, timeout=30)
+        response.raise_for_status()
+        numbers.update(pr['number'] for pr in response.json())
+        # Follow the Link header, which already carries the query parameters
+        url, params = response.links.get('next', {}).get('url'), None
+    return numbers
+
+
+def find_stale_schemas(schemas: List[Dict], open_prs: Set[int], max_age_days: Optional[float] = None,
+                       now: Optional[datetime] = None) -> List[Dict]:
+    """Select PR schemas whose PR is no longer open.
+
+    Args:
+        schemas: PR schemas from list_pr_schemas()
+        open_prs: Numbers of the currently open PRs
+        max_age_days: If set, only schemas untouched for at least this many days are stale
+        now: Reference time for the age threshold, defaults to the current time
+
+    Returns:
+        Stale schemas, largest first
+    """
+    now = now or datetime.now(timezone.utc)
+    stale = [
+        schema for schema in schemas
+        if schema['pr_number'] not in open_prs
+        and (max_age_days is None or (now - schema['last_altered']).total_seconds() >= max_age_days * 86400)
     ]
+    return sorted(stale, key=lambda schema: schema['bytes'], reverse=True)
+
+def sweep(conn, database: str, fetch_open_prs: Callable[[], Set[int]], max_age_days: Optional[float] = None,
+          repo_prefix: Optional[str] = None, dry_run: bool = False) -> list:
+    """Drop every orphaned PR schema in the database.
+
+    Args:
+        conn: Snowflake connection
+        database: Name of the Snowflake PR database
+        fetch_open_prs: Callable returning the numbers of the currently open PRs
+        max_age_days: Optional minimum age of a schema before it is dropped
+        repo_prefix: Repository name prefix of the PR schemas, if any
+        dry_run: Only report the stale schemas without dropping them
+
+    Returns:
+        List of QueryResult for the executed drops
+    """
+    schemas = list_pr_schemas(conn, database, repo_prefix)
+    stale = find_stale_schemas(schemas, fetch_open_prs(), max_age_days)
+    print(f"Found {len(schemas)} PR schemas, {len(stale)} stale")
+    for schema in stale:
+        print(f"- {schema['schema']} (PR #{schema['pr_number']}, {humanize_bytes(schema['bytes'])})")
+
+    if dry_run or not stale:
+        return []
+
+    queries = [query for schema in stale for query in get_removal_queries(database, schema['schema'])]
+    results = execute_queries(conn, queries)
+    reclaimed = sum(schema['bytes'] for schema, result in zip(stale, results) if result.success)
+    print(f"\nReclaimed {humanize_bytes(reclaimed)} from {sum(r.success for r in results)} schemas")
+    return results
 
 def main() -> None:
     """Execute schema teardown for PR environments.
-    
+
     Retrieves environment variables for PR number and database,
     connects to Snowflake, and drops the PR-specific schema.
+    With SCHEMA_REMOVAL_MODE=sweep, drops every PR schema whose PR is no longer open
+    (optionally only those older than SCHEMA_MAX_AGE_DAYS) instead.
     """
+    mode = os.getenv('SCHEMA_REMOVAL_MODE', 'single').lower()
     pr_number = os.getenv('GITHUB_PR_NUMBER')
     database = os.getenv('SNOWFLAKE_PR_DATABASE')
     schema = f'github_pr_{pr_number}'
 
+    # An empty number would target the github_pr_ prefix itself
+    if mode != 'sweep' and not (pr_number or '').isdigit():
+        print(f"Error: GITHUB_PR_NUMBER must be a PR number, got '{pr_number or ''}'", file=sys.stderr)
+        sys.exit(1)
+
+    if mode == 'sweep' and not all([os.getenv('GITHUB_REPOSITORY'), os.getenv('GITHUB_TOKEN')]):
+        print("Error: Missing required environment variables (GITHUB_REPOSITORY or GITHUB_TOKEN)", file=sys.stderr)
+        sys.exit(1)
+
     print(f"\nConnecting to Snowflake...")
     conn = connect_to_snowflake()
     print("Successfully connected to Snowflake")
-    
-    print(f"\nDropping schema {schema} from database {database}...")
-    queries = get_removal_queries(database, schema)
-    execute_queries(conn, queries)
-    
+
+    if mode == 'sweep':
+        max_age_days = float(os.environ['SCHEMA_MAX_AGE_DAYS']) if os.getenv('SCHEMA_MAX_AGE_DAYS') else None
+        print(f"\nSweeping stale PR schemas from database {database}...")
+        results = sweep(
+            conn, database,
+            lambda: fetch_open_pr_numbers(os.getenv('GITHUB_REPOSITORY'), os.getenv('GITHUB_TOKEN')),
+            max_age_days,
+            repo_prefix=os.getenv('PR_SCHEMA_PREFIX'),
+            dry_run=os.getenv('SCHEMA_REMOVAL_DRY_RUN', 'false').lower() == 'true'
+        )
+    else:
+        print(f"\nDropping schema {schema} from database {database}...")
+        queries = get_removal_queries(database, schema)
+        results = execute_queries(conn, queries)
+
     print("\nTeardown completed")
     conn.close()
     print("Connection closed")
 
+    report_failures(results)
+
 
-main()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -1,49 +1,167 @@
 import os
 import sys
+import json
+import time
 import requests
-from typing import Optional
+from typing import Dict, List, Optional
 
+# Commits resolved per GraphQL query
+GRAPHQL_BATCH_SIZE = 50
 
-def get_pr_from_sha(sha: str, repo: str, token: str) -> Optional[str]:
-    """
-    Get PR number associated with a commit SHA using GitHub REST API.
-    Returns PR number as string if found, empty string if not found, None if error.
+# Longest time to wait for a rate limit to reset before giving up, in seconds
+MAX_RATE_LIMIT_WAIT = 300
+
+
+class PullRequestResolver:
+    """Resolve commit SHAs to PR numbers with connection reuse, caching and retries.
+
+    - Found SHA to PR mappings never change and are kept in a JSON file on disk
+    - REST lookups send the last ETag, so unchanged answers come back as a free 304
+    - Rate limited and failed requests are retried, honouring Retry-After and X-RateLimit-Reset
+    - Many SHAs are resolved with one GraphQL query per GRAPHQL_BATCH_SIZE commits
     """
-    try:
-        # Split repo into owner/repo
-        owner, repo_name = repo.split('/')
-        
-        # GitHub API endpoint
-        url = f"https://api.github.com/repos/{owner}/{repo_name}/commits/{sha}/pulls"
-        
-        # Headers for GitHub API
-        headers = {
+
+    def __init__(self, repo: str, token: str, cache_path: Optional[str] = None, api_url: Optional[str] = None,
+                 graphql_url: Optional[str] = None, session: Optional[requests.Session] = None,
+                 max_retries: int = 5):
+        self.owner, self.repo_name = repo.split('/')
+        self.api_url = (api_url or os.getenv('GITHUB_API_URL') or 'https://api.github.com').rstrip('/')
+        self.graphql_url = graphql_url or os.getenv('GITHUB_GRAPHQL_URL') or f"{self.api_url}/graphql"
+        self.cache_path = cache_path
+        self.max_retries = max_retries
+
+        # Persistent session so every lookup reuses the same TLS connection
+        self.session = session or requests.Session()
+        self.session.headers.update({
             "Accept": "application/vnd.github.v3+json",
             "Authorization": f"Bearer {token}"
-        }
-        
-        # Make API request
-        response = requests.get(url, headers=headers)
-        
-        # Check for rate limiting
-        if response.status_code == 403 and 'X-RateLimit-Remaining' in response.headers:
-            print(f"Error: GitHub API rate limit exceeded. Reset at: {response.headers['X-RateLimit-Reset']}", 
-                  file=sys.stderr)
+        })
+
+        self.cache = {'prs': {}, 'etags': {}}
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r') as f:
+                    self.cache.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable PR cache: {e}", file=sys.stderr)
+
+    def save(self) -> None:
+        """Write the cache to disk, replacing the previous file atomically."""
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        with open(f"{self.cache_path}.tmp", 'w') as f:
+            json.dump(self.cache, f)
+        os.replace(f"{self.cache_path}.tmp", self.cache_path)
+
+    def _retry_delay(self, response: Optional[requests.Response], attempt: int) -> Optional[float]:
+        """Return how long to wait before retrying, or None if the response should not be retried."""
+        if response is None or response.status_code >= 500:
+            return 2 ** attempt
+        if response.status_code not in (403, 429):
             return None
-            
-        # Check for successful response
+        if 'Retry-After' in response.headers:
+            return float(response.headers['Retry-After'])
+        if response.headers.get('X-RateLimit-Remaining') == '0' and 'X-RateLimit-Reset' in response.headers:
+            return max(float(response.headers['X-RateLimit-Reset']) - time.time(), 0) + 1
+        return None
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying on connection errors, server errors and rate limits."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=30, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                response = None
+
+            delay = self._retry_delay(response, attempt)
+            if delay is None or attempt == self.max_retries:
+                break
+            if delay > MAX_RATE_LIMIT_WAIT:
+                print(f"Error: GitHub API rate limit exceeded. Reset at: {response.headers.get('X-RateLimit-Reset')}",
+                      file=sys.stderr)
+                break
+            print(f"Retrying {url} in {delay:.0f}s", file=sys.stderr)
+            time.sleep(delay)
+
         response.raise_for_status()
-        
-        # Parse response
-        prs = response.json()
-        
-        # Return first PR number if any PRs found, empty string otherwise
-        return str(prs[0]['number']) if prs else ''
-        
+        return response
+
+    def get_pr(self, sha: str) -> str:
+        """Return the PR number for one SHA, or an empty string if it has no PR."""
+        if pr_number := self.cache['prs'].get(sha):
+            return pr_number
+
+        url = f"{self.api_url}/repos/{self.owner}/{self.repo_name}/commits/{sha}/pulls"
+        etag, cached = self.cache['etags'].get(url, (None, None))
+        response = self._request('GET', url, headers={'If-None-Match': etag} if etag else {})
+
+        if response.status_code == 304:
+            pr_number = cached
+        else:
+            prs = response.json()
+            pr_number = str(prs[0]['number']) if prs else ''
+            if response.headers.get('ETag'):
+                self.cache['etags'][url] = (response.headers['ETag'], pr_number)
+
+        if pr_number:
+            self.cache['prs'][sha] = pr_number
+        return pr_number
+
+    def get_prs(self, shas: List[str]) -> Dict[str, Optional[str]]:
+        """Return the PR number for many SHAs, resolving uncached ones in GraphQL batches.
+
+        Returns:
+            Dictionary of SHA to PR number, empty string if it has no PR,
+            None if the commit does not exist
+        """
+        results = {sha: self.cache['prs'][sha] for sha in shas if sha in self.cache['prs']}
+        pending = [sha for sha in dict.fromkeys(shas) if sha not in results]
+
+        for start in range(0, len(pending), GRAPHQL_BATCH_SIZE):
+            batch = pending[start:start + GRAPHQL_BATCH_SIZE]
+            commits = "\n".join(
+                f'c{i}: object(oid: "{sha}") {{ ... on Commit {{ associatedPullRequests(first: 1) '
+                f'{{ nodes {{ number }} }} }} }}'
+                for i, sha in enumerate(batch)
+            )
+            query = f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {commits} }} }}"
+            response = self._request('POST', self.graphql_url, json={
+                'query': query,
+                'variables': {'owner': self.owner, 'name': self.repo_name}
+            })
+            payload = response.json()
+            if payload.get('errors') and not payload.get('data'):
+                raise ValueError(payload['errors'][0].get('message', 'GraphQL query failed'))
+
+            repository = payload['data']['repository']
+            for i, sha in enumerate(batch):
+                if (commit := repository.get(f'c{i}')) is None:
+                    results[sha] = None
+                    continue
+                nodes = commit['associatedPullRequests']['nodes']
+                results[sha] = str(nodes[0]['number']) if nodes else ''
+                if results[sha]:
+                    self.cache['prs'][sha] = results[sha]
+
+        return results
+
+
+def get_pr_from_sha(sha: str, repo: str, token: str, resolver: Optional[PullRequestResolver] = None) -> Optional[str]:
+    """
+    Get PR number associated with a commit SHA using GitHub REST API.
+    Returns PR number as string if found, empty string if not found, None if error.
+    """
+    try:
+        resolver = resolver or PullRequestResolver(repo, token)
+        return resolver.get_pr(sha)
+
     except requests.exceptions.RequestException as e:
         print(f"Error making API request: {e}", file=sys.stderr)
         return None
-    except (KeyError, IndexError) as e:
+    except (KeyError, IndexError, ValueError) as e:
         print(f"Error parsing API response: {e}", file=sys.stderr)
         return None
     except Exception as e:
@@ -54,24 +172,42 @@ def get_pr_from_sha(sha: str, repo: str, token: str) -> Optional[str]:
 def main():
     # Get required environment variables
     sha = os.getenv('GITHUB_COMMIT_SHA')
+    shas = os.getenv('GITHUB_COMMIT_SHAS', '').split()
     repo = os.getenv('GITHUB_REPOSITORY')
     token = os.getenv('GITHUB_TOKEN')
-    
+
     # Validate environment variables
-    if not all([sha, repo, token]):
-        print("Error: Missing required environment variables (GITHUB_SHA, GITHUB_REPOSITORY, or GITHUB_TOKEN)", 
+    if not all([sha or shas, repo, token]):
+        print("Error: Missing required environment variables (GITHUB_COMMIT_SHA, GITHUB_REPOSITORY, or GITHUB_TOKEN)",
               file=sys.stderr)
         sys.exit(1)
-    
+
+    resolver = PullRequestResolver(repo, token, cache_path=os.getenv('GITHUB_PR_CACHE'))
+
+    # Backfill mode: print "<sha> <pr number>" for every commit in one batch
+    if shas:
+        try:
+            prs = resolver.get_prs(shas)
+        except Exception as e:
+            print(f"Error resolving commits: {e}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            resolver.save()
+        for commit_sha in shas:
+            print(f"{commit_sha} {prs[commit_sha] or ''}".rstrip())
+        return
+
     # Get PR number
-    pr_number = get_pr_from_sha(sha, repo, token)
-    
+    pr_number = get_pr_from_sha(sha, repo, token, resolver)
+    resolver.save()
+
     if pr_number is None:
         # Error occurred, exit with non-zero status
         sys.exit(1)
-    
+
     # Print PR number (or empty string) to stdout
     print(pr_number)
 
 
-main()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,181 @@
 import os
-import snowflake.connector
-
-def connect_to_snowflake():
-    """Establish connection to Snowflake using environment variables."""
-    return snowflake.connector.connect(
-        account=os.getenv('SNOWFLAKE_ACCOUNT'),
-        user=os.getenv('SNOWFLAKE_ADMIN_USER'),
-        password=os.getenv('SNOWFLAKE_ADMIN_PASSWORD'),
-    )
-
-def execute_queries(conn, queries):
-    """Execute a list of queries in sequence."""
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+# Dependency stages in execution order, matched against the upper-cased statement.
+# Statements within a stage do not depend on each other and can run concurrently.
+QUERY_STAGES = [
+    ('databases and warehouses', r"CREATE (DATABASE|WAREHOUSE)\b"),
+    ('warehouse settings', r"ALTER WAREHOUSE\b"),
+    ('schemas', r"(CREATE|DROP) SCHEMA\b"),
+    ('relations', r"CREATE OR REPLACE (TABLE|VIEW)\b"),
+    ('roles', r"CREATE ROLE\b"),
+    ('grants', r"GRANT (?!OWNERSHIP\b|ROLE\b)"),
+    ('ownership', r"GRANT OWNERSHIP\b"),
+    ('users', r"CREATE USER\b"),
+    ('user defaults', r"ALTER USER\b"),
+    ('role memberships', r"GRANT ROLE\b"),
+]
+
+# Default number of statements executed concurrently
+DEFAULT_MAX_WORKERS = 8
+
+# Open connections per (account, user) while sharing is enabled, see share_connections()
+_shared_connections = None
+
+# Connections opened and reused while sharing is enabled, and the seconds spent opening them
+connection_stats = {'opened': 0, 'reused': 0, 'seconds': 0.0}
+
+class SharedConnection:
+    """Connection handed out while sharing is enabled, close() leaves it open for the next caller."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        pass
+
+def share_connections():
+    """Reuse one authenticated session per user for the rest of the process.
+
+    Used by ci.py when several commands run in one process, the sessions are closed by
+    close_shared_connections().
+    """
+    global _shared_connections
+    if _shared_connections is None:
+        _shared_connections = {}
+
+def close_shared_connections():
+    """Close every shared session and stop sharing."""
+    global _shared_connections
+    for conn in (_shared_connections or {}).values():
+        conn.close()
+    _shared_connections = None
+
+def connect_to_snowflake(user=None, password=None):
+    """Establish connection to Snowflake using environment variables.
+
+    Connects as the admin user unless another user and password are given. While sharing
+    is enabled, an open session of the same user is returned instead of a new one.
+    """
+    account = os.getenv('SNOWFLAKE_ACCOUNT')
+    user = user or os.getenv('SNOWFLAKE_ADMIN_USER')
+    password = password or os.getenv('SNOWFLAKE_ADMIN_PASSWORD')
+
+    if _shared_connections is not None:
+        conn = _shared_connections.get((account, user))
+        if conn is not None and not conn.is_closed():
+            connection_stats['reused'] += 1
+            return SharedConnection(conn)
+
+    # Imported here so scripts that never connect do not pay for loading the connector
+    import snowflake.connector
+
+    start = time.perf_counter()
+    conn = snowflake.connector.connect(account=account, user=user, password=password)
+    if _shared_connections is None:
+        return conn
+    connection_stats['opened'] += 1
+    connection_stats['seconds'] += time.perf_counter() - start
+    _shared_connections[(account, user)] = conn
+    return SharedConnection(conn)
+
+def humanize_bytes(size):
+    """Convert a byte count to a human readable size like "1.5 GB"."""
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size < 1024 or unit == 'TB':
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{int(size)} B"
+        size /= 1024
+
+@dataclass
+class QueryResult:
+    """Outcome of a single executed statement."""
+    query: str
+    stage: str
+    success: bool
+    elapsed: float
+    error: Optional[str] = None
+
+def get_stage(query):
+    """Return the index and name of the dependency stage a statement belongs to."""
+    statement = ' '.join(query.split()).upper()
+    for index, (name, pattern) in enumerate(QUERY_STAGES):
+        if re.match(pattern, statement):
+            return index, name
+    return len(QUERY_STAGES), 'other'
+
+def redact(query):
+    """Hide password literals before a statement is printed."""
+    return re.sub(r"(PASSWORD\s*=\s*)'[^']*'", r"\1'****'", query, flags=re.I)
+
+def execute_query(conn, query, stage):
+    """Execute a single query on its own cursor and capture the outcome."""
+    start = time.perf_counter()
+    cur = conn.cursor()
+    try:
+        cur.execute(query)
+        result = QueryResult(query, stage, True, time.perf_counter() - start)
+        print(f"Successfully executed: {redact(query)}")
+    except Exception as e:
+        result = QueryResult(query, stage, False, time.perf_counter() - start, str(e))
+        print(f"Error executing query: {redact(query)}\nError message: {str(e)}")
+    finally:
+        cur.close()
+    return result
+
+def execute_queries(conn, queries, max_workers=None):
+    """Execute a list of queries stage by stage, running each stage concurrently.
+
+    Statements are grouped into QUERY_STAGES so objects exist before they are granted on.
+    Statements within a stage are independent and are spread over a thread pool, each on
+    its own cursor of the shared connection. Statements that match no stage run last and
+    in their original order.
+
+    Returns:
+        List of QueryResult in the original statement order
+    """
+    max_workers = max_workers or int(os.getenv('SNOWFLAKE_MAX_CONCURRENT_QUERIES', DEFAULT_MAX_WORKERS))
+    stages = {}
+    for position, query in enumerate(queries):
+        stages.setdefault(get_stage(query), []).append((position, query))
+
+    results = [None] * len(queries)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for (index, name), statements in sorted(stages.items()):
+            start = time.perf_counter()
+            if index == len(QUERY_STAGES):
+                outcomes = [execute_query(conn, query, name) for _, query in statements]
+            else:
+                outcomes = list(pool.map(lambda statement: execute_query(conn, statement[1], name), statements))
+            for (position, _), outcome in zip(statements, outcomes):
+                results[position] = outcome
+            failed = sum(not outcome.success for outcome in outcomes)
+            print(f"Stage '{name}': {len(outcomes) - failed} succeeded, {failed} failed "
+                  f"in {time.perf_counter() - start:.1f}s")
+
+    return results
+
+def report_failures(results):
+    """Print failed statements and exit with a non-zero status if there are any."""
+    if failures := [result for result in results if not result.success]:
+        print(f"\n{len(failures)} of {len(results)} queries failed:")
+        for failure in failures:
+            print(f"- [{failure.stage}] {redact(failure.query)}\n  {failure.error}")
+        sys.exit(1)
+
+def fetch_rows(conn, query):
+    """Execute a query and return its rows as dictionaries keyed by lower-cased column name."""
     cur = conn.cursor()
-    for query in queries:
-        try:
-            cur.execute(query)
-            print(f"Successfully executed: {query}")
-        except Exception as e:
-            print(f"Error executing query: {query}")
-            print(f"Error message: {str(e)}")
-
-    cur.close() 
\ No newline at end of file
+    try:
+        cur.execute(query)
+        columns = [column[0].lower() for column in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+    finally:
+        cur.close()
@@ -0,0 +1,212 @@
+import heapq
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from artifacts import iter_json_members, short_unique_id
+
+# Characters used to draw thread occupancy, from idle to fully busy
+OCCUPANCY_BLOCKS = ' ░▒▓█'
+
+# Number of time buckets drawn per thread in the occupancy timeline
+TIMELINE_WIDTH = 40
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """Convert an ISO-8601 timestamp from run_results.json to epoch seconds."""
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+class PerformanceCollector:
+    """Accumulate per-node timings from run results one result at a time.
+
+    Only the N slowest nodes per resource type are kept in full, alongside a small
+    duration per executed node for the critical path and one interval per node for
+    the thread timeline.
+    """
+
+    def __init__(self, top_n: int):
+        self.top_n = top_n
+        self.slowest: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
+        self.durations: Dict[str, float] = {}
+        self.statuses: Dict[str, str] = {}
+        self.intervals: Dict[str, List[Tuple[float, float]]] = defaultdict(list)
+        self.threads = 0
+
+    def add(self, result: Dict[str, Any]) -> None:
+        """Record the timing of a single run result."""
+        unique_id = result['unique_id']
+        seconds = float(result.get('execution_time') or 0)
+        self.durations[unique_id] = seconds
+        self.statuses[unique_id] = result['status'].lower()
+
+        # Keep a min-heap of the slowest nodes for each resource type
+        heap = self.slowest[unique_id.split('.')[0]]
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, (seconds, unique_id))
+        else:
+            heapq.heappushpop(heap, (seconds, unique_id))
+
+        # Wall-clock span of the node across its compile and execute steps
+        timing = result.get('timing') or []
+        starts = [t for t in (parse_timestamp(step.get('started_at')) for step in timing) if t]
+        ends = [t for t in (parse_timestamp(step.get('completed_at')) for step in timing) if t]
+        if starts and ends:
+            self.intervals[result.get('thread_id') or 'main'].append((min(starts), max(ends)))
+
+    def set_args(self, args: Dict[str, Any]) -> None:
+        """Record the invocation arguments, used for the configured thread count."""
+        self.threads = int(args.get('threads') or 0)
+
+
+def load_parent_map(manifest_path: str) -> Dict[str, List[str]]:
+    """Stream the parent map out of manifest.json.
+
+    Args:
+        manifest_path: Path to the manifest written by the same dbt invocation
+
+    Returns:
+        Dictionary of unique ID to the unique IDs it depends on, empty if unavailable
+    """
+    parents = {}
+    try:
+        with open(manifest_path, 'r') as f:
+            for key, value in iter_json_members(f):
+                if key != 'parent_map':
+                    continue
+                # Members of a streamed object come as (unique_id, parents), anything else
+                # (null, an array or a scalar) means the parent map is malformed
+                if not isinstance(value, tuple) or not isinstance(value[1], list):
+                    raise ValueError("parent_map is not an object of parent lists")
+                unique_id, node_parents = value
+                parents[unique_id] = node_parents
+    except (OSError, ValueError) as e:
+        print(f"Failed to read manifest: {str(e)}", file=sys.stderr)
+        return {}
+    return parents
+
+
+def critical_path(durations: Dict[str, float], parents: Dict[str, List[str]]) -> List[str]:
+    """Find the most expensive chain of dependent nodes executed in this run.
+
+    Nodes that were not executed (deferred or unselected) contribute no time and break
+    the chain, since the run never waited on them.
+
+    Args:
+        durations: Execution time in seconds per executed unique ID
+        parents: Upstream unique IDs per unique ID
+
+    Returns:
+        Unique IDs on the critical path, from the first node to the last
+    """
+    # Restrict the DAG to executed nodes and order it topologically
+    executed_parents = {uid: [p for p in parents.get(uid, []) if p in durations] for uid in durations}
+    children = defaultdict(list)
+    pending = {}
+    for uid, uid_parents in executed_parents.items():
+        pending[uid] = len(uid_parents)
+        for parent in uid_parents:
+            children[parent].append(uid)
+
+    finish = {}
+    previous = {}
+    ready = [uid for uid, count in pending.items() if count == 0]
+    while ready:
+        uid = ready.pop()
+        best = max(executed_parents[uid], key=lambda p: finish[p], default=None)
+        finish[uid] = durations[uid] + (finish[best] if best else 0)
+        previous[uid] = best
+        for child in children[uid]:
+            pending[child] -= 1
+            if pending[child] == 0:
+                ready.append(child)
+
+    if not finish:
+        return []
+
+    # Walk back from the node that finished last
+    path = []
+    node = max(finish, key=finish.get)
+    while node:
+        path.append(node)
+        node = previous[node]
+    return path[::-1]
+
+
+def thread_timeline(intervals: Dict[str, List[Tuple[float, float]]]) -> Tuple[float, List[Tuple[str, float, str]]]:
+    """Summarize how busy each thread was over the run.
+
+    Args:
+        intervals: (start, end) epoch seconds of each node, per thread
+
+    Returns:
+        Tuple of the run span in seconds and, per thread, its occupancy ratio and
+        a bar of TIMELINE_WIDTH characters showing when it was busy
+    """
+    if not intervals:
+        return 0.0, []
+    run_start = min(start for spans in intervals.values() for start, _ in spans)
+    run_end = max(end for spans in intervals.values() for _, end in spans)
+    span = max(run_end - run_start, 1e-9)
+    bucket = span / TIMELINE_WIDTH
+
+    rows = []
+    for thread in sorted(intervals):
+        busy = [0.0] * TIMELINE_WIDTH
+        for start, end in intervals[thread]:
+            # Spread each interval over the buckets it overlaps
+            first = min(int((start - run_start) / bucket), TIMELINE_WIDTH - 1)
+            last = min(int((end - run_start) / bucket), TIMELINE_WIDTH - 1)
+            for i in range(first, last + 1):
+                lo = run_start + i * bucket
+                busy[i] += max(0.0, min(end, lo + bucket) - max(start, lo))
+        occupancy = sum(busy) / span
+        bar = ''.join(OCCUPANCY_BLOCKS[min(round(b / bucket * (len(OCCUPANCY_BLOCKS) - 1)), len(OCCUPANCY_BLOCKS) - 1)]
+                      for b in busy)
+        rows.append((thread, occupancy, bar))
+    return span, rows
+
+
+def render_performance(collector: PerformanceCollector, manifest_path: str) -> List[str]:
+    """Build the performance section of the job summary.
+
+    Args:
+        collector: Timings gathered while reading run_results.json
+        manifest_path: Path to manifest.json for dependency information
+
+    Returns:
+        Markdown lines for the PR comment, empty if nothing was executed
+    """
+    if not collector.durations:
+        return []
+
+    lines = ["\n<details>", "<summary>:stopwatch: Performance</summary>\n"]
+
+    # Slowest models and tests
+    for resource_type, label in [('model', 'models'), ('test', 'tests')]:
+        if slowest := sorted(collector.slowest.get(resource_type, []), reverse=True):
+            lines.extend([f"**Slowest {label}**\n", "| Node | Execution time |", "| --- | --- |"])
+            lines.extend(f"| `{short_unique_id(uid)}` | {seconds:.1f}s |" for seconds, uid in slowest)
+            lines.append("")
+
+    # Longest chain of dependent nodes, left out without dependencies where it would only be the slowest node
+    parents = load_parent_map(manifest_path)
+    if parents and (path := critical_path(collector.durations, parents)):
+        total = sum(collector.durations[uid] for uid in path)
+        lines.append(f"**Critical path** ({total:.1f}s)\n")
+        lines.append(" → ".join(f"`{short_unique_id(uid)}` ({collector.durations[uid]:.1f}s)" for uid in path))
+        lines.append("")
+
+    # Thread occupancy over the run
+    span, rows = thread_timeline(collector.intervals)
+    if rows:
+        threads = max(collector.threads, len(rows))
+        busy = sum(occupancy for _, occupancy, _ in rows) / threads
+        lines.append(f"**Thread utilization** ({busy:.0%} of {threads} threads over {span:.1f}s)\n")
+        lines.append("```")
+        lines.extend(f"{thread:<10} |{bar}| {occupancy:>4.0%}" for thread, occupancy, bar in rows)
+        lines.append("```")
+
+    lines.append("</details>")
+    return lines
@@ -0,0 +1,157 @@
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, Set
+
+from artifacts import iter_json_members
+from helpers import connect_to_snowflake, execute_queries, report_failures
+
+# Resource types that are materialized as relations in the warehouse
+RELATION_TYPES = {'model', 'seed', 'snapshot'}
+
+
+def load_relations(path: str) -> Dict[str, Dict]:
+    """Stream the relation and dependencies of every node out of a manifest.json.
+
+    Args:
+        path: Path to the manifest
+
+    Returns:
+        Dictionary of unique ID to resource type, relation name, database, schema,
+        materialization and parent unique IDs
+    """
+    nodes = {}
+    with open(path, 'r') as f:
+        for key, member in iter_json_members(f, stream_keys={'nodes'}):
+            # Other members (metadata, sources, parent_map, ...) are yielded whole and not needed
+            if key != 'nodes':
+                continue
+            unique_id, value = member
+            nodes[unique_id] = {
+                'resource_type': value['resource_type'],
+                'relation_name': value.get('relation_name'),
+                'database': value.get('database'),
+                'schema': value.get('schema'),
+                'materialized': (value.get('config') or {}).get('materialized'),
+                'parents': (value.get('depends_on') or {}).get('nodes', []),
+            }
+    return nodes
+
+
+def ancestors_to_clone(selected: Iterable[str], nodes: Dict[str, Dict]) -> Set[str]:
+    """Return the unselected relations that the selected nodes read from.
+
+    Tests with any selected parent are built too (dbt's eager indirect selection),
+    so their other parents are included as well. Ephemeral models are inlined into
+    their children, so the search continues through them to the relations they read.
+    """
+    selected = set(selected)
+    selected |= {uid for uid, node in nodes.items()
+                 if node['resource_type'] == 'test' and any(p in selected for p in node['parents'])}
+
+    found, pending = set(), [p for uid in selected if uid in nodes for p in nodes[uid]['parents']]
+    while pending:
+        uid = pending.pop()
+        if uid in found or uid in selected or uid not in nodes:
+            continue
+        found.add(uid)
+        if nodes[uid]['materialized'] == 'ephemeral':
+            pending.extend(nodes[uid]['parents'])
+    return {uid for uid in found
+            if nodes[uid]['resource_type'] in RELATION_TYPES and nodes[uid]['materialized'] != 'ephemeral'}
+
+
+def get_clone_queries(unique_ids: Iterable[str], pr_nodes: Dict[str, Dict], prod_nodes: Dict[str, Dict]) -> List[str]:
+    """Return SQL queries that recreate production relations in the PR schema.
+
+    Tables are zero-copy clones, views become pointer views selecting from production
+    and ephemeral models have nothing to create.
+
+    Args:
+        unique_ids: Nodes to bring into the PR schema
+        pr_nodes: Nodes of the manifest parsed against the PR target
+        prod_nodes: Nodes of the deferred (production) manifest
+
+    Returns:
+        List of SQL queries to execute the bootstrap
+    """
+    schemas, relations = set(), []
+    for uid in sorted(unique_ids):
+        pr, prod = pr_nodes.get(uid), prod_nodes.get(uid)
+        if not pr or not prod or not prod['relation_name'] or not pr['relation_name']:
+            # New in this PR or ephemeral, there is no production relation to clone
+            continue
+        schemas.add(f"{pr['database']}.{pr['schema']}")
+        if prod['materialized'] == 'view':
+            relations.append(f"CREATE OR REPLACE VIEW {pr['relation_name']} AS SELECT * FROM {prod['relation_name']};")
+        else:
+            relations.append(f"CREATE OR REPLACE TABLE {pr['relation_name']} CLONE {prod['relation_name']};")
+
+    return [f"CREATE SCHEMA IF NOT EXISTS {schema};" for schema in sorted(schemas)] + relations
+
+
+def bootstrap(conn, plan: Dict, pr_nodes: Dict[str, Dict], prod_nodes: Dict[str, Dict],
+              dry_run: bool = False) -> list:
+    """Clone the production ancestors of the planned selection into the PR schema.
+
+    Args:
+        conn: Snowflake connection
+        plan: Plan written by slim_ci_planner.py
+        pr_nodes: Nodes of the manifest parsed against the PR target
+        prod_nodes: Nodes of the deferred (production) manifest
+        dry_run: Only print the statements without executing them
+
+    Returns:
+        List of QueryResult for the executed statements
+    """
+    # Nodes reused from the build cache already exist in the PR schema and must not be overwritten
+    clones = ancestors_to_clone(plan['selected'], pr_nodes) - set(plan.get('cached', []))
+    queries = get_clone_queries(clones, pr_nodes, prod_nodes)
+    print(f"Cloning {sum('CLONE' in query for query in queries)} tables and pointing "
+          f"{sum(' VIEW ' in query for query in queries)} views at production")
+
+    if dry_run:
+        for query in queries:
+            print(query)
+        return []
+    return execute_queries(conn, queries)
+
+
+def main() -> None:
+    """Bootstrap the PR schema from production before a PR build.
+
+    Reads the plan from PLANNER_OUTPUT (default target/slim_ci_plan.json), the PR manifest
+    from the dbt target path and the production manifest from DBT_STATE, then connects as
+    the dbt user. Once it succeeds the build can run without deferral.
+    """
+    target_path = os.getenv('DBT_TARGET_PATH') or 'target'
+    plan_path = os.getenv('PLANNER_OUTPUT') or os.path.join(target_path, 'slim_ci_plan.json')
+    prod_manifest = os.path.join(os.getenv('DBT_STATE') or '.github/artifacts/', 'manifest.json')
+
+    try:
+        with open(plan_path, 'r') as f:
+            plan = json.load(f)
+        pr_nodes = load_relations(os.path.join(target_path, 'manifest.json'))
+        prod_nodes = load_relations(prod_manifest)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Failed to read artifacts: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    dry_run = os.getenv('PR_BOOTSTRAP_DRY_RUN', 'false').lower() == 'true'
+    conn = None
+    if not dry_run:
+        print("\nConnecting to Snowflake...")
+        conn = connect_to_snowflake(os.getenv('SNOWFLAKE_DBT_USER'), os.getenv('SNOWFLAKE_DBT_PASSWORD'))
+        print("Successfully connected to Snowflake")
+
+    results = bootstrap(conn, plan, pr_nodes, prod_nodes, dry_run)
+
+    if conn:
+        conn.close()
+        print("Connection closed")
+
+    report_failures(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+import json
+import os
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from artifacts import short_unique_id
+from helpers import connect_to_snowflake, fetch_rows, humanize_bytes
+
+# Query history columns aggregated per node
+COST_COLUMNS = ['bytes_scanned', 'partitions_scanned', 'partitions_total',
+                'bytes_spilled_to_local_storage', 'bytes_spilled_to_remote_storage', 'execution_time']
+
+# Most queries returned by the query history table function per page
+RESULT_LIMIT = 10000
+
+# Pages of query history read before giving up, each going further back in time
+MAX_PAGES = 20
+
+
+def get_query_history_query(database: str, user: str, invocation_id: str, start: Optional[str] = None,
+                            end: Optional[str] = None) -> str:
+    """Return the query that fetches one page of the tagged queries of a dbt invocation.
+
+    Queries are tagged by macros/overwrite/query_tag.sql. The INFORMATION_SCHEMA table
+    function is used rather than ACCOUNT_USAGE, which lags by up to 45 minutes. It returns
+    at most RESULT_LIMIT of the user's queries, most recent first, before they are filtered
+    on the invocation, so every row carries the size and earliest end time of the unfiltered
+    page. A page without matching queries still returns one row, with nulls for the query.
+
+    Args:
+        database: Database whose INFORMATION_SCHEMA is queried
+        user: User that ran the invocation
+        invocation_id: dbt invocation ID in the query tags
+        start: Earliest end time of the queries, the last day when not given
+        end: Latest end time of the queries, now when not given
+    """
+    start = f"'{start}'::TIMESTAMP_LTZ" if start else "DATEADD('day', -1, CURRENT_TIMESTAMP())"
+    end = f",\n                END_TIME_RANGE_END => '{end}'::TIMESTAMP_LTZ" if end else ''
+    return f"""
+        WITH page AS (
+            SELECT query_id, query_tag, end_time, {', '.join(COST_COLUMNS)}
+            FROM TABLE({database}.INFORMATION_SCHEMA.QUERY_HISTORY_BY_USER(
+                USER_NAME => '{user}',
+                END_TIME_RANGE_START => {start}{end},
+                RESULT_LIMIT => {RESULT_LIMIT}))
+        )
+        SELECT page.query_id, page.query_tag, {', '.join(f"page.{column}" for column in COST_COLUMNS)},
+            stats.page_rows, stats.page_end
+        FROM (SELECT COUNT(*) AS page_rows, MIN(end_time) AS page_end FROM page) stats
+        LEFT JOIN page ON TRY_PARSE_JSON(page.query_tag):invocation_id::string = '{invocation_id}';"""
+
+
+def fetch_invocation_queries(conn, database: str, user: str, invocation_id: str,
+                             start: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Page back through the query history until every query since the invocation started is read.
+
+    Each page ends where the previous, full one started. Pages overlap by the queries at their
+    boundary, which are deduplicated by query ID.
+
+    Returns:
+        Query history rows of the invocation keyed by lower-cased column name
+    """
+    rows, end = {}, None
+    for _ in range(MAX_PAGES):
+        page = fetch_rows(conn, get_query_history_query(database, user, invocation_id, start, end))
+        rows.update((row['query_id'], row) for row in page if row.get('query_id'))
+        stats = page[0] if page else {'page_rows': 0, 'page_end': None}
+        if stats['page_rows'] < RESULT_LIMIT:
+            return list(rows.values())
+        page_end = stats['page_end'].isoformat() if hasattr(stats['page_end'], 'isoformat') else stats['page_end']
+        if page_end == end:
+            # More than RESULT_LIMIT queries ended at the same instant, paging cannot move on
+            break
+        end = page_end
+
+    print(f"Warning: stopped reading the query history after {len(rows)} queries of the invocation, "
+          f"its warehouse cost may be under-reported", file=sys.stderr)
+    return list(rows.values())
+
+
+def fetch_query_history(invocation_id: str, started_at: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Fetch the query history of a dbt invocation in bulk.
+
+    Reads DBT_QUERY_HISTORY as a JSON fixture of rows if set, otherwise connects as the dbt user.
+
+    Args:
+        invocation_id: dbt invocation ID in the query tags
+        started_at: ISO-8601 time the invocation started, bounds how far back the history is read
+
+    Returns:
+        Query history rows keyed by lower-cased column name, empty if they could not be fetched
+    """
+    if fixture := os.getenv('DBT_QUERY_HISTORY'):
+        with open(fixture, 'r') as f:
+            return json.load(f)
+
+    database = next(filter(None, map(os.getenv, ['SNOWFLAKE_PR_DATABASE', 'SNOWFLAKE_PRODUCTION_DATABASE',
+                                                 'SNOWFLAKE_DEVELOPMENT_DATABASE'])), None)
+    user = os.getenv('SNOWFLAKE_DBT_USER')
+    if not (database and user and invocation_id):
+        return []
+
+    try:
+        conn = connect_to_snowflake(user, os.getenv('SNOWFLAKE_DBT_PASSWORD'))
+        try:
+            return fetch_invocation_queries(conn, database, user, invocation_id, started_at)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"Failed to fetch query history: {str(e)}", file=sys.stderr)
+        return []
+
+
+def summarize_query_history(rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Sum the cost of every query per dbt node.
+
+    Args:
+        rows: Query history rows with a JSON query_tag and the COST_COLUMNS
+
+    Returns:
+        Dictionary of unique ID to query count and summed COST_COLUMNS,
+        with execution_time converted to warehouse seconds
+    """
+    summary = defaultdict(lambda: dict.fromkeys(['queries'] + COST_COLUMNS, 0))
+    for row in rows:
+        try:
+            unique_id = json.loads(row.get('query_tag') or '{}').get('unique_id')
+        except (ValueError, AttributeError):
+            continue
+        if not unique_id:
+            continue
+        node = summary[unique_id]
+        node['queries'] += 1
+        for column in COST_COLUMNS:
+            node[column] += row.get(column) or 0
+
+    for node in summary.values():
+        node['execution_time'] /= 1000
+    return dict(summary)
+
+
+def render_query_costs(summary: Dict[str, Dict[str, float]], top_n: Optional[int] = None) -> List[str]:
+    """Build the warehouse cost section of the job summary, most expensive nodes first.
+
+    Args:
+        summary: Output of summarize_query_history()
+        top_n: Number of nodes listed, None for all
+
+    Returns:
+        Markdown lines for the PR comment, empty if no tagged queries were found
+    """
+    if not summary:
+        return []
+
+    ranked = sorted(summary.items(), key=lambda item: item[1]['execution_time'], reverse=True)
+    total_seconds = sum(node['execution_time'] for node in summary.values())
+    total_bytes = sum(node['bytes_scanned'] for node in summary.values())
+
+    lines = [
+        "\n<details>",
+        "<summary>:money_with_wings: Warehouse cost</summary>\n",
+        f"{total_seconds:.1f} warehouse seconds and {humanize_bytes(total_bytes)} scanned "
+        f"across {len(summary)} nodes\n",
+        "| Node | Warehouse time | Scanned | Partitions scanned / total | Spilled (local / remote) |",
+        "| --- | --- | --- | --- | --- |"
+    ]
+    for unique_id, node in ranked[:top_n]:
+        pruning = (f"{node['partitions_scanned']:,} / {node['partitions_total']:,} "
+                   f"({1 - node['partitions_scanned'] / node['partitions_total']:.0%} pruned)"
+                   if node['partitions_total'] else "-")
+        spilled = (f"{humanize_bytes(node['bytes_spilled_to_local_storage'])} / "
+                   f"{humanize_bytes(node['bytes_spilled_to_remote_storage'])}"
+                   if node['bytes_spilled_to_local_storage'] or node['bytes_spilled_to_remote_storage'] else "-")
+        lines.append(f"| `{short_unique_id(unique_id)}` | {node['execution_time']:.1f}s | "
+                     f"{humanize_bytes(node['bytes_scanned'])} | {pruning} | {spilled} |")
+    if top_n is not None and len(ranked) > top_n:
+        lines.append(f"\n...and {len(ranked) - top_n} more nodes")
+
+    lines.append("</details>")
+    return lines
@@ -0,0 +1,255 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from helpers import fetch_rows
+from warehouses import normalize_size
+
+# Privileges assumed to make up ALL PRIVILEGES per object type. Snowflake expands ALL
+# differently per edition, so these are the core privileges the statements rely on.
+ALL_PRIVILEGES = {
+    'DATABASE': {'USAGE', 'MONITOR', 'CREATE SCHEMA'},
+    'SCHEMA': {'USAGE', 'MONITOR', 'CREATE TABLE', 'CREATE VIEW'},
+    'TABLE': {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'TRUNCATE', 'REFERENCES'},
+    'VIEW': {'SELECT', 'REFERENCES'},
+    'WAREHOUSE': {'USAGE', 'OPERATE', 'MONITOR', 'MODIFY'},
+}
+
+# Schema every database has that grants never apply to
+INFORMATION_SCHEMA = 'INFORMATION_SCHEMA'
+
+# Statement shapes produced by get_static_queries(), matched after whitespace is collapsed
+STATEMENT_PATTERNS = [
+    ('create', re.compile(r"^CREATE (DATABASE|WAREHOUSE|ROLE|USER) IF NOT EXISTS (\w+)\b", re.I)),
+    ('alter_warehouse', re.compile(r"^ALTER WAREHOUSE (\w+) SET (.+)$", re.I)),
+    ('drop_schema', re.compile(r"^DROP SCHEMA IF EXISTS (\w+)\.(\w+) CASCADE$", re.I)),
+    ('user_default', re.compile(r"^ALTER USER IF EXISTS (\w+) SET DEFAULT_WAREHOUSE = '?(\w+)'?$", re.I)),
+    ('role_grant', re.compile(r"^GRANT ROLE (\w+) TO (USER|ROLE) (\w+)$", re.I)),
+    ('bulk_grant', re.compile(r"^GRANT (.+?) ON (ALL|FUTURE) (SCHEMAS|TABLES|VIEWS) IN DATABASE (\w+) TO ROLE (\w+)"
+                              r"(?: COPY CURRENT GRANTS)?$", re.I)),
+    ('grant', re.compile(r"^GRANT (.+?) ON (DATABASE|WAREHOUSE) (\w+) TO ROLE (\w+)(?: COPY CURRENT GRANTS)?$", re.I)),
+]
+
+# Desired-state item: a tuple whose first element names the kind of check
+Item = Tuple
+
+
+def normalize(statement: str) -> str:
+    """Collapse whitespace and strip the trailing semicolon of a statement."""
+    return ' '.join(statement.split()).rstrip(';').strip()
+
+
+def parse_privileges(privileges: str, object_type: str) -> Set[str]:
+    """Split a privilege list, expanding ALL PRIVILEGES for the object type."""
+    parsed = {' '.join(p.split()).upper() for p in privileges.split(',')}
+    if 'ALL PRIVILEGES' in parsed or 'ALL' in parsed:
+        return ALL_PRIVILEGES[object_type]
+    return parsed
+
+
+def parse_statements(statements: List[str]) -> List[Tuple[str, Optional[Item]]]:
+    """Translate setup statements into the desired-state items they establish.
+
+    Statements that do not match a known shape map to None and are always executed.
+
+    Args:
+        statements: SQL statements as produced by get_static_queries()
+
+    Returns:
+        List of (statement to execute, desired-state item or None)
+    """
+    parsed = []
+    for statement in statements:
+        sql = normalize(statement)
+        kind, match = next(((k, m) for k, p in STATEMENT_PATTERNS if (m := p.match(sql))), (None, None))
+
+        if kind == 'create':
+            item = (match.group(1).lower(), match.group(2).upper())
+        elif kind == 'alter_warehouse':
+            item = ('warehouse_settings', match.group(1).upper(), frozenset(parse_settings(match.group(2)).items()))
+        elif kind == 'drop_schema':
+            item = ('no_schema', match.group(1).upper(), match.group(2).upper())
+        elif kind == 'user_default':
+            item = ('user_default', match.group(1).upper(), match.group(2).upper())
+        elif kind == 'role_grant':
+            item = ('role_grant', match.group(1).upper(), match.group(2).upper(), match.group(3).upper())
+        elif kind == 'bulk_grant':
+            object_type = match.group(3).upper().rstrip('S')
+            item = (f"grant_{match.group(2).lower()}", frozenset(parse_privileges(match.group(1), object_type)),
+                    object_type, match.group(4).upper(), match.group(5).upper())
+        elif kind == 'grant':
+            object_type = match.group(2).upper()
+            item = ('grant', frozenset(parse_privileges(match.group(1), object_type)),
+                    object_type, match.group(3).upper(), match.group(4).upper())
+        else:
+            item = None
+        parsed.append((f"{sql};", item))
+    return parsed
+
+
+def parse_settings(settings: str) -> Dict[str, str]:
+    """Parse "KEY = value" warehouse properties into normalized values."""
+    parsed = {key.upper(): value.strip("'").upper()
+              for key, value in re.findall(r"(\w+)\s*=\s*('[^']*'|\S+)", settings)}
+    if 'WAREHOUSE_SIZE' in parsed:
+        parsed['WAREHOUSE_SIZE'] = normalize_size(parsed['WAREHOUSE_SIZE'])
+    return parsed
+
+
+def item_database(item: Item) -> Optional[str]:
+    """Return the database a desired-state item depends on, None if it is account-level."""
+    kind = item[0]
+    if kind == 'no_schema':
+        return item[1]
+    if kind in ('grant_all', 'grant_future'):
+        return item[3]
+    if kind == 'grant' and item[2] == 'DATABASE':
+        return item[3]
+    return None
+
+
+def object_name(name: str) -> str:
+    """Normalize an object name returned by SHOW commands."""
+    return name.replace('"', '').upper()
+
+
+class AccountState:
+    """Snapshot of the objects and grants that exist in the account."""
+
+    def __init__(self):
+        self.objects: Dict[str, Set[str]] = defaultdict(set)
+        self.schemas: Dict[str, Set[str]] = defaultdict(set)
+        self.contents: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self.grants: Set[Tuple[str, str, str, str]] = set()
+        self.future_grants: Set[Tuple[str, str, str, str]] = set()
+        self.user_roles: Dict[str, Set[str]] = defaultdict(set)
+        self.warehouse_settings: Dict[str, Dict[str, str]] = {}
+        self.user_defaults: Dict[str, str] = {}
+
+    def has_privileges(self, privileges: Set[str], object_type: str, name: str, role: str) -> bool:
+        """Return True if the role owns the object or holds every listed privilege on it."""
+        if ('OWNERSHIP', object_type, name, role) in self.grants:
+            return True
+        return all((privilege, object_type, name, role) in self.grants for privilege in privileges)
+
+    def is_satisfied(self, item: Item) -> bool:
+        """Return True if the account already matches a desired-state item."""
+        kind = item[0]
+        # A database that does not exist yet is created with its default schemas (PUBLIC) and
+        # no contents, so nothing inside it can be considered in place
+        database = item_database(item)
+        if database is not None and database not in self.objects['database']:
+            return False
+        if kind in ('database', 'warehouse', 'role', 'user'):
+            return item[1] in self.objects[kind]
+        if kind == 'warehouse_settings':
+            current = self.warehouse_settings.get(item[1], {})
+            return all(current.get(key) == value for key, value in item[2])
+        if kind == 'no_schema':
+            return item[2] not in self.schemas[item[1]]
+        if kind == 'user_default':
+            return self.user_defaults.get(item[1]) == item[2]
+        if kind == 'role_grant':
+            _, role, grantee_type, grantee = item
+            if grantee_type == 'USER':
+                return role in self.user_roles[grantee]
+            return ('USAGE', 'ROLE', role, grantee) in self.grants
+        if kind == 'grant':
+            _, privileges, object_type, name, role = item
+            return self.has_privileges(privileges, object_type, name, role)
+        if kind == 'grant_all':
+            _, privileges, object_type, database, role = item
+            return all(self.has_privileges(privileges, object_type, name, role)
+                       for name in self.contents[(object_type, database)])
+        if kind == 'grant_future':
+            _, privileges, object_type, database, role = item
+            return all((privilege, object_type, database, role) in self.future_grants for privilege in privileges)
+        return False
+
+
+def fetch_account_state(conn, items: List[Item]) -> AccountState:
+    """Read the current state of every object referenced by the desired-state items.
+
+    Uses one SHOW command per object kind, plus a few per referenced database and one per
+    referenced role and user that already exists, instead of one round trip per statement.
+
+    Args:
+        conn: Snowflake connection
+        items: Desired-state items from parse_statements()
+
+    Returns:
+        Snapshot of the account
+    """
+    state = AccountState()
+    for kind, command in [('database', 'DATABASES'), ('warehouse', 'WAREHOUSES'), ('role', 'ROLES'), ('user', 'USERS')]:
+        rows = fetch_rows(conn, f"SHOW {command};")
+        state.objects[kind] = {object_name(row['name']) for row in rows}
+        if kind == 'warehouse':
+            # Current settings in the same normalized form as parse_settings()
+            state.warehouse_settings = {object_name(row['name']): {
+                'WAREHOUSE_SIZE': normalize_size(row['size']),
+                'AUTO_SUSPEND': str(row.get('auto_suspend')),
+                # Single-cluster warehouses may report no cluster counts
+                'MIN_CLUSTER_COUNT': str(row.get('min_cluster_count') or 1),
+                'MAX_CLUSTER_COUNT': str(row.get('max_cluster_count') or 1),
+                'SCALING_POLICY': str(row.get('scaling_policy')).upper(),
+            } for row in rows}
+        elif kind == 'user':
+            state.user_defaults = {object_name(row['name']): object_name(row.get('default_warehouse') or '')
+                                   for row in rows}
+
+    databases = {item[3] for item in items if item[0] in ('grant_all', 'grant_future')}
+    databases |= {item[1] for item in items if item[0] == 'no_schema'}
+    roles = {item[-1] for item in items if item[0] in ('grant', 'grant_all', 'grant_future')}
+    roles |= {item[3] for item in items if item[0] == 'role_grant' and item[2] == 'ROLE'}
+    users = {item[3] for item in items if item[0] == 'role_grant' and item[2] == 'USER'}
+
+    for database in sorted(databases & state.objects['database']):
+        for row in fetch_rows(conn, f"SHOW SCHEMAS IN DATABASE {database};"):
+            schema = object_name(row['name'])
+            state.schemas[database].add(schema)
+            if schema != INFORMATION_SCHEMA:
+                state.contents[('SCHEMA', database)].add(f"{database}.{schema}")
+        # INFORMATION_SCHEMA has no row limit, unlike SHOW TABLES / SHOW VIEWS
+        for row in fetch_rows(conn, f"""SELECT table_schema, table_name, table_type
+                                         FROM {database}.INFORMATION_SCHEMA.TABLES
+                                         WHERE table_schema <> '{INFORMATION_SCHEMA}'
+                                           AND table_type IN ('BASE TABLE', 'VIEW');"""):
+            object_type = 'VIEW' if row['table_type'] == 'VIEW' else 'TABLE'
+            state.contents[(object_type, database)].add(
+                f"{database}.{object_name(row['table_schema'])}.{object_name(row['table_name'])}")
+        for row in fetch_rows(conn, f"SHOW FUTURE GRANTS IN DATABASE {database};"):
+            state.future_grants.add((row['privilege'].upper(), row['grant_on'].upper(),
+                                     object_name(row['name']).split('.')[0], object_name(row['grantee_name'])))
+
+    for role in sorted(roles & state.objects['role']):
+        for row in fetch_rows(conn, f"SHOW GRANTS TO ROLE {role};"):
+            state.grants.add((row['privilege'].upper(), row['granted_on'].upper(),
+                              object_name(row['name']), object_name(row['grantee_name'])))
+
+    for user in sorted(users & state.objects['user']):
+        for row in fetch_rows(conn, f"SHOW GRANTS TO USER {user};"):
+            state.user_roles[user].add(object_name(row['role']))
+
+    return state
+
+
+def plan_queries(conn, statements: List[str]) -> List[str]:
+    """Return only the statements whose effect is missing from the account.
+
+    Args:
+        conn: Snowflake connection
+        statements: SQL statements as produced by get_static_queries()
+
+    Returns:
+        Statements to execute, in their original order
+    """
+    parsed = parse_statements(statements)
+    state = fetch_account_state(conn, [item for _, item in parsed if item])
+
+    plan = []
+    for sql, item in parsed:
+        if (item is None or not state.is_satisfied(item)) and sql not in plan:
+            plan.append(sql)
+    return plan
+
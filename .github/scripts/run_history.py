@@ -0,0 +1,245 @@
+import itertools
+import os
+import sqlite3
+import statistics
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from artifacts import iter_json_members, short_unique_id
+
+# Statuses whose execution time is representative of a node's normal runtime
+SUCCESS_STATUSES = ('success', 'pass')
+
+# Number of recent successful runs per node used as the baseline
+DEFAULT_BASELINE_RUNS = 20
+
+# Minimum number of baseline runs before a node can be flagged
+MIN_BASELINE_RUNS = 5
+
+# Number of runs kept per node, older rows are pruned when recording
+DEFAULT_RETENTION_RUNS = 60
+
+# Robust z-score above which a runtime is considered a significant slowdown
+Z_THRESHOLD = 3.5
+
+# Slowdowns smaller than this many seconds are ignored as noise
+MIN_DELTA_SECONDS = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS node_timings (
+    unique_id TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    workflow TEXT,
+    recorded_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    execution_time REAL NOT NULL,
+    PRIMARY KEY (unique_id, commit_sha, run_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS node_timings_recent ON node_timings (unique_id, recorded_at);
+"""
+
+
+def get_history_path() -> str:
+    """Return the timing history location, next to the deferred manifest by default."""
+    return os.getenv('DBT_RUN_HISTORY') or os.path.join(os.getenv('DBT_STATE') or '.github/artifacts/',
+                                                       'run_history.db')
+
+
+def open_history(path: str) -> sqlite3.Connection:
+    """Open (and create if needed) the timing history database."""
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def iter_node_timings(run_results_path: str) -> Iterator[Tuple[str, str, float]]:
+    """Stream (unique_id, status, execution_time) for every node in run_results.json."""
+    with open(run_results_path, 'r') as f:
+        for key, result in iter_json_members(f, stream_keys={'results'}):
+            if key == 'results':
+                yield result['unique_id'], result['status'].lower(), float(result.get('execution_time') or 0)
+
+
+def record_run(conn: sqlite3.Connection, timings: Iterator[Tuple[str, str, float]], commit_sha: str,
+               run_id: str, workflow: str, retention: int = DEFAULT_RETENTION_RUNS) -> int:
+    """Append the timings of one run and prune each node to its most recent runs.
+
+    Args:
+        conn: Open timing history database
+        timings: (unique_id, status, execution_time) per node
+        commit_sha: Commit the run was built from
+        run_id: GitHub Actions run ID
+        workflow: Name of the workflow that produced the run
+        retention: Number of runs kept per node
+
+    Returns:
+        Number of rows recorded
+    """
+    recorded_at = datetime.now(timezone.utc).isoformat()
+    before = conn.total_changes
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO node_timings VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((uid, commit_sha, run_id, workflow, recorded_at, status, seconds) for uid, status, seconds in timings)
+        )
+        recorded = conn.total_changes - before
+        conn.execute("""
+            DELETE FROM node_timings
+            WHERE (unique_id, commit_sha, run_id) IN (
+                SELECT unique_id, commit_sha, run_id FROM (
+                    SELECT unique_id, commit_sha, run_id,
+                           row_number() OVER (PARTITION BY unique_id ORDER BY recorded_at DESC) AS recency
+                    FROM node_timings
+                ) WHERE recency > ?
+            )
+        """, (retention,))
+    return recorded
+
+
+def load_baseline(conn: sqlite3.Connection, runs: int = DEFAULT_BASELINE_RUNS) -> Dict[str, List[float]]:
+    """Return the most recent successful execution times per node."""
+    rows = conn.execute(f"""
+        SELECT unique_id, execution_time FROM (
+            SELECT unique_id, execution_time,
+                   row_number() OVER (PARTITION BY unique_id ORDER BY recorded_at DESC) AS recency
+            FROM node_timings
+            WHERE status IN ({', '.join('?' for _ in SUCCESS_STATUSES)})
+        ) WHERE recency <= ?
+    """, (*SUCCESS_STATUSES, runs))
+    baseline = {}
+    for unique_id, seconds in rows:
+        baseline.setdefault(unique_id, []).append(seconds)
+    return baseline
+
+
+def load_baseline_stats(conn: sqlite3.Connection, unique_ids: Iterable[str],
+                        runs: int = DEFAULT_BASELINE_RUNS) -> Dict[str, Dict[str, float]]:
+    """Summarize the most recent successful execution times of the given nodes.
+
+    SQLite reads only the history of the given nodes, newest first straight off the
+    (unique_id, recorded_at) index, and the statistics are computed one node at a time, so
+    only one row of statistics per node is held rather than the whole history.
+
+    Args:
+        conn: Open timing history database
+        unique_ids: Nodes to summarize, e.g. the ones executed in the current run
+        runs: Number of recent successful runs per node in the baseline
+
+    Returns:
+        Dictionary of unique ID to its baseline 'runs', 'p50', 'p95' and 'mad' (median absolute
+        deviation from the p50), for nodes with recorded successful runs
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS baseline_nodes (unique_id TEXT PRIMARY KEY) WITHOUT ROWID")
+    conn.execute("DELETE FROM baseline_nodes")
+    conn.executemany("INSERT OR IGNORE INTO baseline_nodes VALUES (?)", ((uid,) for uid in unique_ids))
+    # CROSS JOIN keeps the given nodes as the outer loop, so each node is one index range scan
+    # that already comes in recency order, with no sort over the whole history
+    rows = conn.execute(f"""
+        SELECT t.unique_id, t.execution_time
+        FROM baseline_nodes b CROSS JOIN node_timings t ON t.unique_id = b.unique_id
+        WHERE t.status IN ({', '.join('?' for _ in SUCCESS_STATUSES)})
+        ORDER BY b.unique_id, t.recorded_at DESC
+    """, SUCCESS_STATUSES)
+
+    baseline = {}
+    for unique_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+        history = [seconds for _, seconds in itertools.islice(group, runs)]
+        p50 = statistics.median(history)
+        baseline[unique_id] = {
+            'runs': len(history),
+            'p50': p50,
+            'p95': statistics.quantiles(history, n=20, method='inclusive')[-1] if len(history) > 1 else p50,
+            'mad': statistics.median(abs(x - p50) for x in history),
+        }
+    return baseline
+
+
+def detect_regressions(current: Dict[str, float], baseline: Dict[str, Dict[str, float]]) -> List[Dict[str, float]]:
+    """Flag nodes whose runtime is a significant outlier against their own history.
+
+    A node is flagged when it has enough history, runs slower than its baseline p95,
+    is at least MIN_DELTA_SECONDS slower than its p50 and its robust z-score (distance
+    from the median in units of the scaled median absolute deviation) exceeds Z_THRESHOLD.
+
+    Args:
+        current: Execution time in seconds per successfully executed unique ID
+        baseline: Baseline statistics per unique ID from load_baseline_stats()
+
+    Returns:
+        Regressions sorted by added seconds, each with unique_id, current, p50, p95 and z
+    """
+    regressions = []
+    for unique_id, seconds in current.items():
+        stats = baseline.get(unique_id)
+        if not stats or stats['runs'] < MIN_BASELINE_RUNS:
+            continue
+        p50, p95 = stats['p50'], stats['p95']
+        # Floor the spread so perfectly stable nodes are not flagged for tiny jitter
+        mad = max(stats['mad'], 0.01 * p50, 0.01)
+        z = 0.6745 * (seconds - p50) / mad
+        if seconds > p95 and seconds - p50 >= MIN_DELTA_SECONDS and z >= Z_THRESHOLD:
+            regressions.append({'unique_id': unique_id, 'current': seconds, 'p50': p50, 'p95': p95, 'z': z})
+    return sorted(regressions, key=lambda r: r['current'] - r['p50'], reverse=True)
+
+
+def render_regressions(current: Dict[str, float], statuses: Dict[str, str]) -> List[str]:
+    """Build the runtime regression callout of the job summary.
+
+    Args:
+        current: Execution time in seconds per executed unique ID
+        statuses: Lower-cased result status per executed unique ID
+
+    Returns:
+        Markdown lines for the PR comment, empty if there is no history or no regression
+    """
+    path = get_history_path()
+    if not os.path.exists(path):
+        return []
+    succeeded = {uid: seconds for uid, seconds in current.items() if statuses.get(uid) in SUCCESS_STATUSES}
+    try:
+        conn = open_history(path)
+        baseline = load_baseline_stats(conn, succeeded)
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"Failed to read run history: {str(e)}", file=sys.stderr)
+        return []
+
+    if not (regressions := detect_regressions(succeeded, baseline)):
+        return []
+
+    lines = ["\n> [!NOTE]", f"> **Runtime regressions** against the last {DEFAULT_BASELINE_RUNS} recorded runs:"]
+    lines.extend(
+        f"> 1. **`{short_unique_id(r['unique_id'])}`** {r['current']:.1f}s (p50 {r['p50']:.1f}s, p95 {r['p95']:.1f}s)"
+        for r in regressions
+    )
+    return lines
+
+
+def main() -> None:
+    """Append the timings of the current run to the history store.
+
+    Reads the run results path, commit SHA and run ID from environment variables.
+    """
+    run_results = os.getenv('DBT_RUN_RESULTS')
+    commit_sha = os.getenv('GITHUB_COMMIT_SHA')
+    run_id = os.getenv('GITHUB_RUN_ID')
+    workflow = os.getenv('GITHUB_WORKFLOW', '')
+    path = get_history_path()
+
+    if not all([run_results, commit_sha, run_id]):
+        print("Error: Missing required environment variables (DBT_RUN_RESULTS, GITHUB_COMMIT_SHA, or GITHUB_RUN_ID)",
+              file=sys.stderr)
+        sys.exit(1)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = open_history(path)
+    recorded = record_run(conn, iter_node_timings(run_results), commit_sha, run_id, workflow)
+    conn.execute("VACUUM")
+    conn.close()
+    print(f"Recorded {recorded} node timings in {path}")
+
+
+if __name__ == '__main__':
+    main()
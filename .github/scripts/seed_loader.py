@@ -0,0 +1,271 @@
+import csv
+import glob
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+
+from artifacts import iter_json_members
+from helpers import connect_to_snowflake, fetch_rows
+
+# Uncompressed bytes per chunk. Up to one chunk per compression worker is held in memory,
+# so this bounds the loader to ~0.5 GB with the default 8 workers
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+
+# Internal stage the chunks are uploaded to, created in the seed schema
+STAGE_NAME = 'seed_stage'
+
+# Prefix of the table comment holding the content hash of the loaded file
+HASH_COMMENT_PREFIX = 'sha256:'
+
+# Database environment variable per dbt target (see profiles.yml)
+TARGET_DATABASES = {
+    'dev': 'SNOWFLAKE_DEVELOPMENT_DATABASE',
+    'beta': 'SNOWFLAKE_PR_DATABASE',
+    'prod': 'SNOWFLAKE_PRODUCTION_DATABASE',
+}
+
+
+def get_seed_location(target: str) -> Tuple[str, str]:
+    """Return the database and schema dbt would load seeds into for a target.
+
+    Mirrors macros/overwrite/generate_schema_name.sql with the `static` schema that
+    dbt_project.yml assigns to seeds: beta targets use the PR schema, others use `static`.
+    """
+    database = os.getenv(TARGET_DATABASES[target])
+    schema = f"github_pr_{os.getenv('GITHUB_PR_NUMBER')}" if target == 'beta' else 'static'
+    return database, schema
+
+
+def file_hash(path: str) -> str:
+    """Return the SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_hash(path: str, column_types: Dict[str, str]) -> str:
+    """Return the hash recorded for a load, covering the file and the column types it was loaded with."""
+    return hashlib.sha256(f"{file_hash(path)}\n{json.dumps(column_types, sort_keys=True)}".encode()).hexdigest()
+
+
+def get_seed_configs(manifest_path: str) -> Dict[str, Dict]:
+    """Return the fqn and column_types config of every seed in a dbt manifest.
+
+    The column types are the same types `dbt seed` creates the tables with, so both load paths agree.
+
+    Returns:
+        Dictionary of lower-cased seed name to its dotted 'fqn' and 'column_types', a dictionary
+        of lower-cased column name to data type
+    """
+    configs = {}
+    with open(manifest_path, 'r') as f:
+        for key, member in iter_json_members(f, stream_keys={'nodes'}):
+            if key != 'nodes' or member[1]['resource_type'] != 'seed':
+                continue
+            node = member[1]
+            configs[node['name'].lower()] = {
+                'fqn': '.'.join(node['fqn']),
+                'column_types': {column.lower(): data_type for column, data_type
+                                 in ((node.get('config') or {}).get('column_types') or {}).items()},
+            }
+    return configs
+
+
+def get_exclude_selectors(tables: List[str], configs: Dict[str, Dict]) -> List[str]:
+    """Return fqn: selectors of the loaded seeds for `dbt build --exclude`.
+
+    A bare name would also exclude any other node or package of that name. Files that are not
+    seeds of the project are left out, dbt does not build them anyway.
+    """
+    return sorted(f"fqn:{configs[table.lower()]['fqn']}" for table in tables if table.lower() in configs)
+
+
+def iter_chunks(path: str, chunk_bytes: int) -> Iterator[Tuple[bytes, bytearray]]:
+    """Split a CSV into chunks of whole records, each yielded with the header line.
+
+    Each chunk is one contiguous buffer rather than a list of lines, so it takes little more
+    memory than its size. Quote parity is tracked across lines so records with quoted line
+    breaks are never split.
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        chunk, inside_quotes = bytearray(), False
+        for line in f:
+            chunk += line
+            inside_quotes ^= line.count(b'"') % 2 == 1
+            if len(chunk) >= chunk_bytes and not inside_quotes:
+                yield header, chunk
+                chunk = bytearray()
+        if chunk:
+            yield header, chunk
+
+
+def write_chunk(path: str, header: bytes, data: bytearray) -> str:
+    """Gzip one chunk to disk and return its path."""
+    with gzip.open(path, 'wb', compresslevel=6) as f:
+        f.write(header)
+        f.write(data)
+    return path
+
+
+def split_and_compress(path: str, directory: str, chunk_bytes: int, workers: int) -> Tuple[List[str], List[str]]:
+    """Split a CSV into gzipped chunks, compressing chunks in parallel.
+
+    At most `workers` chunks are in memory at once: the ones being compressed and the one
+    being read.
+
+    Returns:
+        Tuple of the CSV column names and the paths of the written chunks
+    """
+    table = os.path.splitext(os.path.basename(path))[0]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for index, (header, data) in enumerate(iter_chunks(path, chunk_bytes)):
+            # zlib releases the GIL, so threads compress concurrently
+            futures.append(pool.submit(write_chunk, os.path.join(directory, f"{table}_{index:05d}.csv.gz"),
+                                       header, data))
+            # Wait for the oldest chunk before reading the next one, so no more than
+            # workers - 1 chunks are queued or compressing while another is read
+            if len(futures) >= workers:
+                futures[-workers].result()
+        paths = [future.result() for future in futures]
+    with open(path, 'r', newline='') as f:
+        columns = [column.strip() for column in next(csv.reader(f))]
+    return columns, paths
+
+
+def get_load_queries(database: str, schema: str, table: str, columns: List[str], directory: str,
+                     content_hash: str, column_types: Dict[str, str]) -> List[str]:
+    """Return the statements that replace a seed table with the staged chunks of its CSV.
+
+    Columns get the seed's column_types config, columns without one are loaded as VARCHAR.
+    The content hash is only recorded once the COPY succeeds.
+    """
+    relation = f"{database}.{schema}.{table}"
+    definitions = ', '.join(f"{column} {column_types.get(column.lower(), 'VARCHAR')}" for column in columns)
+    stage = f"@{database}.{schema}.{STAGE_NAME}/{table}/"
+    return [
+        f"CREATE SCHEMA IF NOT EXISTS {database}.{schema};",
+        f"CREATE STAGE IF NOT EXISTS {database}.{schema}.{STAGE_NAME};",
+        f"REMOVE {stage};",
+        f"PUT 'file://{directory}/{table}_*.csv.gz' {stage} PARALLEL = 8 AUTO_COMPRESS = FALSE "
+        f"SOURCE_COMPRESSION = GZIP OVERWRITE = TRUE;",
+        f"CREATE OR REPLACE TABLE {relation} ({definitions});",
+        f"COPY INTO {relation} FROM {stage} FILE_FORMAT = (TYPE = CSV SKIP_HEADER = 1 "
+        f"FIELD_OPTIONALLY_ENCLOSED_BY = '\"' EMPTY_FIELD_AS_NULL = TRUE COMPRESSION = GZIP) "
+        f"ON_ERROR = ABORT_STATEMENT PURGE = TRUE;",
+        f"ALTER TABLE {relation} SET COMMENT = '{HASH_COMMENT_PREFIX}{content_hash}';",
+    ]
+
+
+def get_loaded_hashes(conn, database: str, schema: str) -> Dict[str, str]:
+    """Return the content hash recorded on each seed table in the schema."""
+    try:
+        rows = fetch_rows(conn, f"SHOW TABLES IN SCHEMA {database}.{schema};")
+    except Exception:
+        # Schema does not exist yet, nothing has been loaded
+        return {}
+    return {row['name'].lower(): row['comment'][len(HASH_COMMENT_PREFIX):]
+            for row in rows if (row.get('comment') or '').startswith(HASH_COMMENT_PREFIX)}
+
+
+def load_seeds(conn, paths: List[str], database: str, schema: str, column_types: Dict[str, Dict[str, str]],
+               chunk_bytes: int = DEFAULT_CHUNK_BYTES, workers: int = 8) -> Dict[str, str]:
+    """Bulk load CSV files into seed tables, skipping files whose contents are unchanged.
+
+    Args:
+        conn: Snowflake connection
+        paths: CSV files to load, the table name is the file name without extension
+        database: Target database
+        schema: Target schema
+        column_types: Column types per seed from get_seed_configs()
+        chunk_bytes: Uncompressed bytes per staged chunk
+        workers: Number of chunks compressed concurrently
+
+    Returns:
+        Dictionary of table name to 'loaded', 'unchanged' or the error message
+    """
+    loaded_hashes = get_loaded_hashes(conn, database, schema)
+    outcomes = {}
+    cur = conn.cursor()
+    for path in paths:
+        table = os.path.splitext(os.path.basename(path))[0]
+        types = column_types.get(table.lower(), {})
+        content_hash = load_hash(path, types)
+        if loaded_hashes.get(table.lower()) == content_hash:
+            print(f"Skipping {table}: unchanged since last load", file=sys.stderr)
+            outcomes[table] = 'unchanged'
+            continue
+
+        with tempfile.TemporaryDirectory() as directory:
+            columns, chunks = split_and_compress(path, directory, chunk_bytes, workers)
+            if untyped := [column for column in columns if column.lower() not in types]:
+                print(f"Warning: {table} has no column_types for {', '.join(untyped)}, loading them as VARCHAR",
+                      file=sys.stderr)
+            print(f"Loading {table} from {len(chunks)} compressed chunks...", file=sys.stderr)
+            try:
+                for query in get_load_queries(database, schema, table, columns, directory, content_hash, types):
+                    cur.execute(query)
+                outcomes[table] = 'loaded'
+                print(f"Successfully loaded {table} into {database}.{schema}", file=sys.stderr)
+            except Exception as e:
+                outcomes[table] = str(e)
+                print(f"Error loading {table}: {str(e)}", file=sys.stderr)
+    cur.close()
+    return outcomes
+
+
+def main() -> None:
+    """Bulk load seed CSVs into the seed schema of a dbt target.
+
+    Loads every CSV under seeds/ (or the paths in SEED_PATHS) into the database of
+    SEED_TARGET (default prod) as the dbt user, with the column types of the seed configs in
+    the manifest (SEED_MANIFEST, default target/manifest.json from `dbt parse`). Prints fqn:
+    selectors of the loaded seeds for `dbt build --exclude`, so dbt does not seed them again.
+    """
+    target = os.getenv('SEED_TARGET', 'prod')
+    paths = os.getenv('SEED_PATHS', '').split() or sorted(glob.glob('seeds/**/*.csv', recursive=True))
+    chunk_bytes = int(os.getenv('SEED_CHUNK_MB', '0')) * 1024 * 1024 or DEFAULT_CHUNK_BYTES
+    manifest_path = os.getenv('SEED_MANIFEST') or os.path.join(os.getenv('DBT_TARGET_PATH') or 'target',
+                                                               'manifest.json')
+    database, schema = get_seed_location(target)
+
+    if not database:
+        print(f"Error: Missing required environment variable {TARGET_DATABASES[target]}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        configs = get_seed_configs(manifest_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Failed to read seed configs, run `dbt parse` first: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    # Load as the dbt user so the tables are owned by the same role as the ones dbt creates
+    print("\nConnecting to Snowflake...", file=sys.stderr)
+    conn = connect_to_snowflake(os.getenv('SNOWFLAKE_DBT_USER'), os.getenv('SNOWFLAKE_DBT_PASSWORD'))
+    print("Successfully connected to Snowflake", file=sys.stderr)
+
+    print(f"\nLoading {len(paths)} seed files into {database}.{schema}...", file=sys.stderr)
+    column_types = {seed: config['column_types'] for seed, config in configs.items()}
+    outcomes = load_seeds(conn, paths, database, schema, column_types, chunk_bytes)
+
+    print("\nLoad completed", file=sys.stderr)
+    conn.close()
+    print("Connection closed", file=sys.stderr)
+
+    if failed := [table for table, outcome in outcomes.items() if outcome not in ('loaded', 'unchanged')]:
+        print(f"Failed to load: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+    print(' '.join(get_exclude_selectors(list(outcomes), configs)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+import glob
+import os
+import re
+import sys
+from typing import Dict, List, Tuple
+
+# Rows listed per failing check, the total count is always reported
+MAX_REPORTED_ROWS = 20
+
+# Column holding each record's line number in the file, named so it cannot clash with a seed column
+LINE_COLUMN = '_seed_line'
+
+# Snowflake type names without a DuckDB equivalent of the same name
+DUCKDB_TYPES = {
+    'number': 'decimal',
+    'numeric': 'decimal',
+    'string': 'varchar',
+    'text': 'varchar',
+    'float': 'double',
+    'timestamp_ntz': 'timestamp',
+    'timestamp_ltz': 'timestamptz',
+    'timestamp_tz': 'timestamptz',
+}
+
+# Seed referenced by a model, e.g. {{ ref('seed_nba_games') }}
+SEED_REF_PATTERN = re.compile(r"""ref\(\s*['"](\w+)['"]\s*\)""")
+
+
+def to_duckdb_type(data_type: str) -> str:
+    """Translate a declared Snowflake data type like NUMBER(38, 0) to DuckDB."""
+    name, _, args = data_type.strip().lower().partition('(')
+    name = DUCKDB_TYPES.get(name.strip(), name.strip())
+    return f"{name}({args}" if args else name
+
+
+def load_column_specs(model_paths: List[str], seeds: Dict[str, str]) -> Dict[str, Dict[str, Dict]]:
+    """Collect the declared type, not_null and unique constraints of every seed column.
+
+    Constraints are declared on the staging models in the _models.yml files. A model's columns
+    apply to the seed it selects from when the seed has a column of the same name; derived
+    columns like surrogate keys are not in the seed and are left to dbt.
+
+    Args:
+        model_paths: Directories holding the model SQL and YAML files
+        seeds: Dictionary of seed name to CSV path
+
+    Returns:
+        Dictionary of seed name to column name to {'data_type', 'not_null', 'unique'}
+    """
+    import yaml
+
+    sql_files = {os.path.splitext(os.path.basename(path))[0]: path
+                 for model_path in model_paths
+                 for path in glob.glob(os.path.join(model_path, '**', '*.sql'), recursive=True)}
+    yaml_files = [path for model_path in model_paths for ext in ('yml', 'yaml')
+                  for path in glob.glob(os.path.join(model_path, '**', f'*.{ext}'), recursive=True)]
+
+    specs = {}
+    for path in sorted(yaml_files):
+        with open(path, 'r') as f:
+            config = yaml.safe_load(f) or {}
+        for model in config.get('models') or []:
+            if model.get('name') not in sql_files:
+                continue
+            with open(sql_files[model['name']], 'r') as f:
+                refs = {name for name in SEED_REF_PATTERN.findall(f.read()) if name in seeds}
+            # Only models reading a single seed map their columns unambiguously
+            if len(refs) != 1:
+                continue
+            seed = refs.pop()
+            for column in model.get('columns') or []:
+                tests = {test if isinstance(test, str) else next(iter(test))
+                         for test in (column.get('tests') or column.get('data_tests') or [])}
+                spec = {
+                    'data_type': column.get('data_type'),
+                    'not_null': 'not_null' in tests,
+                    'unique': 'unique' in tests,
+                }
+                if any(spec.values()):
+                    specs.setdefault(seed, {})[column['name']] = spec
+    return specs
+
+
+def get_check_queries(table: str, columns: Dict[str, Dict]) -> List[Tuple[str, str, str]]:
+    """Return one query per declared constraint, each selecting the failing line numbers.
+
+    Args:
+        table: DuckDB relation holding the seed as VARCHAR columns plus LINE_COLUMN
+        columns: Column specs of the seed from load_column_specs()
+
+    Returns:
+        List of (column, check description, query) tuples
+    """
+    checks = []
+    for column, spec in columns.items():
+        quoted = f'"{column}"'
+        if spec['data_type']:
+            data_type = to_duckdb_type(spec['data_type'])
+            checks.append((column, f"not a valid {spec['data_type']}", f"""
+                SELECT {LINE_COLUMN}, {quoted} AS value FROM {table}
+                WHERE {quoted} IS NOT NULL AND TRY_CAST({quoted} AS {data_type}) IS NULL
+                ORDER BY {LINE_COLUMN}"""))
+        if spec['not_null']:
+            checks.append((column, "null", f"""
+                SELECT {LINE_COLUMN}, NULL AS value FROM {table}
+                WHERE {quoted} IS NULL
+                ORDER BY {LINE_COLUMN}"""))
+        if spec['unique']:
+            checks.append((column, "duplicated", f"""
+                SELECT {LINE_COLUMN}, {quoted} AS value FROM {table}
+                QUALIFY COUNT(*) OVER (PARTITION BY {quoted}) > 1 AND {quoted} IS NOT NULL
+                ORDER BY {quoted}, {LINE_COLUMN}"""))
+    return checks
+
+
+def load_seed(conn, path: str) -> List[str]:
+    """Read a seed CSV into the temp table `seed`, numbered by the line each record starts on.
+
+    DuckDB keeps the insertion order of the CSV scan, so rowid is the record's position in the
+    file. A record starts one line after the previous one plus the line breaks quoted in its
+    fields, which keeps the numbers right for multi-line records. Blank lines are skipped by
+    read_csv and not counted.
+
+    Args:
+        conn: DuckDB connection
+        path: Path to the seed CSV
+
+    Returns:
+        The header of the seed CSV
+    """
+    escaped = path.replace("'", "''")
+    conn.execute("SET preserve_insertion_order = true")
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE seed_records AS
+        SELECT * FROM read_csv('{escaped}', header = true, all_varchar = true)""")
+    header = [row[0] for row in conn.execute("DESCRIBE seed_records").fetchall()]
+
+    breaks = " + ".join(f"""coalesce(length("{column}") - length(replace("{column}", chr(10), '')), 0)"""
+                        for column in header) or "0"
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE seed AS
+        SELECT CAST(2 + coalesce(SUM(1 + {breaks}) OVER (
+                   ORDER BY rowid ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0) AS BIGINT) AS {LINE_COLUMN},
+               *
+        FROM seed_records""")
+    conn.execute("DROP TABLE seed_records")
+    return header
+
+
+def validate_seed(conn, path: str, columns: Dict[str, Dict]) -> List[str]:
+    """Validate one seed CSV against its declared column constraints.
+
+    The file is read once into a columnar DuckDB table of VARCHAR columns numbered by
+    load_seed(), and every check runs as a vectorized query over it. Reported line numbers
+    are the physical lines failing records start on.
+
+    Args:
+        conn: DuckDB connection
+        path: Path to the seed CSV
+        columns: Column specs of the seed from load_column_specs()
+
+    Returns:
+        List of error lines, empty when the seed is valid
+    """
+    header = load_seed(conn, path)
+    columns = {column: spec for column, spec in columns.items() if column in header}
+
+    errors = []
+    for column, description, query in get_check_queries('seed', columns):
+        rows = conn.execute(query).fetchall()
+        if not rows:
+            continue
+        errors.append(f"{path}: {len(rows)} rows with {column} {description}")
+        for line, value in rows[:MAX_REPORTED_ROWS]:
+            errors.append(f"  line {line}" + (f": {value!r}" if value is not None else ""))
+        if len(rows) > MAX_REPORTED_ROWS:
+            errors.append(f"  ... and {len(rows) - MAX_REPORTED_ROWS} more")
+    return errors
+
+
+def main() -> None:
+    """Validate the seed CSVs against the types and tests declared in the model YAML files.
+
+    Checks every CSV under seeds/ (or the paths in SEED_PATHS) with the constraints found under
+    models/ (or the directories in SEED_MODEL_PATHS), and exits non-zero if any row fails.
+    """
+    import duckdb
+
+    paths = os.getenv('SEED_PATHS', '').split() or sorted(glob.glob('seeds/**/*.csv', recursive=True))
+    model_paths = os.getenv('SEED_MODEL_PATHS', '').split() or ['models']
+    seeds = {os.path.splitext(os.path.basename(path))[0]: path for path in paths}
+
+    try:
+        specs = load_column_specs(model_paths, seeds)
+    except (OSError, ValueError) as e:
+        print(f"Failed to read model definitions: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    conn = duckdb.connect()
+    errors = []
+    for seed, path in seeds.items():
+        if seed not in specs:
+            print(f"{path}: no declared constraints, skipped")
+            continue
+        try:
+            seed_errors = validate_seed(conn, path, specs[seed])
+        except duckdb.Error as e:
+            seed_errors = [f"{path}: failed to read: {str(e)}"]
+        errors.extend(seed_errors)
+        if not seed_errors:
+            print(f"{path}: valid")
+    conn.close()
+
+    if errors:
+        print("\n".join(errors), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
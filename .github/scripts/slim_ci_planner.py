@@ -0,0 +1,310 @@
+import hashlib
+import json
+import os
+import sqlite3
+import statistics
+import sys
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from artifacts import iter_json_members
+from run_history import get_history_path, load_baseline, open_history
+
+# Resource types that are built (and can be selected) by dbt build
+BUILDABLE_TYPES = {'model', 'seed', 'snapshot', 'test'}
+
+# Config keys that vary between parses without changing what gets built
+VOLATILE_CONFIG_KEYS = {'meta', 'tags', 'docs'}
+
+# Estimated seconds for nodes that have never been timed and nothing else to go on
+DEFAULT_ESTIMATE = 1.0
+
+
+def digest(value) -> str:
+    """Return a stable hash of a JSON-serializable value."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def load_manifest(path: str) -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+    """Stream the fields needed for planning out of a manifest.json.
+
+    Args:
+        path: Path to the manifest
+
+    Returns:
+        Tuple of compact nodes and macros keyed by unique ID. Nodes carry their name,
+        dotted fully qualified name, resource type, checksum, config hash and node/macro
+        dependencies; macros carry a hash of their SQL and the macros they call.
+    """
+    nodes, macros = {}, {}
+    with open(path, 'r') as f:
+        # Other members (metadata, sources, parent_map, ...) are yielded whole and not needed
+        for key, member in iter_json_members(f, stream_keys={'nodes', 'macros'}):
+            if key == 'nodes':
+                unique_id, value = member
+                config = {k: v for k, v in (value.get('config') or {}).items() if k not in VOLATILE_CONFIG_KEYS}
+                nodes[unique_id] = {
+                    'name': value['name'],
+                    'fqn': '.'.join(value['fqn']),
+                    'resource_type': value['resource_type'],
+                    'checksum': (value.get('checksum') or {}).get('checksum'),
+                    'config': digest(config),
+                    'parents': (value.get('depends_on') or {}).get('nodes', []),
+                    'macros': (value.get('depends_on') or {}).get('macros', []),
+                }
+            elif key == 'macros':
+                unique_id, value = member
+                macros[unique_id] = {
+                    'hash': digest(value.get('macro_sql', '')),
+                    'macros': (value.get('depends_on') or {}).get('macros', []),
+                }
+    return nodes, macros
+
+
+def changed_macros(old_macros: Dict[str, Dict], new_macros: Dict[str, Dict]) -> Set[str]:
+    """Return macros whose SQL changed, directly or through a macro they call."""
+    changed = {uid for uid, macro in new_macros.items()
+               if uid not in old_macros or old_macros[uid]['hash'] != macro['hash']}
+
+    # Propagate to callers until nothing new is marked
+    callers = defaultdict(set)
+    for uid, macro in new_macros.items():
+        for callee in macro['macros']:
+            callers[callee].add(uid)
+    pending = list(changed)
+    while pending:
+        for caller in callers[pending.pop()]:
+            if caller not in changed:
+                changed.add(caller)
+                pending.append(caller)
+    return changed
+
+
+def modified_nodes(old_nodes: Dict[str, Dict], new_nodes: Dict[str, Dict], macros: Set[str]) -> Set[str]:
+    """Return buildable nodes that are new or whose code, config or macros changed."""
+    modified = set()
+    for uid, node in new_nodes.items():
+        if node['resource_type'] not in BUILDABLE_TYPES:
+            continue
+        old = old_nodes.get(uid)
+        if (old is None or old['checksum'] != node['checksum'] or old['config'] != node['config']
+                or any(macro in macros for macro in node['macros'])):
+            modified.add(uid)
+    return modified
+
+
+def child_map(nodes: Dict[str, Dict]) -> Dict[str, List[str]]:
+    """Invert the node dependencies into children per unique ID."""
+    children = defaultdict(list)
+    for uid, node in nodes.items():
+        for parent in node['parents']:
+            children[parent].append(uid)
+    return children
+
+
+def affected_nodes(modified: Set[str], nodes: Dict[str, Dict], depth: Optional[int] = None) -> Dict[str, int]:
+    """Return the modified nodes and their descendants with their distance from a modification.
+
+    Args:
+        modified: Modified unique IDs
+        nodes: Compact nodes of the new manifest
+        depth: Maximum number of generations of children to include, None for all
+
+    Returns:
+        Dictionary of unique ID to the number of edges from the closest modified node
+    """
+    children = child_map(nodes)
+    distance = {uid: 0 for uid in modified}
+    frontier = list(modified)
+    while frontier:
+        next_frontier = []
+        for uid in frontier:
+            if depth is not None and distance[uid] >= depth:
+                continue
+            for child in children[uid]:
+                if child not in distance and nodes[child]['resource_type'] in BUILDABLE_TYPES:
+                    distance[child] = distance[uid] + 1
+                    next_frontier.append(child)
+        frontier = next_frontier
+
+    # Tests are always built with the node they test
+    for uid, node in nodes.items():
+        if node['resource_type'] == 'test' and uid not in distance and any(p in distance for p in node['parents']):
+            distance[uid] = max(distance[p] for p in node['parents'] if p in distance)
+    return distance
+
+
+def estimate_seconds(unique_ids, history: Dict[str, List[float]]) -> Dict[str, float]:
+    """Estimate each node's build time as the median of its recorded runs."""
+    known = {uid: statistics.median(history[uid]) for uid in unique_ids if history.get(uid)}
+    fallback = statistics.median(known.values()) if known else DEFAULT_ESTIMATE
+    return {uid: known.get(uid, fallback) for uid in unique_ids}
+
+
+def select_within_budget(affected: Dict[str, int], nodes: Dict[str, Dict], estimates: Dict[str, float],
+                         budget: Optional[float], threads: int = 1) -> Set[str]:
+    """Pick the most valuable affected nodes whose estimated build time fits the budget.
+
+    Modified nodes are worth the most and children are worth less the further they are from
+    a modification. A node is only picked together with its affected ancestors, so every
+    build runs on top of the changed code rather than on production relations.
+
+    Args:
+        affected: Affected unique IDs with their distance from a modification
+        nodes: Compact nodes of the new manifest
+        estimates: Estimated seconds per unique ID
+        budget: Wall-clock budget in seconds, None to select every affected node
+        threads: Number of dbt threads the estimated time is spread over
+
+    Returns:
+        Selected unique IDs
+    """
+    if budget is None:
+        return set(affected)
+
+    def closure(uid: str) -> Set[str]:
+        """The node plus all of its affected ancestors."""
+        needed, pending = set(), [uid]
+        while pending:
+            current = pending.pop()
+            if current in needed:
+                continue
+            needed.add(current)
+            pending.extend(p for p in nodes[current]['parents'] if p in affected)
+        return needed
+
+    def value(uid: str) -> float:
+        return 1.0 / (1 + affected[uid])
+
+    selected, spent = set(), 0.0
+    for uid in sorted(affected, key=lambda u: value(u) / max(estimates[u], 1e-3), reverse=True):
+        additions = closure(uid) - selected
+        cost = sum(estimates[u] for u in additions) / threads
+        if spent + cost <= budget:
+            selected |= additions
+            spent += cost
+    return selected
+
+
+def to_selectors(selected: Set[str], nodes: Dict[str, Dict]) -> List[str]:
+    """Collapse selected unique IDs into a short list of dbt selectors.
+
+    Nodes are selected by their fully qualified name, which unlike the bare name cannot also
+    match a package node or test of the same name. A node whose every buildable descendant is
+    selected becomes `fqn:...+`, tests covered by an already selected parent are left to dbt's
+    indirect selection.
+    """
+    children = child_map(nodes)
+
+    def selected_descendants(uid: str) -> Optional[Set[str]]:
+        """Buildable descendants of a node, None as soon as one of them is not selected."""
+        found, pending = set(), list(children[uid])
+        while pending:
+            current = pending.pop()
+            if current not in found and nodes[current]['resource_type'] in BUILDABLE_TYPES:
+                # Stop early rather than walking the whole (possibly huge) subtree
+                if current not in selected:
+                    return None
+                found.add(current)
+                pending.extend(children[current])
+        return found
+
+    generation = {}
+
+    def get_generation(uid: str) -> int:
+        """Length of the longest chain of ancestors above a node."""
+        if uid not in generation:
+            generation[uid] = 1 + max((get_generation(p) for p in nodes[uid]['parents'] if p in nodes), default=-1)
+        return generation[uid]
+
+    covered, selectors = set(), []
+    # Visit upstream nodes first so the widest `+` selectors are emitted
+    for uid in sorted(selected, key=lambda u: (get_generation(u), nodes[u]['name'])):
+        if uid in covered:
+            continue
+        node = nodes[uid]
+        if node['resource_type'] == 'test' and any(p in selected for p in node['parents']):
+            continue
+        if below := selected_descendants(uid):
+            selectors.append(f"fqn:{node['fqn']}+")
+            covered |= below
+        else:
+            selectors.append(f"fqn:{node['fqn']}")
+        covered.add(uid)
+    return sorted(selectors)
+
+
+def plan(old_manifest: str, new_manifest: str, depth: Optional[int] = None, budget: Optional[float] = None,
+         threads: int = 1, history: Optional[Dict[str, List[float]]] = None) -> Dict:
+    """Compute the slim CI selection between two manifests.
+
+    Args:
+        old_manifest: Path to the deferred (production) manifest
+        new_manifest: Path to the manifest of the code under test
+        depth: Generations of children of modified nodes to build, None for all
+        budget: Optional wall-clock budget in seconds
+        threads: Number of dbt threads
+        history: Recorded execution times per unique ID
+
+    Returns:
+        Plan with the selectors, the selected and skipped unique IDs and the estimated time
+    """
+    old_nodes, old_macros = load_manifest(old_manifest)
+    new_nodes, new_macros = load_manifest(new_manifest)
+
+    modified = modified_nodes(old_nodes, new_nodes, changed_macros(old_macros, new_macros))
+    affected = affected_nodes(modified, new_nodes, depth)
+    estimates = estimate_seconds(affected, history or {})
+    selected = select_within_budget(affected, new_nodes, estimates, budget, threads)
+
+    return {
+        'selectors': to_selectors(selected, new_nodes),
+        'modified': sorted(modified),
+        'selected': sorted(selected),
+        'skipped': sorted(set(affected) - selected),
+        'estimated_seconds': round(sum(estimates[uid] for uid in selected) / threads, 1),
+    }
+
+
+def main() -> None:
+    """Print the --select list for the current change and write the full plan to disk.
+
+    Prints nothing when nothing needs to be built, and exits non-zero when planning fails.
+
+    Reads the deferred manifest from DBT_STATE and the new one from the dbt target path.
+    PLANNER_CHILD_DEPTH limits the generations of children (e.g. 1 for state:modified+1),
+    PLANNER_TIME_BUDGET caps the estimated build time in seconds.
+    """
+    old_manifest = os.path.join(os.getenv('DBT_STATE') or '.github/artifacts/', 'manifest.json')
+    new_manifest = os.path.join(os.getenv('DBT_TARGET_PATH') or 'target', 'manifest.json')
+    output = os.getenv('PLANNER_OUTPUT') or os.path.join(os.getenv('DBT_TARGET_PATH') or 'target',
+                                                        'slim_ci_plan.json')
+    depth = int(os.environ['PLANNER_CHILD_DEPTH']) if os.getenv('PLANNER_CHILD_DEPTH') else None
+    budget = float(os.environ['PLANNER_TIME_BUDGET']) if os.getenv('PLANNER_TIME_BUDGET') else None
+    threads = int(os.getenv('PLANNER_THREADS', '4'))
+
+    history = {}
+    if os.path.exists(get_history_path()):
+        try:
+            conn = open_history(get_history_path())
+            history = load_baseline(conn)
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Failed to read run history: {str(e)}", file=sys.stderr)
+
+    try:
+        result = plan(old_manifest, new_manifest, depth, budget, threads, history)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Failed to plan selection: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    print(f"{len(result['modified'])} modified, {len(result['selected'])} selected, "
+          f"{len(result['skipped'])} skipped by budget, ~{result['estimated_seconds']}s estimated", file=sys.stderr)
+    print(' '.join(result['selectors']))
+
+
+if __name__ == '__main__':
+    main()
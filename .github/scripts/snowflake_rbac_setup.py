@@ -1,70 +1,83 @@
 import os
-from helpers import connect_to_snowflake, execute_queries
+from typing import Optional
 
-def get_static_queries() -> list[str]:
+from helpers import connect_to_snowflake, execute_queries, redact, report_failures
+from rbac_reconcile import plan_queries
+from warehouses import get_role_warehouses, get_warehouse_queries, load_warehouses
+
+def get_static_queries(raw_databases: Optional[list[str]] = None,
+                       environment_databases: Optional[list[str]] = None,
+                       warehouses: Optional[dict[str, dict]] = None) -> list[str]:
     """Generate SQL queries for Snowflake RBAC setup.
+
+    Args:
+        raw_databases: Databases loaded by LOADER_ROLE, defaults to SNOWFLAKE_RAW_DATABASE
+        environment_databases: Databases built by TRANSFORMER_ROLE, defaults to the
+            development, PR and production databases
+        warehouses: Warehouse per workload, defaults to the config loaded by load_warehouses()
     
     Returns:
         list[str]: A list of SQL queries that:
         - Create databases, warehouses, and roles
         - Set up permissions for LOADER, TRANSFORMER, ANALYZER, and MONITOR roles
-        - Create users and assign roles
+        - Create users, assign roles and point them at their default warehouse
         - Configure role hierarchy and admin privileges
     """
     # Define databases using environment variables
-    raw_database = os.getenv('SNOWFLAKE_RAW_DATABASE')
+    raw_databases = raw_databases or [os.getenv('SNOWFLAKE_RAW_DATABASE')]
     development_database = os.getenv('SNOWFLAKE_DEVELOPMENT_DATABASE')
     pr_database = os.getenv('SNOWFLAKE_PR_DATABASE')  # PR database is used as BETA
     production_database = os.getenv('SNOWFLAKE_PRODUCTION_DATABASE')
     
-    environment_databases = [development_database, pr_database, production_database]
-    all_databases = [raw_database] + environment_databases
+    environment_databases = environment_databases or [development_database, pr_database, production_database]
+    all_databases = raw_databases + environment_databases
     
+    # Define warehouses from the declarative config (warehouses.yml)
+    warehouses = warehouses or load_warehouses()
+
     # Define roles
     roles = ["LOADER_ROLE", "TRANSFORMER_ROLE", "ANALYZER_ROLE", "MONITOR_ROLE"]
 
+    def default_warehouse(role: str) -> str:
+        return next(iter(get_role_warehouses(warehouses, role)), '')
+
     return [
         # Database Creation
         *[f"CREATE DATABASE IF NOT EXISTS {db};" for db in all_databases],
 
         # Drop public schemas
-        *[f"USE DATABASE {db};" for db in all_databases],
-        *[f"DROP SCHEMA IF EXISTS PUBLIC CASCADE;" for db in all_databases],
+        *[f"DROP SCHEMA IF EXISTS {db}.PUBLIC CASCADE;" for db in all_databases],
 
-        # Warehouse Creation
-        """CREATE WAREHOUSE IF NOT EXISTS X_SMALL_WH WITH
-            WAREHOUSE_SIZE = 'xsmall'
-            AUTO_SUSPEND = 60
-            AUTO_RESUME = true
-            INITIALLY_SUSPENDED = true;""",
+        # Warehouse Creation and sizing
+        *get_warehouse_queries(warehouses),
 
         # Role Creation
         *[f"CREATE ROLE IF NOT EXISTS {role};" for role in roles],
 
         # LOADER_ROLE Grants
-        "GRANT USAGE ON WAREHOUSE X_SMALL_WH TO ROLE LOADER_ROLE;",
-        f"GRANT USAGE ON DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT USAGE ON ALL SCHEMAS IN DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT CREATE SCHEMA ON DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT CREATE TABLE ON ALL SCHEMAS IN DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT SELECT, INSERT, UPDATE, DELETE ON ALL TABLES IN DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT CREATE VIEW ON ALL SCHEMAS IN DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT SELECT, REFERENCES ON ALL VIEWS IN DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT USAGE ON FUTURE SCHEMAS IN DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT CREATE TABLE ON FUTURE SCHEMAS IN DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT SELECT, INSERT, UPDATE, DELETE ON FUTURE TABLES IN DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT CREATE VIEW ON FUTURE SCHEMAS IN DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT SELECT, REFERENCES ON FUTURE VIEWS IN DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT OWNERSHIP ON DATABASE {raw_database} TO ROLE LOADER_ROLE COPY CURRENT GRANTS;",
-        f"GRANT OWNERSHIP ON ALL SCHEMAS IN DATABASE {raw_database} TO ROLE LOADER_ROLE COPY CURRENT GRANTS;",
-        f"GRANT OWNERSHIP ON ALL TABLES IN DATABASE {raw_database} TO ROLE LOADER_ROLE COPY CURRENT GRANTS;",
-        f"GRANT OWNERSHIP ON ALL VIEWS IN DATABASE {raw_database} TO ROLE LOADER_ROLE COPY CURRENT GRANTS;",
-        f"GRANT OWNERSHIP ON FUTURE SCHEMAS IN DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT OWNERSHIP ON FUTURE TABLES IN DATABASE {raw_database} TO ROLE LOADER_ROLE;",
-        f"GRANT OWNERSHIP ON FUTURE VIEWS IN DATABASE {raw_database} TO ROLE LOADER_ROLE;",
+        *[f"GRANT USAGE ON WAREHOUSE {wh} TO ROLE LOADER_ROLE;" for wh in get_role_warehouses(warehouses, 'LOADER_ROLE')],
+        *[f"GRANT USAGE ON DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT USAGE ON ALL SCHEMAS IN DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT CREATE SCHEMA ON DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT CREATE TABLE ON ALL SCHEMAS IN DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT SELECT, INSERT, UPDATE, DELETE ON ALL TABLES IN DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT CREATE VIEW ON ALL SCHEMAS IN DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT SELECT, REFERENCES ON ALL VIEWS IN DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT USAGE ON FUTURE SCHEMAS IN DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT CREATE TABLE ON FUTURE SCHEMAS IN DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT SELECT, INSERT, UPDATE, DELETE ON FUTURE TABLES IN DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT CREATE VIEW ON FUTURE SCHEMAS IN DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT SELECT, REFERENCES ON FUTURE VIEWS IN DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT OWNERSHIP ON DATABASE {db} TO ROLE LOADER_ROLE COPY CURRENT GRANTS;" for db in raw_databases],
+        *[f"GRANT OWNERSHIP ON ALL SCHEMAS IN DATABASE {db} TO ROLE LOADER_ROLE COPY CURRENT GRANTS;" for db in raw_databases],
+        *[f"GRANT OWNERSHIP ON ALL TABLES IN DATABASE {db} TO ROLE LOADER_ROLE COPY CURRENT GRANTS;" for db in raw_databases],
+        *[f"GRANT OWNERSHIP ON ALL VIEWS IN DATABASE {db} TO ROLE LOADER_ROLE COPY CURRENT GRANTS;" for db in raw_databases],
+        *[f"GRANT OWNERSHIP ON FUTURE SCHEMAS IN DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT OWNERSHIP ON FUTURE TABLES IN DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
+        *[f"GRANT OWNERSHIP ON FUTURE VIEWS IN DATABASE {db} TO ROLE LOADER_ROLE;" for db in raw_databases],
 
         # TRANSFORMER_ROLE Grants
-        "GRANT USAGE ON WAREHOUSE X_SMALL_WH TO ROLE TRANSFORMER_ROLE;",
+        *[f"GRANT USAGE ON WAREHOUSE {wh} TO ROLE TRANSFORMER_ROLE;" for wh in get_role_warehouses(warehouses, 'TRANSFORMER_ROLE')],
         # All databases - basic usage
         *[f"GRANT USAGE ON DATABASE {db} TO ROLE TRANSFORMER_ROLE;" for db in all_databases],
         *[f"GRANT USAGE ON ALL SCHEMAS IN DATABASE {db} TO ROLE TRANSFORMER_ROLE;" for db in all_databases],
@@ -93,7 +106,7 @@ def get_static_queries() -> list[str]:
         *[f"GRANT OWNERSHIP ON FUTURE VIEWS IN DATABASE {db} TO ROLE TRANSFORMER_ROLE;" for db in environment_databases],
 
         # ANALYZER_ROLE Grants
-        "GRANT USAGE ON WAREHOUSE X_SMALL_WH TO ROLE ANALYZER_ROLE;",
+        *[f"GRANT USAGE ON WAREHOUSE {wh} TO ROLE ANALYZER_ROLE;" for wh in get_role_warehouses(warehouses, 'ANALYZER_ROLE')],
         *[f"GRANT USAGE ON DATABASE {db} TO ROLE ANALYZER_ROLE;" for db in all_databases],
         *[f"GRANT USAGE ON ALL SCHEMAS IN DATABASE {db} TO ROLE ANALYZER_ROLE;" for db in all_databases],
         *[f"GRANT SELECT ON ALL TABLES IN DATABASE {db} TO ROLE ANALYZER_ROLE;" for db in all_databases],
@@ -103,7 +116,7 @@ def get_static_queries() -> list[str]:
         *[f"GRANT SELECT ON FUTURE VIEWS IN DATABASE {db} TO ROLE ANALYZER_ROLE;" for db in all_databases],
 
         # MONITOR_ROLE Grants
-        "GRANT MONITOR ON WAREHOUSE X_SMALL_WH TO ROLE MONITOR_ROLE;",
+        *[f"GRANT MONITOR ON WAREHOUSE {wh} TO ROLE MONITOR_ROLE;" for wh in warehouses],
         *[f"GRANT USAGE ON DATABASE {db} TO ROLE MONITOR_ROLE;" for db in all_databases],
         *[f"GRANT USAGE ON ALL SCHEMAS IN DATABASE {db} TO ROLE MONITOR_ROLE;" for db in all_databases],
 
@@ -112,25 +125,31 @@ def get_static_queries() -> list[str]:
             PASSWORD = '{os.getenv('SNOWFLAKE_GITHUB_PASSWORD')}'
             LOGIN_NAME = '{os.getenv('SNOWFLAKE_GITHUB_USER')}'
             MUST_CHANGE_PASSWORD = false
-            DEFAULT_WAREHOUSE = 'X_SMALL_WH'
+            DEFAULT_WAREHOUSE = '{default_warehouse('LOADER_ROLE')}'
             DEFAULT_ROLE = 'LOADER_ROLE';""",
         f"GRANT ROLE LOADER_ROLE TO USER {os.getenv('SNOWFLAKE_GITHUB_USER')};",
+        # Existing users keep their previous default, bring it in line with the config
+        f"ALTER USER IF EXISTS {os.getenv('SNOWFLAKE_GITHUB_USER')} SET DEFAULT_WAREHOUSE = '{default_warehouse('LOADER_ROLE')}';",
 
         f"""CREATE USER IF NOT EXISTS {os.getenv('SNOWFLAKE_DBT_USER')}
             PASSWORD = '{os.getenv('SNOWFLAKE_DBT_PASSWORD')}'
             LOGIN_NAME = '{os.getenv('SNOWFLAKE_DBT_USER')}'
             MUST_CHANGE_PASSWORD = false
-            DEFAULT_WAREHOUSE = 'X_SMALL_WH'
+            DEFAULT_WAREHOUSE = '{default_warehouse('TRANSFORMER_ROLE')}'
             DEFAULT_ROLE = 'TRANSFORMER_ROLE';""",
         f"GRANT ROLE TRANSFORMER_ROLE TO USER {os.getenv('SNOWFLAKE_DBT_USER')};",
+        # Existing users keep their previous default, bring it in line with the config
+        f"ALTER USER IF EXISTS {os.getenv('SNOWFLAKE_DBT_USER')} SET DEFAULT_WAREHOUSE = '{default_warehouse('TRANSFORMER_ROLE')}';",
 
         f"""CREATE USER IF NOT EXISTS {os.getenv('SNOWFLAKE_HEX_USER')}
             PASSWORD = '{os.getenv('SNOWFLAKE_HEX_PASSWORD')}'
             LOGIN_NAME = '{os.getenv('SNOWFLAKE_HEX_USER')}'
             MUST_CHANGE_PASSWORD = false
-            DEFAULT_WAREHOUSE = 'X_SMALL_WH'
+            DEFAULT_WAREHOUSE = '{default_warehouse('ANALYZER_ROLE')}'
             DEFAULT_ROLE = 'ANALYZER_ROLE';""",
         f"GRANT ROLE ANALYZER_ROLE TO USER {os.getenv('SNOWFLAKE_HEX_USER')};",
+        # Existing users keep their previous default, bring it in line with the config
+        f"ALTER USER IF EXISTS {os.getenv('SNOWFLAKE_HEX_USER')} SET DEFAULT_WAREHOUSE = '{default_warehouse('ANALYZER_ROLE')}';",
 
         # Role Hierarchy
         *[f"GRANT ROLE {role} TO ROLE SYSADMIN;" for role in roles],
@@ -162,20 +181,41 @@ def get_static_queries() -> list[str]:
 def main() -> None:
     """Execute the Snowflake RBAC setup process.
     
-    Connects to Snowflake, executes all setup queries, and closes the connection.
+    Connects to Snowflake, executes the setup queries, and closes the connection.
+    In reconcile mode (SNOWFLAKE_RBAC_MODE=reconcile) the current account state is read
+    first and only missing statements are executed. SNOWFLAKE_RBAC_DRY_RUN=true prints
+    the statements that would run without executing them.
     Prints progress messages to stdout.
     """
+    mode = os.getenv('SNOWFLAKE_RBAC_MODE', 'replay').lower()
+    dry_run = os.getenv('SNOWFLAKE_RBAC_DRY_RUN', 'false').lower() == 'true'
+
     print("\nConnecting to Snowflake...")
     conn = connect_to_snowflake()
     print("Successfully connected to Snowflake")
     
-    print("\nExecuting setup queries...")
     queries = get_static_queries()
-    execute_queries(conn, queries)
+    if mode == 'reconcile':
+        print("\nReading current account state...")
+        planned = plan_queries(conn, queries)
+        print(f"{len(planned)} of {len(queries)} setup queries need to be applied")
+        queries = planned
+
+    if dry_run:
+        print("\nDry run, the following queries would be executed:")
+        for query in queries:
+            print(redact(query))
+    else:
+        print("\nExecuting setup queries...")
+        results = execute_queries(conn, queries)
     
     print("\nSetup completed")
     conn.close()
     print("Connection closed")
 
+    if not dry_run:
+        report_failures(results)
+
 
-main()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
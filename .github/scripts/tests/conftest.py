@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The scripts import each other as top-level modules, as they do when run from .github/scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+@pytest.fixture
+def github():
+    """A FakeGitHub serving for the duration of the test."""
+    from fakes import FakeGitHub
+
+    server = FakeGitHub()
+    yield server
+    server.close()
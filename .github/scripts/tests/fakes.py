@@ -0,0 +1,112 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class FakeCursor:
+    """Cursor of a FakeConnection, answering queries with the rows registered for them."""
+
+    def __init__(self, conn: 'FakeConnection'):
+        self.conn = conn
+        self.description = []
+        self.rows = []
+
+    def execute(self, query: str) -> None:
+        self.conn.executed.append(query)
+        if self.conn.fail and re.search(self.conn.fail, query, re.I):
+            raise RuntimeError(f"Fake failure: {query}")
+        rows = self.conn.rows_for(query)
+        # Like SHOW output, every row has every column, missing ones are null
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        self.description = [(column,) for column in columns]
+        self.rows = [tuple(row.get(column) for column in columns) for row in rows]
+
+    def fetchall(self) -> List[tuple]:
+        return self.rows
+
+    def close(self) -> None:
+        pass
+
+
+class FakeConnection:
+    """Snowflake connection stand-in that records every statement it executes.
+
+    Args:
+        responses: Regular expression to the rows (dictionaries keyed by column name)
+            returned for matching queries, queries matching nothing return no rows
+        fail: Regular expression of queries that raise instead
+    """
+
+    def __init__(self, responses: Optional[Dict[str, List[Dict]]] = None, fail: Optional[str] = None):
+        self.responses = responses or {}
+        self.fail = fail
+        self.executed: List[str] = []
+        self.closed = False
+
+    def rows_for(self, query: str) -> List[Dict]:
+        sql = ' '.join(query.split())
+        return next((rows for pattern, rows in self.responses.items() if re.search(pattern, sql, re.I)), [])
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self)
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    def close(self) -> None:
+        self.closed = True
+
+
+# A route handler gets the recorded request and returns the status, JSON body (None for none) and headers
+Handler = Callable[[Dict], Tuple[int, object, Dict[str, str]]]
+
+
+class FakeGitHub:
+    """Local HTTP stand-in for the GitHub REST and GraphQL APIs, serving on a free port.
+
+    Requests are matched against `routes`, regular expressions of "METHOD /path?query" to
+    handlers, in insertion order. Unmatched requests get a 404. Every request is recorded
+    with its method, path, headers and parsed JSON body.
+    """
+
+    def __init__(self):
+        self.routes: Dict[str, Handler] = {}
+        self.requests: List[Dict] = []
+
+        fake = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def respond(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                request = {'method': self.command, 'path': self.path, 'headers': self.headers,
+                           'json': json.loads(body) if body else None}
+                fake.requests.append(request)
+                handler = next((handler for pattern, handler in fake.routes.items()
+                                if re.search(pattern, f"{self.command} {self.path}")), None)
+                status, payload, headers = handler(request) if handler else (404, {'message': 'Not Found'}, {})
+
+                data = b'' if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = respond
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RequestHandler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        # A short poll interval keeps shutdown() from holding up every test
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,86 @@
+import re
+
+from build_cache import BATCH_SIZE, compute_cache_keys, find_hits, get_record_queries, read_cache
+from fakes import FakeConnection
+
+
+def node(parents=(), checksum='a', config='c', macros=()):
+    """A compact node as returned by slim_ci_planner.load_manifest."""
+    return {'resource_type': 'model', 'checksum': checksum, 'config': config,
+            'parents': list(parents), 'macros': list(macros)}
+
+
+# source -> stg -> fct -> rpt, dim -> rpt
+NODES = {
+    'model.stg': node(['source.raw.games'], macros=['macro.cents']),
+    'model.fct': node(['model.stg']),
+    'model.dim': node(),
+    'model.rpt': node(['model.fct', 'model.dim']),
+}
+MACROS = {'macro.cents': {'hash': '1', 'macros': ['macro.round']}, 'macro.round': {'hash': '2', 'macros': []}}
+
+
+def test_cache_keys_are_stable():
+    assert compute_cache_keys(NODES, MACROS) == compute_cache_keys(dict(reversed(NODES.items())), MACROS)
+
+
+def test_upstream_change_invalidates_descendants_only():
+    keys = compute_cache_keys(NODES, MACROS)
+    changed = compute_cache_keys({**NODES, 'model.fct': node(['model.stg'], checksum='b')}, MACROS)
+
+    assert {uid for uid in keys if keys[uid] != changed[uid]} == {'model.fct', 'model.rpt'}
+
+
+def test_config_change_invalidates_the_node():
+    keys = compute_cache_keys(NODES, MACROS)
+    changed = compute_cache_keys({**NODES, 'model.dim': node(config='view')}, MACROS)
+
+    assert {uid for uid in keys if keys[uid] != changed[uid]} == {'model.dim', 'model.rpt'}
+
+
+def test_nested_macro_change_propagates():
+    keys = compute_cache_keys(NODES, MACROS)
+    changed = compute_cache_keys(NODES, {**MACROS, 'macro.round': {'hash': '3', 'macros': []}})
+
+    assert {uid for uid in keys if keys[uid] != changed[uid]} == {'model.stg', 'model.fct', 'model.rpt'}
+
+
+def test_recursive_macros_do_not_loop():
+    macros = {'macro.a': {'hash': '1', 'macros': ['macro.b']}, 'macro.b': {'hash': '2', 'macros': ['macro.a']}}
+    assert len(compute_cache_keys({'model.x': node(macros=['macro.a'])}, macros)) == 1
+
+
+def test_long_chains_do_not_hit_the_recursion_limit():
+    nodes = {'model.0': node()}
+    nodes.update({f"model.{i}": node([f"model.{i - 1}"]) for i in range(1, 5000)})
+
+    assert len(set(compute_cache_keys(nodes, {}).values())) == 5000
+
+
+def test_find_hits_matches_current_keys():
+    keys = {'model.fct': 'k1', 'model.rpt': 'k2', 'model.dim': 'k3'}
+    cached = {'model.fct': 'k1', 'model.rpt': 'old', 'model.stg': 'k0'}
+
+    assert find_hits(['model.fct', 'model.rpt', 'model.dim', 'model.new'], keys, cached) == {'model.fct'}
+
+
+def test_read_cache_without_table_is_empty():
+    conn = FakeConnection(fail=r"dbt_build_cache")
+    assert read_cache(conn, 'ANALYTICS', 'PR_123') == {}
+
+    conn = FakeConnection({r"dbt_build_cache": [{'UNIQUE_ID': 'model.fct', 'CACHE_KEY': 'k1'}]})
+    assert read_cache(conn, 'ANALYTICS', 'PR_123') == {'model.fct': 'k1'}
+
+
+def test_record_queries_are_batched():
+    built = {f"model.{i}": f"k{i}" for i in range(BATCH_SIZE + 1)}
+    queries = get_record_queries('ANALYTICS', 'PR_123', built, ['model.failed'])
+
+    assert queries[0].startswith("CREATE TABLE IF NOT EXISTS ANALYTICS.PR_123.dbt_build_cache")
+    merges = [query for query in queries if query.startswith("MERGE INTO ANALYTICS.PR_123.dbt_build_cache")]
+    assert [len(re.findall(r"\('model\.", query)) for query in merges] == [BATCH_SIZE, 1]
+    assert queries[-1] == "DELETE FROM ANALYTICS.PR_123.dbt_build_cache WHERE unique_id IN ('model.failed');"
+
+
+def test_record_queries_without_rows_only_create_the_table():
+    assert len(get_record_queries('ANALYTICS', 'PR_123', {}, [])) == 1
@@ -0,0 +1,99 @@
+import sys
+import types
+
+import pytest
+
+import ci
+import helpers
+from fakes import FakeConnection
+
+
+@pytest.fixture
+def snowflake(monkeypatch):
+    """Replace the Snowflake connector with one handing out FakeConnections, recording each login."""
+    logins = []
+
+    def connect(account, user, password):
+        logins.append(user)
+        return FakeConnection()
+
+    connector = types.ModuleType('snowflake.connector')
+    connector.connect = connect
+    package = types.ModuleType('snowflake')
+    package.connector = connector
+    monkeypatch.setitem(sys.modules, 'snowflake', package)
+    monkeypatch.setitem(sys.modules, 'snowflake.connector', connector)
+    monkeypatch.setattr(helpers, 'connection_stats', {'opened': 0, 'reused': 0, 'seconds': 0.0})
+    yield logins
+    helpers.close_shared_connections()
+
+
+@pytest.fixture
+def command(monkeypatch):
+    """Register a ci.py command running the given function as its main()."""
+    def register(name, main):
+        module = types.ModuleType(f"fake_{name}")
+        module.main = main
+        monkeypatch.setitem(sys.modules, module.__name__, module)
+        monkeypatch.setitem(ci.COMMANDS, name, module.__name__)
+    return register
+
+
+def test_connections_are_not_shared_by_default(snowflake):
+    first = helpers.connect_to_snowflake('DBT', 'secret')
+    first.close()
+    helpers.connect_to_snowflake('DBT', 'secret')
+
+    assert snowflake == ['DBT', 'DBT']
+    assert first.is_closed()
+
+
+def test_shared_connections_log_in_once_per_user(snowflake):
+    helpers.share_connections()
+    first = helpers.connect_to_snowflake('DBT', 'secret')
+    # Closing a shared connection leaves the session open for the next caller
+    first.close()
+    second = helpers.connect_to_snowflake('DBT', 'secret')
+    admin = helpers.connect_to_snowflake('ADMIN', 'secret')
+
+    assert snowflake == ['DBT', 'ADMIN']
+    assert not second.is_closed()
+    assert helpers.connection_stats['opened'] == 2 and helpers.connection_stats['reused'] == 1
+
+    helpers.close_shared_connections()
+    assert second.is_closed() and admin.is_closed()
+
+
+def test_chained_commands_share_a_session(snowflake, command, monkeypatch):
+    def query():
+        conn = helpers.connect_to_snowflake('DBT', 'secret')
+        conn.cursor().execute("SELECT 1;")
+        conn.close()
+
+    command('first', query)
+    command('second', query)
+    monkeypatch.setattr(sys, 'argv', ['ci.py', 'first', 'second'])
+    with pytest.raises(SystemExit) as exit_info:
+        ci.main()
+
+    assert exit_info.value.code == 0
+    assert snowflake == ['DBT']
+    assert helpers.connection_stats['reused'] == 1
+
+
+def test_exit_messages_are_reported(command, capsys):
+    def fail():
+        sys.exit("Failed to read manifest")
+
+    command('fail', fail)
+
+    assert ci.run_command('fail') == 1
+    assert "Failed to read manifest" in capsys.readouterr().err
+
+
+def test_exit_codes_are_kept(command):
+    command('done', lambda: sys.exit(0))
+    command('skip', lambda: sys.exit(3))
+
+    assert ci.run_command('done') == 0
+    assert ci.run_command('skip') == 3
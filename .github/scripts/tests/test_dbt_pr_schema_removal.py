@@ -0,0 +1,83 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+from dbt_pr_schema_removal import fetch_open_pr_numbers, find_stale_schemas, list_pr_schemas, sweep
+from fakes import FakeConnection
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+# PR schemas as listed by INFORMATION_SCHEMA, including another repository's
+SCHEMATA = {r"INFORMATION_SCHEMA\.SCHEMATA": [
+    {'SCHEMA_NAME': 'GITHUB_PR_1', 'LAST_ALTERED': NOW - timedelta(days=30), 'BYTES': 2048},
+    {'SCHEMA_NAME': 'GITHUB_PR_2', 'LAST_ALTERED': NOW - timedelta(hours=2), 'BYTES': 4096},
+    {'SCHEMA_NAME': 'GITHUB_PR_3', 'LAST_ALTERED': NOW - timedelta(days=3), 'BYTES': None},
+    {'SCHEMA_NAME': 'GITHUB_PR_150', 'LAST_ALTERED': NOW - timedelta(days=10), 'BYTES': 1024},
+    {'SCHEMA_NAME': 'OTHER_REPO__GITHUB_PR_4', 'LAST_ALTERED': NOW - timedelta(days=30), 'BYTES': 8192},
+]}
+
+
+def pulls(github, pages):
+    """Serve the open PRs in pages linked by the Link header, like the GitHub REST API."""
+    def handler(request):
+        page = int(match.group(1)) if (match := re.search(r"[?&]page=(\d+)", request['path'])) else 1
+        link = f'<{github.url}/repos/owner/repo/pulls?state=open&per_page=100&page={page + 1}>; rel="next"'
+        return 200, [{'number': number} for number in pages[page - 1]], {'Link': link} if page < len(pages) else {}
+    github.routes[r"^GET /repos/owner/repo/pulls"] = handler
+
+
+def test_list_pr_schemas_only_matches_this_repository():
+    schemas = list_pr_schemas(FakeConnection(SCHEMATA), 'PR_DB')
+
+    assert [schema['pr_number'] for schema in schemas] == [1, 2, 3, 150]
+    assert schemas[2]['bytes'] == 0
+    assert [schema['schema'] for schema in list_pr_schemas(FakeConnection(SCHEMATA), 'PR_DB', 'other_repo')] == [
+        'OTHER_REPO__GITHUB_PR_4']
+
+
+def test_find_stale_schemas_applies_the_age_threshold():
+    schemas = list_pr_schemas(FakeConnection(SCHEMATA), 'PR_DB')
+
+    assert [s['pr_number'] for s in find_stale_schemas(schemas, {3}, now=NOW)] == [2, 1, 150]
+    # PR 2 changed two hours ago, a build may still be running in it
+    assert [s['pr_number'] for s in find_stale_schemas(schemas, {3}, max_age_days=1, now=NOW)] == [1, 150]
+    assert find_stale_schemas(schemas, {1, 2, 3, 150}, now=NOW) == []
+
+
+def test_fetch_open_pr_numbers_follows_every_page(github, monkeypatch):
+    monkeypatch.setenv('GITHUB_API_URL', github.url)
+    pulls(github, [[1, 2], [3], [150]])
+
+    assert fetch_open_pr_numbers('owner/repo', 'token') == {1, 2, 3, 150}
+    assert len(github.requests) == 3
+    assert 'state=open' in github.requests[0]['path']
+    assert all(request['headers']['Authorization'] == 'Bearer token' for request in github.requests)
+
+
+def test_sweep_keeps_schemas_of_open_prs_on_any_page(github, monkeypatch):
+    monkeypatch.setenv('GITHUB_API_URL', github.url)
+    # PR 150 is only listed on the second page
+    pulls(github, [[3], [150]])
+    conn = FakeConnection(SCHEMATA)
+    results = sweep(conn, 'PR_DB', lambda: fetch_open_pr_numbers('owner/repo', 'token'))
+
+    assert all(result.success for result in results)
+    assert sorted(query for query in conn.executed if query.startswith('DROP')) == [
+        "DROP SCHEMA IF EXISTS PR_DB.GITHUB_PR_1 CASCADE;",
+        "DROP SCHEMA IF EXISTS PR_DB.GITHUB_PR_2 CASCADE;",
+    ]
+
+
+def test_sweep_reports_reclaimed_storage_of_successful_drops(capsys):
+    conn = FakeConnection(SCHEMATA, fail=r"GITHUB_PR_150")
+    results = sweep(conn, 'PR_DB', lambda: {2, 3})
+
+    assert [result.success for result in results] == [True, False]
+    assert "Reclaimed 2.0 KB from 1 schemas" in capsys.readouterr().out
+
+
+def test_sweep_dry_run_drops_nothing(capsys):
+    conn = FakeConnection(SCHEMATA)
+
+    assert sweep(conn, 'PR_DB', lambda: set(), dry_run=True) == []
+    assert not [query for query in conn.executed if query.startswith('DROP')]
+    assert "- GITHUB_PR_2 (PR #2, 4.0 KB)" in capsys.readouterr().out
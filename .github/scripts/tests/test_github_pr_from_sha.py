@@ -0,0 +1,107 @@
+import re
+import time
+
+import pytest
+
+import github_pr_from_sha
+from github_pr_from_sha import PullRequestResolver, get_pr_from_sha
+
+# Commits with their PR, '' for a commit on no PR
+PRS = {'aaa': '12', 'bbb': '', 'ccc': '14', 'ddd': '15'}
+
+
+def resolver(github, **kwargs):
+    return PullRequestResolver('owner/repo', 'token', api_url=github.url, **kwargs)
+
+
+def rest_pulls(github, etag='"v1"'):
+    """Serve the PRs of a commit with an ETag, answering a matching If-None-Match with a 304."""
+    def handler(request):
+        if request['headers'].get('If-None-Match') == etag:
+            return 304, None, {'ETag': etag}
+        sha = re.search(r"/commits/(\w+)/pulls", request['path']).group(1)
+        return 200, [{'number': int(PRS[sha])}] if PRS[sha] else [], {'ETag': etag}
+    github.routes[r"^GET /repos/owner/repo/commits/\w+/pulls"] = handler
+
+
+def graphql(github):
+    """Resolve the commits in a GraphQL batch query, commits unknown to PRS do not exist."""
+    def handler(request):
+        oids = re.findall(r'(c\d+): object\(oid: "(\w+)"\)', request['json']['query'])
+        repository = {alias: {'associatedPullRequests': {'nodes': [{'number': int(PRS[sha])}] if PRS[sha] else []}}
+                      if sha in PRS else None for alias, sha in oids}
+        return 200, {'data': {'repository': repository}}, {}
+    github.routes[r"^POST /graphql"] = handler
+
+
+def test_unchanged_lookups_are_answered_from_the_etag(github, tmp_path):
+    rest_pulls(github)
+    cache_path = str(tmp_path / 'prs.json')
+    first = resolver(github, cache_path=cache_path)
+
+    assert first.get_pr('bbb') == ''
+    assert first.get_pr('bbb') == ''
+    first.save()
+    # The cached ETag also survives into the next job
+    assert resolver(github, cache_path=cache_path).get_pr('bbb') == ''
+
+    assert [request['headers'].get('If-None-Match') for request in github.requests] == [None, '"v1"', '"v1"']
+
+
+def test_found_prs_are_cached_on_disk(github, tmp_path):
+    rest_pulls(github)
+    cache_path = str(tmp_path / 'prs.json')
+    first = resolver(github, cache_path=cache_path)
+    assert first.get_pr('aaa') == '12'
+    first.save()
+
+    assert resolver(github, cache_path=cache_path).get_pr('aaa') == '12'
+    assert len(github.requests) == 1
+
+
+def test_get_prs_resolves_commits_in_batches(github, monkeypatch):
+    monkeypatch.setattr(github_pr_from_sha, 'GRAPHQL_BATCH_SIZE', 2)
+    graphql(github)
+    prs = resolver(github)
+    prs.cache['prs']['ddd'] = '15'
+
+    assert prs.get_prs(['aaa', 'bbb', 'ccc', 'ddd', 'eee', 'aaa']) == {
+        'aaa': '12', 'bbb': '', 'ccc': '14', 'ddd': '15', 'eee': None}
+    # ddd is cached and aaa is asked once, leaving two batches
+    assert [re.findall(r'oid: "(\w+)"', request['json']['query']) for request in github.requests] == [
+        ['aaa', 'bbb'], ['ccc', 'eee']]
+    assert github.requests[0]['json']['variables'] == {'owner': 'owner', 'name': 'repo'}
+
+
+def test_get_prs_raises_graphql_errors(github):
+    github.routes[r"^POST /graphql"] = lambda request: (200, {'errors': [{'message': 'Bad credentials'}]}, {})
+
+    with pytest.raises(ValueError, match='Bad credentials'):
+        resolver(github).get_prs(['aaa'])
+
+
+def test_server_errors_are_retried(github, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(time, 'sleep', sleeps.append)
+    responses = iter([(502, {'message': 'Bad Gateway'}, {}), (200, [{'number': 12}], {})])
+    github.routes[r"/pulls"] = lambda request: next(responses)
+
+    assert resolver(github).get_pr('aaa') == '12'
+    assert sleeps == [1]
+
+
+def test_errors_return_none(github, monkeypatch, capsys):
+    sleeps = []
+    monkeypatch.setattr(time, 'sleep', sleeps.append)
+
+    # Unknown commits are a 404
+    assert get_pr_from_sha('aaa', 'owner/repo', 'token', resolver(github)) is None
+    assert "Error making API request" in capsys.readouterr().err
+
+    # A rate limit resetting too far ahead is not waited for
+    reset = str(int(time.time()) + 3600)
+    github.routes[r"/pulls"] = lambda request: (403, {'message': 'API rate limit exceeded'},
+                                                {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': reset})
+    assert get_pr_from_sha('aaa', 'owner/repo', 'token', resolver(github)) is None
+    assert f"Reset at: {reset}" in capsys.readouterr().err
+    assert sleeps == []
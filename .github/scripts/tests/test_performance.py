@@ -0,0 +1,59 @@
+import json
+
+from performance import PerformanceCollector, critical_path, load_parent_map, render_performance
+
+
+def result(unique_id, seconds, start, thread='Thread-1'):
+    """A run result executed from start to start + seconds."""
+    return {
+        'unique_id': unique_id,
+        'status': 'success',
+        'execution_time': seconds,
+        'thread_id': thread,
+        'timing': [{'name': 'execute', 'started_at': f"2024-01-01T00:00:{start:02d}",
+                    'completed_at': f"2024-01-01T00:00:{start + seconds:02d}"}],
+    }
+
+
+def collector():
+    performance = PerformanceCollector(top_n=3)
+    performance.set_args({'threads': 2})
+    for args in [('model.stg', 2, 0), ('model.fct', 3, 2), ('model.dim', 1, 0, 'Thread-2'),
+                 ('test.not_null_fct', 10, 5, 'Thread-2')]:
+        performance.add(result(*args))
+    return performance
+
+
+def write_manifest(path, parent_map):
+    path.write_text(json.dumps({'metadata': {'dbt_version': '1.7.0'}, 'nodes': {}, 'parent_map': parent_map}))
+    return str(path)
+
+
+def test_critical_path_follows_dependencies():
+    durations = {'model.stg': 2.0, 'model.fct': 3.0, 'model.dim': 4.0}
+    parents = {'model.fct': ['model.stg', 'source.raw'], 'model.dim': []}
+
+    assert critical_path(durations, parents) == ['model.stg', 'model.fct']
+
+
+def test_load_parent_map_rejects_malformed_parent_maps(tmp_path, capsys):
+    assert load_parent_map(write_manifest(tmp_path / 'null.json', None)) == {}
+    assert load_parent_map(write_manifest(tmp_path / 'list.json', ['model.fct'])) == {}
+    assert load_parent_map(str(tmp_path / 'missing.json')) == {}
+    assert capsys.readouterr().err.count("Failed to read manifest") == 3
+
+
+def test_render_performance_shows_critical_path(tmp_path):
+    manifest = write_manifest(tmp_path / 'manifest.json', {
+        'model.fct': ['model.stg'], 'test.not_null_fct': ['model.fct']})
+    lines = render_performance(collector(), manifest)
+
+    assert "**Critical path** (15.0s)\n" in lines
+    assert any(line.startswith("**Thread utilization**") for line in lines)
+
+
+def test_render_performance_without_manifest_leaves_out_critical_path(tmp_path):
+    lines = render_performance(collector(), str(tmp_path / 'missing.json'))
+
+    assert not any('Critical path' in line for line in lines)
+    assert "**Slowest models**\n" in lines
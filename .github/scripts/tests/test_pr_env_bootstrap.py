@@ -0,0 +1,96 @@
+import json
+
+from fakes import FakeConnection
+from pr_env_bootstrap import ancestors_to_clone, bootstrap, get_clone_queries, load_relations
+
+
+def relation(name, resource_type='model', parents=(), materialized='table', schema='PR_123'):
+    """A compact node as returned by load_relations."""
+    ephemeral = materialized == 'ephemeral'
+    return {
+        'resource_type': resource_type,
+        'relation_name': None if ephemeral or resource_type == 'test' else f"ANALYTICS.{schema}.{name.upper()}",
+        'database': 'ANALYTICS',
+        'schema': schema,
+        'materialized': materialized,
+        'parents': list(parents),
+    }
+
+
+# seed -> stg (ephemeral) -> fct -> rpt, dim -> rpt, and a relationships test between fct and dim
+PR_NODES = {
+    'seed.games': relation('games', 'seed', materialized='seed'),
+    'model.stg_games': relation('stg_games', parents=['seed.games'], materialized='ephemeral'),
+    'model.fct_games': relation('fct_games', parents=['model.stg_games']),
+    'model.dim_teams': relation('dim_teams', materialized='view'),
+    'model.rpt_games': relation('rpt_games', parents=['model.fct_games', 'model.dim_teams']),
+    'test.relationships_fct_dim': relation('relationships_fct_dim', 'test', ['model.fct_games', 'model.dim_teams'],
+                                           materialized='test'),
+}
+PROD_NODES = {uid: relation(uid.split('.')[1], node['resource_type'], node['parents'], node['materialized'], 'PROD')
+              for uid, node in PR_NODES.items()}
+
+
+def test_load_relations_skips_whole_members(tmp_path):
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps({
+        'metadata': {'dbt_version': '1.7.0'},
+        'nodes': {'model.fct_games': {'resource_type': 'model', 'relation_name': 'ANALYTICS.PR_123.FCT_GAMES',
+                                      'database': 'ANALYTICS', 'schema': 'PR_123',
+                                      'config': {'materialized': 'table'},
+                                      'depends_on': {'nodes': ['model.stg_games']}}},
+        'sources': {'source.raw.games': {'resource_type': 'source'}},
+        'parent_map': {'model.fct_games': ['model.stg_games']},
+    }))
+
+    assert load_relations(str(manifest)) == {'model.fct_games': {
+        'resource_type': 'model', 'relation_name': 'ANALYTICS.PR_123.FCT_GAMES', 'database': 'ANALYTICS',
+        'schema': 'PR_123', 'materialized': 'table', 'parents': ['model.stg_games']}}
+
+
+def test_ancestors_to_clone_looks_through_ephemeral_models():
+    nodes = {uid: node for uid, node in PR_NODES.items() if node['resource_type'] != 'test'}
+
+    # stg is inlined into fct, so fct reads the seed
+    assert ancestors_to_clone(['model.fct_games'], nodes) == {'seed.games'}
+
+
+def test_ancestors_to_clone_includes_other_parents_of_tests():
+    # The relationships test is built with fct and also reads dim
+    assert ancestors_to_clone(['model.fct_games'], PR_NODES) == {'seed.games', 'model.dim_teams'}
+
+
+def test_ancestors_to_clone_leaves_out_selected_nodes():
+    assert ancestors_to_clone(['model.fct_games', 'model.rpt_games'], PR_NODES) == {'seed.games', 'model.dim_teams'}
+    assert ancestors_to_clone(['seed.games'], PR_NODES) == set()
+
+
+def test_get_clone_queries_clones_tables_and_points_views_at_production():
+    queries = get_clone_queries(['seed.games', 'model.dim_teams', 'model.stg_games'], PR_NODES, PROD_NODES)
+
+    assert queries == [
+        "CREATE SCHEMA IF NOT EXISTS ANALYTICS.PR_123;",
+        "CREATE OR REPLACE VIEW ANALYTICS.PR_123.DIM_TEAMS AS SELECT * FROM ANALYTICS.PROD.DIM_TEAMS;",
+        "CREATE OR REPLACE TABLE ANALYTICS.PR_123.GAMES CLONE ANALYTICS.PROD.GAMES;",
+    ]
+
+
+def test_get_clone_queries_skips_nodes_new_in_the_pr():
+    pr_nodes = {**PR_NODES, 'model.new_model': relation('new_model')}
+    assert get_clone_queries(['model.new_model'], pr_nodes, PROD_NODES) == []
+
+
+def test_bootstrap_does_not_overwrite_cached_nodes():
+    conn = FakeConnection()
+    plan = {'selected': ['model.rpt_games'], 'cached': ['model.fct_games']}
+    bootstrap(conn, plan, PR_NODES, PROD_NODES)
+
+    assert sorted(conn.executed) == [
+        "CREATE OR REPLACE VIEW ANALYTICS.PR_123.DIM_TEAMS AS SELECT * FROM ANALYTICS.PROD.DIM_TEAMS;",
+        "CREATE SCHEMA IF NOT EXISTS ANALYTICS.PR_123;",
+    ]
+
+
+def test_bootstrap_dry_run_executes_nothing(capsys):
+    assert bootstrap(None, {'selected': ['model.rpt_games']}, PR_NODES, PROD_NODES, dry_run=True) == []
+    assert "CREATE OR REPLACE TABLE ANALYTICS.PR_123.FCT_GAMES CLONE ANALYTICS.PROD.FCT_GAMES;" in capsys.readouterr().out
@@ -0,0 +1,130 @@
+import json
+import os
+
+import dbt_job_summary
+import query_costs
+from fakes import FakeConnection
+from query_costs import (fetch_invocation_queries, fetch_query_history, get_query_history_query, render_query_costs,
+                         summarize_query_history)
+
+# Query history of one PR build, as returned by Snowflake
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'query_history.json')
+
+INVOCATION = '8a1f1a1e-0000-4000-8000-000000000001'
+START = '2024-01-01T00:00:00+00:00'
+
+
+def row(query_id, unique_id=None, page_rows=2, page_end='2024-01-01T00:05:00+00:00'):
+    """A row of one query history page, unique_id None for a page without queries of the invocation."""
+    tag = f'{{"unique_id": "{unique_id}", "invocation_id": "{INVOCATION}"}}' if unique_id else None
+    return {'query_id': query_id if unique_id else None, 'query_tag': tag, 'execution_time': 1000,
+            'page_rows': page_rows, 'page_end': page_end}
+
+
+def test_query_reads_from_the_invocation_start():
+    query = get_query_history_query('ANALYTICS', 'DBT', INVOCATION, START, '2024-01-01T00:05:00+00:00')
+
+    assert f"END_TIME_RANGE_START => '{START}'::TIMESTAMP_LTZ" in query
+    assert "END_TIME_RANGE_END => '2024-01-01T00:05:00+00:00'::TIMESTAMP_LTZ" in query
+    assert f"invocation_id::string = '{INVOCATION}'" in query
+
+
+def test_full_pages_are_followed_back_to_the_invocation_start(monkeypatch):
+    monkeypatch.setattr(query_costs, 'RESULT_LIMIT', 2)
+    conn = FakeConnection({
+        # Oldest page, not full, so everything since the start has been read
+        r"END_TIME_RANGE_END => '2024-01-01T00:03:00": [row('q3', 'model.stg', page_rows=1)],
+        # Full page, the other query in it was not part of the invocation
+        r"END_TIME_RANGE_END => '2024-01-01T00:05:00": [row('q2', 'model.fct', page_end='2024-01-01T00:03:00+00:00')],
+        # Most recent page, full and without queries of the invocation
+        r"RESULT_LIMIT": [row(None)],
+    })
+    rows = fetch_invocation_queries(conn, 'ANALYTICS', 'DBT', INVOCATION, START)
+
+    assert sorted(r['query_id'] for r in rows) == ['q2', 'q3']
+    assert len(conn.executed) == 3
+
+
+def test_pages_overlapping_at_the_boundary_are_deduplicated(monkeypatch):
+    monkeypatch.setattr(query_costs, 'RESULT_LIMIT', 2)
+    conn = FakeConnection({
+        r"END_TIME_RANGE_END": [row('q1', 'model.fct', page_rows=1)],
+        r"RESULT_LIMIT": [row('q1', 'model.fct'), row('q2', 'model.stg')],
+    })
+
+    assert sorted(r['query_id'] for r in fetch_invocation_queries(conn, 'ANALYTICS', 'DBT', INVOCATION)) == [
+        'q1', 'q2']
+
+
+def test_warns_when_paging_cannot_move_on(monkeypatch, capsys):
+    monkeypatch.setattr(query_costs, 'RESULT_LIMIT', 2)
+    # Every page is full and ends at the same instant
+    conn = FakeConnection({r"RESULT_LIMIT": [row('q1', 'model.fct')]})
+    rows = fetch_invocation_queries(conn, 'ANALYTICS', 'DBT', INVOCATION, START)
+
+    assert [r['query_id'] for r in rows] == ['q1']
+    assert len(conn.executed) == 2
+    assert "may be under-reported" in capsys.readouterr().err
+
+
+class PagingConnection(FakeConnection):
+    """Answers every query with a full page ending earlier than the one before."""
+
+    def rows_for(self, query):
+        page = len(self.executed)
+        return [row(f"q{page}", 'model.fct', page_rows=1, page_end=f"2024-01-01T00:0{9 - page}:00+00:00")]
+
+
+def test_warns_after_the_last_page(monkeypatch, capsys):
+    monkeypatch.setattr(query_costs, 'RESULT_LIMIT', 1)
+    monkeypatch.setattr(query_costs, 'MAX_PAGES', 3)
+    rows = fetch_invocation_queries(PagingConnection(), 'ANALYTICS', 'DBT', INVOCATION, START)
+
+    assert sorted(r['query_id'] for r in rows) == ['q1', 'q2', 'q3']
+    assert "may be under-reported" in capsys.readouterr().err
+
+
+def test_fixture_is_read_instead_of_snowflake(monkeypatch):
+    monkeypatch.setenv('DBT_QUERY_HISTORY', FIXTURE)
+    assert len(fetch_query_history('any')) == 7
+
+
+def test_costs_are_attributed_per_node():
+    with open(FIXTURE, 'r') as f:
+        summary = summarize_query_history(json.load(f))
+
+    # Untagged queries and tags that are not dbt's JSON are left out
+    assert set(summary) == {'model.dbt_template.nba_games', 'model.dbt_template.nfl_games',
+                            'test.dbt_template.unique_nfl_games_id.4f1c2e', 'seed.dbt_template.seed_nba_games'}
+    assert summary['model.dbt_template.nba_games'] == {
+        'queries': 2, 'bytes_scanned': 53477376, 'partitions_scanned': 13, 'partitions_total': 49,
+        'bytes_spilled_to_local_storage': 0, 'bytes_spilled_to_remote_storage': 0, 'execution_time': 8.5}
+
+
+def test_cost_section_lists_the_most_expensive_nodes_first():
+    with open(FIXTURE, 'r') as f:
+        lines = render_query_costs(summarize_query_history(json.load(f)), top_n=2)
+
+    assert lines[2] == "31.6 warehouse seconds and 251.0 MB scanned across 4 nodes\n"
+    assert lines[5:7] == [
+        "| `model.dbt_template.nfl_games` | 21.5s | 200.0 MB | 40 / 40 (0% pruned) | 100.0 MB / 0 B |",
+        "| `model.dbt_template.nba_games` | 8.5s | 51.0 MB | 13 / 49 (73% pruned) | - |",
+    ]
+    assert "\n...and 2 more nodes" in lines
+
+
+def test_job_summary_renders_costs_from_the_fixture(tmp_path, monkeypatch):
+    run_results = tmp_path / 'run_results.json'
+    run_results.write_text(json.dumps({
+        'metadata': {'invocation_id': '0c6e9a3e-7d1b-4b8e-9f7a-3f1b2c4d5e6f', 'generated_at': '2024-01-01T00:01:00Z'},
+        'results': [{'unique_id': 'model.dbt_template.nfl_games', 'status': 'success', 'execution_time': 21.6,
+                     'timing': [], 'message': None}],
+        'elapsed_time': 30.0,
+    }))
+    monkeypatch.setenv('DBT_RUN_RESULTS', str(run_results))
+    monkeypatch.setenv('DBT_RUN_HISTORY', str(tmp_path / 'run_history.db'))
+    monkeypatch.setenv('DBT_QUERY_HISTORY', FIXTURE)
+
+    comment = dbt_job_summary.main()
+    assert ":money_with_wings: Warehouse cost" in comment
+    assert "| `model.dbt_template.nfl_games` | 21.5s |" in comment
@@ -0,0 +1,151 @@
+from fakes import FakeConnection
+from rbac_reconcile import AccountState, fetch_account_state, parse_statements, plan_queries
+
+STATEMENTS = [
+    "CREATE DATABASE IF NOT EXISTS RAW;",
+    "DROP SCHEMA IF EXISTS RAW.PUBLIC CASCADE;",
+    """CREATE WAREHOUSE IF NOT EXISTS LOADING_WH WITH
+            WAREHOUSE_SIZE = 'XSMALL' AUTO_SUSPEND = 60
+            AUTO_RESUME = true
+            INITIALLY_SUSPENDED = true;""",
+    "ALTER WAREHOUSE LOADING_WH SET WAREHOUSE_SIZE = 'XSMALL' AUTO_SUSPEND = 60;",
+    "CREATE ROLE IF NOT EXISTS LOADER_ROLE;",
+    "GRANT USAGE ON WAREHOUSE LOADING_WH TO ROLE LOADER_ROLE;",
+    "GRANT USAGE ON DATABASE RAW TO ROLE LOADER_ROLE;",
+    "GRANT SELECT, INSERT, UPDATE, DELETE ON ALL TABLES IN DATABASE RAW TO ROLE LOADER_ROLE;",
+    "GRANT SELECT, INSERT, UPDATE, DELETE ON FUTURE TABLES IN DATABASE RAW TO ROLE LOADER_ROLE;",
+    "GRANT OWNERSHIP ON DATABASE RAW TO ROLE LOADER_ROLE COPY CURRENT GRANTS;",
+    """CREATE USER IF NOT EXISTS LOADER
+            PASSWORD = 'secret'
+            DEFAULT_WAREHOUSE = 'LOADING_WH'
+            DEFAULT_ROLE = 'LOADER_ROLE';""",
+    "GRANT ROLE LOADER_ROLE TO USER LOADER;",
+    "ALTER USER IF EXISTS LOADER SET DEFAULT_WAREHOUSE = 'LOADING_WH';",
+    "GRANT ROLE LOADER_ROLE TO ROLE SYSADMIN;",
+    "GRANT ALL PRIVILEGES ON ALL SCHEMAS IN DATABASE RAW TO ROLE SYSADMIN;",
+]
+
+# An account where every statement above has already been applied
+APPLIED_ACCOUNT = {
+    r"^SHOW DATABASES": [{'name': 'RAW'}],
+    r"^SHOW WAREHOUSES": [{'name': 'LOADING_WH', 'size': 'X-Small', 'auto_suspend': 60, 'min_cluster_count': 1,
+                           'max_cluster_count': 1, 'scaling_policy': 'STANDARD'}],
+    r"^SHOW ROLES": [{'name': 'LOADER_ROLE'}, {'name': 'SYSADMIN'}],
+    r"^SHOW USERS": [{'name': 'LOADER', 'default_warehouse': 'LOADING_WH'}],
+    r"^SHOW SCHEMAS IN DATABASE RAW": [{'name': 'INFORMATION_SCHEMA'}, {'name': 'GAMES'}],
+    r"INFORMATION_SCHEMA\.TABLES": [{'table_schema': 'GAMES', 'table_name': 'NBA', 'table_type': 'BASE TABLE'}],
+    r"^SHOW FUTURE GRANTS IN DATABASE RAW": [
+        {'privilege': privilege, 'grant_on': 'TABLE', 'name': 'RAW.<TABLE>', 'grantee_name': 'LOADER_ROLE'}
+        for privilege in ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+    ],
+    r"^SHOW GRANTS TO ROLE LOADER_ROLE": [
+        {'privilege': 'USAGE', 'granted_on': 'WAREHOUSE', 'name': 'LOADING_WH', 'grantee_name': 'LOADER_ROLE'},
+        {'privilege': 'OWNERSHIP', 'granted_on': 'DATABASE', 'name': 'RAW', 'grantee_name': 'LOADER_ROLE'},
+        *[{'privilege': privilege, 'granted_on': 'TABLE', 'name': 'RAW.GAMES.NBA', 'grantee_name': 'LOADER_ROLE'}
+          for privilege in ('SELECT', 'INSERT', 'UPDATE', 'DELETE')],
+    ],
+    r"^SHOW GRANTS TO ROLE SYSADMIN": [
+        {'privilege': 'USAGE', 'granted_on': 'ROLE', 'name': 'LOADER_ROLE', 'grantee_name': 'SYSADMIN'},
+        *[{'privilege': privilege, 'granted_on': 'SCHEMA', 'name': 'RAW.GAMES', 'grantee_name': 'SYSADMIN'}
+          for privilege in ('USAGE', 'MONITOR', 'CREATE TABLE', 'CREATE VIEW')],
+    ],
+    r"^SHOW GRANTS TO USER LOADER": [{'role': 'LOADER_ROLE'}],
+}
+
+
+def test_parse_statements_maps_known_shapes_to_items():
+    items = dict(parse_statements(STATEMENTS))
+    assert items["CREATE DATABASE IF NOT EXISTS RAW;"] == ('database', 'RAW')
+    assert items["DROP SCHEMA IF EXISTS RAW.PUBLIC CASCADE;"] == ('no_schema', 'RAW', 'PUBLIC')
+    assert items["GRANT ROLE LOADER_ROLE TO USER LOADER;"] == ('role_grant', 'LOADER_ROLE', 'USER', 'LOADER')
+    assert items["ALTER USER IF EXISTS LOADER SET DEFAULT_WAREHOUSE = 'LOADING_WH';"] == \
+        ('user_default', 'LOADER', 'LOADING_WH')
+    assert items["GRANT ALL PRIVILEGES ON ALL SCHEMAS IN DATABASE RAW TO ROLE SYSADMIN;"] == \
+        ('grant_all', frozenset({'USAGE', 'MONITOR', 'CREATE TABLE', 'CREATE VIEW'}), 'SCHEMA', 'RAW', 'SYSADMIN')
+
+
+def test_parse_statements_normalizes_warehouse_sizes():
+    (_, item), = parse_statements(["ALTER WAREHOUSE WH SET WAREHOUSE_SIZE = 'X-Small' AUTO_SUSPEND = 60;"])
+    assert item == ('warehouse_settings', 'WH', frozenset({'WAREHOUSE_SIZE': 'XSMALL', 'AUTO_SUSPEND': '60'}.items()))
+
+
+def test_parse_statements_leaves_unknown_statements_unparsed():
+    assert parse_statements(["USE ROLE SYSADMIN;"]) == [("USE ROLE SYSADMIN;", None)]
+
+
+def test_plan_on_fresh_account_keeps_every_statement():
+    conn = FakeConnection({r"^SHOW ROLES": [{'name': 'SYSADMIN'}]})
+    planned = plan_queries(conn, STATEMENTS)
+
+    assert planned == [sql for sql, _ in parse_statements(STATEMENTS)]
+
+
+def test_plan_on_applied_account_is_empty():
+    conn = FakeConnection(APPLIED_ACCOUNT)
+    assert plan_queries(conn, STATEMENTS) == []
+
+
+def test_plan_only_reads_objects_that_exist():
+    conn = FakeConnection({r"^SHOW ROLES": [{'name': 'SYSADMIN'}]})
+    plan_queries(conn, STATEMENTS)
+
+    # RAW, LOADER_ROLE and LOADER do not exist yet, so nothing inside them is read
+    assert not [query for query in conn.executed if 'RAW' in query or 'LOADER' in query]
+    assert "SHOW GRANTS TO ROLE SYSADMIN;" in conn.executed
+
+
+def test_plan_keeps_changed_warehouse_settings_and_user_defaults():
+    account = {**APPLIED_ACCOUNT,
+               r"^SHOW WAREHOUSES": [{**APPLIED_ACCOUNT[r"^SHOW WAREHOUSES"][0], 'auto_suspend': 600},
+                                     {'name': 'X_SMALL_WH', 'size': 'X-Small'}],
+               r"^SHOW USERS": [{'name': 'LOADER', 'default_warehouse': 'X_SMALL_WH'}]}
+    planned = plan_queries(FakeConnection(account), STATEMENTS)
+
+    assert planned == [
+        "ALTER WAREHOUSE LOADING_WH SET WAREHOUSE_SIZE = 'XSMALL' AUTO_SUSPEND = 60;",
+        "ALTER USER IF EXISTS LOADER SET DEFAULT_WAREHOUSE = 'LOADING_WH';",
+    ]
+
+
+def test_plan_keeps_all_grants_missing_on_one_object():
+    account = {**APPLIED_ACCOUNT,
+               r"INFORMATION_SCHEMA\.TABLES": [
+                   {'table_schema': 'GAMES', 'table_name': 'NBA', 'table_type': 'BASE TABLE'},
+                   {'table_schema': 'GAMES', 'table_name': 'WNBA', 'table_type': 'BASE TABLE'},
+               ]}
+    planned = plan_queries(FakeConnection(account), STATEMENTS)
+
+    assert planned == ["GRANT SELECT, INSERT, UPDATE, DELETE ON ALL TABLES IN DATABASE RAW TO ROLE LOADER_ROLE;"]
+
+
+def test_items_inside_missing_database_are_never_satisfied():
+    state = AccountState()
+    state.future_grants.add(('USAGE', 'SCHEMA', 'RAW', 'LOADER_ROLE'))
+
+    # Without RAW, PUBLIC is not there yet but will be once CREATE DATABASE runs
+    assert not state.is_satisfied(('no_schema', 'RAW', 'PUBLIC'))
+    # Vacuously true over no contents, but the database still has to be created first
+    assert not state.is_satisfied(('grant_all', frozenset({'SELECT'}), 'TABLE', 'RAW', 'LOADER_ROLE'))
+    assert not state.is_satisfied(('grant_future', frozenset({'USAGE'}), 'SCHEMA', 'RAW', 'LOADER_ROLE'))
+
+    state.objects['database'].add('RAW')
+    assert state.is_satisfied(('no_schema', 'RAW', 'PUBLIC'))
+    assert state.is_satisfied(('grant_future', frozenset({'USAGE'}), 'SCHEMA', 'RAW', 'LOADER_ROLE'))
+
+
+def test_ownership_satisfies_any_privilege():
+    state = AccountState()
+    state.objects['database'].add('RAW')
+    state.grants.add(('OWNERSHIP', 'DATABASE', 'RAW', 'LOADER_ROLE'))
+
+    assert state.is_satisfied(('grant', frozenset({'USAGE', 'CREATE SCHEMA'}), 'DATABASE', 'RAW', 'LOADER_ROLE'))
+    assert not state.is_satisfied(('grant', frozenset({'USAGE'}), 'DATABASE', 'RAW', 'TRANSFORMER_ROLE'))
+
+
+def test_fetch_account_state_reads_user_defaults():
+    items = [item for _, item in parse_statements(STATEMENTS) if item]
+    state = fetch_account_state(FakeConnection(APPLIED_ACCOUNT), items)
+
+    assert state.user_defaults == {'LOADER': 'LOADING_WH'}
+    assert state.user_roles['LOADER'] == {'LOADER_ROLE'}
+    assert state.contents[('TABLE', 'RAW')] == {'RAW.GAMES.NBA'}
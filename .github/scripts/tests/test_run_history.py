@@ -0,0 +1,50 @@
+import statistics
+
+from run_history import detect_regressions, load_baseline_stats, open_history
+
+# Successful runtimes per node from oldest to newest, the latest fct run failed and is in no baseline
+HISTORY = {
+    'model.fct_games': [10.0, 11.0, 10.5, 12.0, 10.2, 10.8, 11.5],
+    'model.dim_teams': [2.0, 2.0, 2.0, 2.0, 2.0, 2.0],
+    'model.rpt_games': [30.0, 31.0],
+}
+
+
+def history(tmp_path):
+    """A timing history of HISTORY, one minute apart."""
+    conn = open_history(str(tmp_path / 'run_history.db'))
+    rows = [('model.fct_games', 'sha', 'run_failed', 'merge', '2024-06-02T00:00:00', 'error', 99.0)]
+    rows.extend((uid, 'sha', f"run_{run}", 'merge', f"2024-06-01T00:{run:02d}:00", 'success', seconds)
+                for uid, runs in HISTORY.items() for run, seconds in enumerate(runs))
+    conn.executemany("INSERT INTO node_timings VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    return conn
+
+
+def test_baseline_stats_match_the_statistics_module(tmp_path):
+    stats = load_baseline_stats(history(tmp_path), ['model.fct_games', 'model.rpt_games', 'model.new'])
+
+    # Only the requested nodes with history are summarized
+    assert set(stats) == {'model.fct_games', 'model.rpt_games'}
+    for uid, node in stats.items():
+        runs = HISTORY[uid]
+        p50 = statistics.median(runs)
+        assert node['runs'] == len(runs)
+        assert node['p50'] == p50
+        assert abs(node['p95'] - statistics.quantiles(runs, n=20, method='inclusive')[-1]) < 1e-9
+        assert node['mad'] == statistics.median(abs(x - p50) for x in runs)
+
+
+def test_baseline_stats_keep_the_most_recent_runs(tmp_path):
+    stats = load_baseline_stats(history(tmp_path), ['model.fct_games'], runs=3)
+
+    assert stats['model.fct_games']['runs'] == 3
+    assert stats['model.fct_games']['p50'] == 10.8
+
+
+def test_detect_regressions_needs_enough_history_and_a_significant_slowdown(tmp_path):
+    stats = load_baseline_stats(history(tmp_path), HISTORY)
+    current = {'model.fct_games': 25.0, 'model.dim_teams': 2.5, 'model.rpt_games': 60.0}
+
+    # dim is within MIN_DELTA_SECONDS and rpt has too few runs
+    assert [r['unique_id'] for r in detect_regressions(current, stats)] == ['model.fct_games']
+    assert detect_regressions({'model.fct_games': 11.9}, stats) == []
@@ -0,0 +1,24 @@
+import json
+
+from seed_loader import get_exclude_selectors, get_seed_configs
+
+
+def test_loaded_seeds_are_excluded_by_fqn(tmp_path):
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps({
+        'metadata': {'dbt_version': '1.7.0'},
+        'nodes': {
+            'seed.dbt_template.seed_nba_games': {
+                'resource_type': 'seed', 'name': 'seed_nba_games', 'fqn': ['dbt_template', 'nba', 'seed_nba_games'],
+                'config': {'column_types': {'GAME_ID': 'number(38, 0)'}}},
+            # A model of the same name must not be excluded with the seed
+            'model.dbt_template.seed_nba_games': {
+                'resource_type': 'model', 'name': 'seed_nba_games', 'fqn': ['dbt_template', 'seed_nba_games']},
+        },
+    }))
+    configs = get_seed_configs(str(manifest))
+
+    assert configs == {'seed_nba_games': {'fqn': 'dbt_template.nba.seed_nba_games',
+                                          'column_types': {'game_id': 'number(38, 0)'}}}
+    # Files that are not seeds of the project are not built by dbt and need no exclude
+    assert get_exclude_selectors(['SEED_NBA_GAMES', 'scratch'], configs) == ['fqn:dbt_template.nba.seed_nba_games']
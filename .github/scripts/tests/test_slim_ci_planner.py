@@ -0,0 +1,150 @@
+import json
+
+from slim_ci_planner import (affected_nodes, changed_macros, load_manifest, modified_nodes, plan,
+                             select_within_budget, to_selectors)
+
+
+def node(name, resource_type='model', parents=(), checksum='a', macros=(), config=None, package='dbt_template'):
+    """A manifest node with the fields the planner reads."""
+    return {
+        'unique_id': f"{resource_type}.{package}.{name}",
+        'name': name,
+        'fqn': [package, 'marts', name],
+        'resource_type': resource_type,
+        'checksum': {'name': 'sha256', 'checksum': checksum},
+        'config': {'materialized': 'table', 'tags': [], **(config or {})},
+        'depends_on': {'nodes': list(parents), 'macros': list(macros)},
+    }
+
+
+def write_manifest(path, nodes, macros=None):
+    """Write a manifest with the members of a real one around the nodes and macros."""
+    manifest = {
+        'metadata': {'dbt_version': '1.7.0', 'project_name': 'dbt_template', 'env': {}},
+        'nodes': {n['unique_id']: n for n in nodes},
+        'sources': {'source.dbt_template.raw.games': {'name': 'games', 'resource_type': 'source'}},
+        'macros': {uid: {'macro_sql': sql, 'depends_on': {'macros': callees}}
+                   for uid, (sql, callees) in (macros or {}).items()},
+        'parent_map': {n['unique_id']: n['depends_on']['nodes'] for n in nodes},
+        'child_map': {},
+    }
+    with open(path, 'w') as f:
+        json.dump(manifest, f)
+    return str(path)
+
+
+# seed -> stg -> fct -> rpt, with a test on fct
+SEED = node('games', 'seed')
+STG = node('stg_games', parents=[SEED['unique_id']])
+FCT = node('fct_games', parents=[STG['unique_id']], macros=['macro.dbt_template.cents'])
+RPT = node('rpt_games', parents=[FCT['unique_id']])
+TEST = node('not_null_fct_games_game_id', 'test', parents=[FCT['unique_id']])
+NODES = [SEED, STG, FCT, RPT, TEST]
+MACROS = {'macro.dbt_template.cents': ('{{ x }} * 100', ['macro.dbt_template.round']),
+          'macro.dbt_template.round': ('round({{ x }})', [])}
+
+
+def compact(tmp_path, nodes=NODES, macros=MACROS):
+    return load_manifest(write_manifest(tmp_path / 'manifest.json', nodes, macros))
+
+
+def test_load_manifest_skips_whole_members(tmp_path):
+    nodes, macros = compact(tmp_path)
+
+    assert set(nodes) == {n['unique_id'] for n in NODES}
+    assert nodes[FCT['unique_id']]['fqn'] == 'dbt_template.marts.fct_games'
+    assert nodes[FCT['unique_id']]['parents'] == [STG['unique_id']]
+    assert set(macros) == set(MACROS)
+
+
+def test_load_manifest_ignores_volatile_config(tmp_path):
+    nodes, _ = compact(tmp_path)
+    retagged, _ = compact(tmp_path, [node('stg_games', parents=[SEED['unique_id']], config={'tags': ['daily']})])
+    reconfigured, _ = compact(tmp_path, [node('stg_games', parents=[SEED['unique_id']],
+                                              config={'materialized': 'view'})])
+
+    assert retagged[STG['unique_id']]['config'] == nodes[STG['unique_id']]['config']
+    assert reconfigured[STG['unique_id']]['config'] != nodes[STG['unique_id']]['config']
+
+
+def test_changed_macros_propagate_to_callers():
+    old = {'a': {'hash': '1', 'macros': ['b']}, 'b': {'hash': '2', 'macros': []}, 'c': {'hash': '3', 'macros': []}}
+    new = {**old, 'b': {'hash': 'changed', 'macros': []}}
+
+    assert changed_macros(old, new) == {'a', 'b'}
+
+
+def test_modified_nodes_by_checksum_config_and_macro(tmp_path):
+    old_nodes, old_macros = compact(tmp_path)
+    new_nodes, new_macros = compact(tmp_path, [
+        SEED,
+        node('stg_games', parents=[SEED['unique_id']], checksum='b'),
+        FCT,
+        node('rpt_games', parents=[FCT['unique_id']], config={'materialized': 'view'}),
+        TEST,
+        node('new_model', parents=[SEED['unique_id']]),
+    ], {**MACROS, 'macro.dbt_template.round': ('round({{ x }}, 2)', [])})
+    macros = changed_macros(old_macros, new_macros)
+
+    assert modified_nodes(old_nodes, new_nodes, macros) == {
+        STG['unique_id'], RPT['unique_id'], 'model.dbt_template.new_model',
+        # Through cents, which calls the changed round macro
+        FCT['unique_id'],
+    }
+
+
+def test_affected_nodes_respects_depth_and_adds_tests(tmp_path):
+    nodes, _ = compact(tmp_path)
+
+    assert affected_nodes({STG['unique_id']}, nodes, depth=1) == {
+        STG['unique_id']: 0, FCT['unique_id']: 1, TEST['unique_id']: 1}
+    assert affected_nodes({STG['unique_id']}, nodes) == {
+        STG['unique_id']: 0, FCT['unique_id']: 1, TEST['unique_id']: 2, RPT['unique_id']: 2}
+
+
+def test_select_within_budget_keeps_ancestors(tmp_path):
+    nodes, _ = compact(tmp_path)
+    affected = affected_nodes({STG['unique_id']}, nodes)
+    estimates = {STG['unique_id']: 10.0, FCT['unique_id']: 10.0, TEST['unique_id']: 1.0, RPT['unique_id']: 100.0}
+
+    assert select_within_budget(affected, nodes, estimates, None) == set(affected)
+    # rpt alone does not fit, and fct and its test are only picked on top of stg
+    assert select_within_budget(affected, nodes, estimates, 25) == {
+        STG['unique_id'], FCT['unique_id'], TEST['unique_id']}
+    assert select_within_budget(affected, nodes, estimates, 5) == set()
+
+
+def test_to_selectors_uses_fqn(tmp_path):
+    nodes, _ = compact(tmp_path)
+
+    # Everything below stg is selected, the test is left to indirect selection
+    assert to_selectors({STG['unique_id'], FCT['unique_id'], RPT['unique_id'], TEST['unique_id']}, nodes) == [
+        'fqn:dbt_template.marts.stg_games+']
+    assert to_selectors({STG['unique_id'], FCT['unique_id']}, nodes) == [
+        'fqn:dbt_template.marts.fct_games', 'fqn:dbt_template.marts.stg_games']
+
+
+def test_to_selectors_tells_apart_package_nodes_of_the_same_name(tmp_path):
+    package_stg = node('stg_games', parents=[SEED['unique_id']], package='nba_utils')
+    nodes, _ = compact(tmp_path, NODES + [package_stg])
+
+    assert to_selectors({package_stg['unique_id']}, nodes) == ['fqn:nba_utils.marts.stg_games']
+
+
+def test_plan_between_manifests(tmp_path):
+    old_manifest = write_manifest(tmp_path / 'old.json', NODES, MACROS)
+    new_manifest = write_manifest(tmp_path / 'new.json', [
+        SEED, node('stg_games', parents=[SEED['unique_id']], checksum='b'), FCT, RPT, TEST], MACROS)
+
+    result = plan(old_manifest, new_manifest, depth=1)
+    assert result['modified'] == [STG['unique_id']]
+    assert result['selected'] == sorted([STG['unique_id'], FCT['unique_id'], TEST['unique_id']])
+    assert result['selectors'] == ['fqn:dbt_template.marts.fct_games', 'fqn:dbt_template.marts.stg_games']
+    assert result['skipped'] == []
+
+
+def test_plan_without_changes_selects_nothing(tmp_path):
+    manifest = write_manifest(tmp_path / 'manifest.json', NODES, MACROS)
+
+    result = plan(manifest, manifest, budget=60, history={STG['unique_id']: [1.0]})
+    assert result['selectors'] == [] and result['selected'] == []
@@ -0,0 +1,23 @@
+import pytest
+
+from warehouses import DEFAULT_SETTINGS, get_settings_clause, get_warehouse_queries, normalize_size
+
+
+def test_single_cluster_warehouses_leave_out_cluster_properties():
+    # Standard edition rejects any cluster property
+    settings = {**DEFAULT_SETTINGS, 'size': 'XSMALL', 'scaling_policy': 'STANDARD'}
+    assert get_settings_clause(settings) == "WAREHOUSE_SIZE = 'XSMALL' AUTO_SUSPEND = 60"
+
+
+def test_multi_cluster_warehouses_set_cluster_properties():
+    settings = {**DEFAULT_SETTINGS, 'size': 'SMALL', 'max_cluster_count': 3, 'scaling_policy': 'ECONOMY'}
+    assert get_warehouse_queries({'CI_WH': settings})[1] == (
+        "ALTER WAREHOUSE CI_WH SET WAREHOUSE_SIZE = 'SMALL' AUTO_SUSPEND = 60 MIN_CLUSTER_COUNT = 1 "
+        "MAX_CLUSTER_COUNT = 3 SCALING_POLICY = 'ECONOMY';")
+
+
+def test_normalize_size_accepts_snowflake_spellings():
+    assert normalize_size('X-Small') == 'XSMALL'
+    assert normalize_size('2X-Large') == 'XXLARGE'
+    with pytest.raises(ValueError):
+        normalize_size('huge')
@@ -0,0 +1,164 @@
+import json
+import math
+import os
+import sys
+from typing import Dict, List
+
+from helpers import connect_to_snowflake, fetch_rows, humanize_bytes
+from warehouses import WAREHOUSE_SIZES, load_warehouses
+
+# Days of history the recommendations are based on
+DEFAULT_HISTORY_DAYS = 14
+
+# p95 execution time above which a warehouse is considered undersized, in seconds
+SLOW_P95_SECONDS = 300
+
+# p95 execution time below which a warehouse is considered oversized, in seconds
+FAST_P95_SECONDS = 10
+
+# Share of queries that may wait for a free cluster before scaling out is recommended
+MAX_QUEUED_SHARE = 0.05
+
+# Average queued load that indicates sustained contention rather than the odd burst
+MAX_AVG_QUEUED_LOAD = 0.1
+
+# Upper bound on recommended clusters
+MAX_CLUSTERS = 10
+
+
+def get_query_stats_query(days: int) -> str:
+    """Return the query that summarizes each warehouse's query history."""
+    return f"""
+        SELECT warehouse_name,
+               COUNT(*) AS queries,
+               APPROX_PERCENTILE(execution_time / 1000, 0.95) AS p95_execution_seconds,
+               COUNT_IF(queued_overload_time > 0) / COUNT(*) AS queued_share,
+               SUM(queued_overload_time) / 1000 AS queued_seconds,
+               SUM(bytes_spilled_to_local_storage) AS bytes_spilled_local,
+               SUM(bytes_spilled_to_remote_storage) AS bytes_spilled_remote
+        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+        WHERE start_time >= DATEADD('day', -{days}, CURRENT_TIMESTAMP())
+          AND warehouse_name IS NOT NULL
+          AND execution_status = 'SUCCESS'
+        GROUP BY warehouse_name;"""
+
+
+def get_load_stats_query(days: int) -> str:
+    """Return the query that summarizes each warehouse's running and queued load."""
+    return f"""
+        SELECT warehouse_name,
+               AVG(avg_running) AS avg_running,
+               AVG(avg_queued_load) AS avg_queued_load,
+               MAX(avg_running + avg_queued_load) AS peak_load
+        FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_LOAD_HISTORY
+        WHERE start_time >= DATEADD('day', -{days}, CURRENT_TIMESTAMP())
+        GROUP BY warehouse_name;"""
+
+
+def recommend(settings: Dict, query_stats: Dict, load_stats: Dict) -> Dict:
+    """Recommend a size and cluster count for one warehouse from its recorded usage.
+
+    Size follows how long queries run and whether they spill, cluster count follows how
+    often queries queue behind each other.
+
+    Args:
+        settings: Configured settings from load_warehouses()
+        query_stats: Row of get_query_stats_query() for the warehouse
+        load_stats: Row of get_load_stats_query() for the warehouse
+
+    Returns:
+        Dictionary with the recommended size, max_cluster_count and the reasons
+    """
+    size_index = WAREHOUSE_SIZES.index(settings['size'])
+    max_clusters = settings['max_cluster_count']
+    reasons = []
+
+    p95 = float(query_stats.get('p95_execution_seconds') or 0)
+    spilled_remote = float(query_stats.get('bytes_spilled_remote') or 0)
+    spilled_local = float(query_stats.get('bytes_spilled_local') or 0)
+    if spilled_remote:
+        size_index += 1
+        reasons.append(f"spilled {humanize_bytes(spilled_remote)} to remote storage")
+    elif p95 > SLOW_P95_SECONDS:
+        size_index += 1
+        reasons.append(f"p95 query ran {p95:.0f}s")
+    elif p95 < FAST_P95_SECONDS and not spilled_local and size_index > 0:
+        size_index -= 1
+        reasons.append(f"p95 query ran {p95:.1f}s without spilling")
+
+    queued_share = float(query_stats.get('queued_share') or 0)
+    avg_queued_load = float(load_stats.get('avg_queued_load') or 0)
+    peak_load = float(load_stats.get('peak_load') or 0)
+    if queued_share > MAX_QUEUED_SHARE or avg_queued_load > MAX_AVG_QUEUED_LOAD:
+        max_clusters = min(MAX_CLUSTERS, max(max_clusters + 1, math.ceil(peak_load)))
+        reasons.append(f"{queued_share:.0%} of queries queued")
+    elif max_clusters > 1 and peak_load and math.ceil(peak_load) < max_clusters:
+        max_clusters = max(1, math.ceil(peak_load))
+        reasons.append(f"peak load of {peak_load:.1f} fits in fewer clusters")
+
+    return {
+        'size': WAREHOUSE_SIZES[min(size_index, len(WAREHOUSE_SIZES) - 1)],
+        'max_cluster_count': max_clusters,
+        'reasons': reasons,
+    }
+
+
+def advise(warehouses: Dict[str, Dict], query_rows: List[Dict], load_rows: List[Dict]) -> List[str]:
+    """Build a markdown table of recommendations for every configured warehouse.
+
+    Args:
+        warehouses: Configured warehouses from load_warehouses()
+        query_rows: Rows of get_query_stats_query()
+        load_rows: Rows of get_load_stats_query()
+
+    Returns:
+        Markdown lines, warehouses whose settings should change are marked
+    """
+    query_stats = {row['warehouse_name'].upper(): row for row in query_rows}
+    load_stats = {row['warehouse_name'].upper(): row for row in load_rows}
+
+    lines = ["| Warehouse | Queries | Current | Recommended | Reason |", "| --- | --- | --- | --- | --- |"]
+    for name, settings in warehouses.items():
+        if name not in query_stats:
+            lines.append(f"| {name} | 0 | {settings['size']} x{settings['max_cluster_count']} | - | No queries recorded |")
+            continue
+        advice = recommend(settings, query_stats[name], load_stats.get(name, {}))
+        changed = (advice['size'], advice['max_cluster_count']) != (settings['size'], settings['max_cluster_count'])
+        lines.append(f"| {name} | {int(query_stats[name]['queries'])} | "
+                     f"{settings['size']} x{settings['max_cluster_count']} | "
+                     f"{'**' if changed else ''}{advice['size']} x{advice['max_cluster_count']}{'**' if changed else ''} | "
+                     f"{', '.join(advice['reasons']) or 'Sized right'} |")
+    return lines
+
+
+def main() -> None:
+    """Print size and cluster recommendations for the warehouses in warehouses.yml.
+
+    Reads WAREHOUSE_HISTORY_DAYS of ACCOUNT_USAGE history with the admin credentials, or
+    the rows in the JSON file WAREHOUSE_STATS ({"queries": [...], "load": [...]}) offline.
+    """
+    days = int(os.getenv('WAREHOUSE_HISTORY_DAYS', DEFAULT_HISTORY_DAYS))
+    warehouses = load_warehouses()
+
+    if fixture := os.getenv('WAREHOUSE_STATS'):
+        with open(fixture, 'r') as f:
+            stats = json.load(f)
+        query_rows, load_rows = stats.get('queries', []), stats.get('load', [])
+    else:
+        print("\nConnecting to Snowflake...", file=sys.stderr)
+        conn = connect_to_snowflake()
+        try:
+            query_rows = fetch_rows(conn, get_query_stats_query(days))
+            load_rows = fetch_rows(conn, get_load_stats_query(days))
+        except Exception as e:
+            print(f"Failed to read warehouse history: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            conn.close()
+
+    print(f"### Warehouse sizing over the last {days} days\n")
+    print("\n".join(advise(warehouses, query_rows, load_rows)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import os
+from typing import Dict, List, Optional
+
+# Warehouse sizes from smallest to largest, in the spelling SHOW WAREHOUSES normalizes to
+WAREHOUSE_SIZES = ['XSMALL', 'SMALL', 'MEDIUM', 'LARGE', 'XLARGE', 'XXLARGE', 'XXXLARGE', 'X4LARGE', 'X5LARGE',
+                   'X6LARGE']
+
+# Alternative spellings Snowflake accepts (and returns) for the larger sizes
+SIZE_ALIASES = {'2XLARGE': 'XXLARGE', 'X2LARGE': 'XXLARGE', '3XLARGE': 'XXXLARGE', 'X3LARGE': 'XXXLARGE',
+                '4XLARGE': 'X4LARGE', '5XLARGE': 'X5LARGE', '6XLARGE': 'X6LARGE'}
+
+# Settings applied when a warehouse does not set them
+DEFAULT_SETTINGS = {'auto_suspend': 60, 'min_cluster_count': 1, 'max_cluster_count': 1, 'scaling_policy': 'standard'}
+
+
+def normalize_size(size: str) -> str:
+    """Normalize a warehouse size like "X-Small" or "2X-Large" to its WAREHOUSE_SIZES spelling."""
+    size = str(size).upper().replace('-', '').replace('_', '').replace("'", '').strip()
+    size = SIZE_ALIASES.get(size, size)
+    if size not in WAREHOUSE_SIZES:
+        raise ValueError(f"Unknown warehouse size: {size}")
+    return size
+
+
+def get_config_path() -> str:
+    """Return the warehouse config path, SNOWFLAKE_WAREHOUSES_CONFIG or warehouses.yml at the repository root."""
+    return os.getenv('SNOWFLAKE_WAREHOUSES_CONFIG') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '..', '..', 'warehouses.yml')
+
+
+def load_warehouses(path: Optional[str] = None) -> Dict[str, Dict]:
+    """Load and validate the declarative warehouse config.
+
+    Args:
+        path: Path to the YAML config, defaults to get_config_path()
+
+    Returns:
+        Dictionary of upper-cased warehouse name to its settings with defaults filled in
+    """
+    import yaml
+
+    with open(path or get_config_path(), 'r') as f:
+        config = yaml.safe_load(f) or {}
+
+    warehouses = {}
+    for name, settings in (config.get('warehouses') or {}).items():
+        settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        if 'size' not in settings:
+            raise ValueError(f"Warehouse {name} has no size")
+        settings['size'] = normalize_size(settings['size'])
+        settings['scaling_policy'] = settings['scaling_policy'].upper()
+        settings['roles'] = [role.upper() for role in settings.get('roles') or []]
+        if not 1 <= settings['min_cluster_count'] <= settings['max_cluster_count']:
+            raise ValueError(f"Warehouse {name} needs 1 <= min_cluster_count <= max_cluster_count")
+        warehouses[name.upper()] = settings
+    return warehouses
+
+
+def get_settings_clause(settings: Dict) -> str:
+    """Return the size, suspend and (when scaling out) multi-cluster properties of a warehouse.
+
+    Cluster properties are only set for multi-cluster warehouses, Standard edition rejects them.
+    """
+    clause = f"WAREHOUSE_SIZE = '{settings['size']}' AUTO_SUSPEND = {settings['auto_suspend']}"
+    if settings['max_cluster_count'] > 1:
+        clause += (f" MIN_CLUSTER_COUNT = {settings['min_cluster_count']}"
+                   f" MAX_CLUSTER_COUNT = {settings['max_cluster_count']}"
+                   f" SCALING_POLICY = '{settings['scaling_policy']}'")
+    return clause
+
+
+def get_warehouse_queries(warehouses: Dict[str, Dict]) -> List[str]:
+    """Return SQL queries that create each warehouse and bring existing ones in line with the config.
+
+    Args:
+        warehouses: Warehouses from load_warehouses()
+
+    Returns:
+        List of CREATE WAREHOUSE and ALTER WAREHOUSE queries
+    """
+    return [
+        *[f"""CREATE WAREHOUSE IF NOT EXISTS {name} WITH
+            {get_settings_clause(settings)}
+            AUTO_RESUME = true
+            INITIALLY_SUSPENDED = true;""" for name, settings in warehouses.items()],
+        *[f"ALTER WAREHOUSE {name} SET {get_settings_clause(settings)};" for name, settings in warehouses.items()],
+    ]
+
+
+def get_role_warehouses(warehouses: Dict[str, Dict], role: str) -> List[str]:
+    """Return the warehouses a role is granted usage on, in config order."""
+    return [name for name, settings in warehouses.items() if role in settings['roles']]
@@ -0,0 +1,12 @@
+{# Restricts an incremental model to recent rows, re-processing a lookback window to pick up late-arriving changes #}
+
+{% macro incremental_lookback_filter(column_name, lookback_days=var('mart_lookback_days')) -%}
+    {%- if is_incremental() -%}
+        {{ column_name }} >= (
+            select {{ dbt.dateadd('day', -1 * lookback_days, 'max(' ~ column_name ~ ')') }}
+            from {{ this }}
+        )
+    {%- else -%}
+        true
+    {%- endif -%}
+{%- endmacro %}
@@ -22,6 +22,10 @@
         {# Use this if you have more than one person in the project #}
         {# {{ default_schema }}_{{ custom_schema_name }} #}
 
+    {# local schemas will go to their custom schema in the DuckDB file (mart) #}
+    {%- elif target.name == 'local' -%}
+        {{ custom_schema_name }}
+
     {%- endif -%}
 
 {%- endmacro %}
@@ -0,0 +1,30 @@
+{# Tags every model, seed, snapshot and test query so its cost can be attributed to the node #}
+{# (see .github/scripts/query_costs.py). An explicit query_tag config still takes precedence. #}
+{% macro snowflake__set_query_tag() -%}
+
+    {%- set new_query_tag = config.get('query_tag') or tojson({
+        'unique_id': model.unique_id,
+        'target': target.name,
+        'pr_number': env_var('GITHUB_PR_NUMBER', ''),
+        'run_id': env_var('GITHUB_RUN_ID', ''),
+        'invocation_id': invocation_id
+    }) -%}
+
+    {%- set original_query_tag = get_current_query_tag() -%}
+    {{ log("Setting query_tag to '" ~ new_query_tag ~ "'. Will reset to '" ~ original_query_tag ~ "' after materialization.") }}
+    {%- do run_query("alter session set query_tag = '{}'".format(new_query_tag | replace("'", "\\'"))) -%}
+    {{ return(original_query_tag) }}
+
+{%- endmacro %}
+
+{% macro snowflake__unset_query_tag(original_query_tag) -%}
+
+    {%- if original_query_tag -%}
+        {{ log("Resetting query_tag to '" ~ original_query_tag ~ "'.") }}
+        {%- do run_query("alter session set query_tag = '{}'".format(original_query_tag | replace("'", "\\'"))) -%}
+    {%- else -%}
+        {{ log("No original query_tag, unsetting parameter.") }}
+        {%- do run_query("alter session unset query_tag") -%}
+    {%- endif -%}
+
+{%- endmacro %}
@@ -1,6 +1,7 @@
 with
     final as (
         select
+            game_id,
             date,
             start_time,
             home_team,
@@ -11,6 +12,7 @@ with
             length_of_game,
             arena
         from {{ ref('src__nba_games') }}
+        where {{ incremental_lookback_filter('date') }}
     )
 select *
 from final
\ No newline at end of file
@@ -13,6 +13,7 @@ with
             winner_score    as winner_score,
             loser_score     as loser_score
         from {{ ref('src__nfl_games') }}
+        where {{ incremental_lookback_filter('date') }}
     )
 select *
 from final
\ No newline at end of file
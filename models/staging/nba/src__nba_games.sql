@@ -25,7 +25,10 @@ with
     ),
     final as (
         -- Join models and create calcs
-        select *
+        select
+            -- A team plays at most one game per date, so this identifies a game
+            {{ dbt_utils.generate_surrogate_key(['date', 'home_team', 'visitor_team']) }} as game_id,
+            *
         from intermediate
     )
 select *